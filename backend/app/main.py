@@ -1,15 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import heatmap, simulation, recommendations, health
+from app.routes import heatmap, simulation, recommendations, health, hotspots
+from app.services.weather_service import get_weather_service
+from app.services.precompute_service import get_precompute_scheduler
+from app.services.history_store import get_history_store
+from app.services.simulation_service import get_batch_simulation_service
+from app.services.simulation_cache import get_simulation_cache
+from app.services.session_service import get_session_store
+from app.services.warmup_service import warm_up
+from app.utils.executor import shutdown_cpu_executor
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy ML/HTTP dependencies load on first use unless warm-up is requested
+    if os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true":
+        await asyncio.to_thread(warm_up)
+    # Connect the history store (and its connection pool) once per process
+    history_store = get_history_store()
+    if history_store is not None:
+        try:
+            await history_store.connect()
+        except Exception as e:
+            print(f"History store unavailable: {e}")
+            get_precompute_scheduler().history = None
+    # Precompute heatmap/recommendation snapshots in the background
+    scheduler = get_precompute_scheduler()
+    if os.getenv("PRECOMPUTE_ENABLED", "true").lower() == "true":
+        if os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true":
+            # Serve the very first request from a snapshot
+            await scheduler.refresh_now()
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    get_batch_simulation_service().shutdown()
+    get_simulation_cache().close()
+    get_session_store().close()
+    shutdown_cpu_executor()
+    if history_store is not None:
+        await history_store.close()
+    # Close pooled upstream HTTP connections on shutdown
+    get_weather_service().close()
+
 app = FastAPI(
     title="UHI Mitigation API",
     description="AI-Driven Urban Heat Island Mitigation Recommendation System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,6 +68,7 @@ app.include_router(heatmap.router, prefix="/api/v1", tags=["Heatmap"])
 app.include_router(simulation.router, prefix="/api/v1", tags=["Simulation"])
 app.include_router(recommendations.router, prefix="/api/v1", tags=["Recommendations"])
 app.include_router(health.router, prefix="/api/v1", tags=["Health"])
+app.include_router(hotspots.router, prefix="/api/v1", tags=["Hotspots"])
 
 @app.get("/")
 async def root():
@@ -2,62 +2,126 @@
 K-Means Clustering Model for UHI Hotspot Detection
 """
 import numpy as np
-from sklearn.cluster import KMeans
 from typing import List, Tuple, Dict
-import json
 
 class UHIClusterer:
-    """K-Means clustering model for identifying UHI hotspots"""
-    
-    def __init__(self, n_clusters: int = 5):
+    """
+    K-Means clustering model for identifying UHI hotspots.
+
+    In incremental mode each refresh re-clusters with MiniBatchKMeans
+    warm-started from the previous centroids, which keeps cluster ids stable
+    between heatmap snapshots and converges in a few mini-batch steps.
+    """
+
+    def __init__(self, n_clusters: int = 5, incremental: bool = False, batch_size: int = 4096):
+        # scikit-learn is only imported once a clusterer is needed
+        from sklearn.cluster import KMeans
         self.n_clusters = n_clusters
+        self.incremental = incremental
+        self.batch_size = batch_size
         self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
         self.is_fitted = False
-        
+
+    @staticmethod
+    def _features(coordinates, temperatures) -> np.ndarray:
+        """Feature matrix of [lat, lon, temperature] rows"""
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        return np.column_stack([coordinates, np.asarray(temperatures, dtype=np.float64)])
+
     def fit(self, coordinates: List[Tuple[float, float]], temperatures: List[float]):
         """Fit the clustering model on coordinates and temperatures"""
-        X = np.array([[coord[0], coord[1], temp] for coord, temp in zip(coordinates, temperatures)])
-        self.model.fit(X)
+        X = self._features(coordinates, temperatures)
+        if self.incremental:
+            self._fit_incremental(X)
+        else:
+            self.model.fit(X)
         self.is_fitted = True
         return self
-    
+
+    def _fit_incremental(self, X: np.ndarray):
+        """MiniBatchKMeans fit, warm-started from the previous centroids when available"""
+        from sklearn.cluster import MiniBatchKMeans
+        n_clusters = min(self.n_clusters, len(X))
+        if self.is_fitted and len(self.model.cluster_centers_) == n_clusters:
+            model = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                init=self.model.cluster_centers_,
+                n_init=1,
+                max_iter=3,
+                batch_size=self.batch_size,
+                random_state=42
+            )
+        else:
+            model = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                n_init=3,
+                batch_size=self.batch_size,
+                random_state=42
+            )
+        self.model = model.fit(X)
+
     def predict_hotspot(self, lat: float, lon: float, temperature: float) -> int:
         """Predict which hotspot cluster a location belongs to"""
         if not self.is_fitted:
             raise ValueError("Model must be fitted before prediction")
         X = np.array([[lat, lon, temperature]])
         return self.model.predict(X)[0]
-    
+
+    def _zone_statistics(self, X: np.ndarray, predictions: np.ndarray) -> Dict:
+        """Per-cluster statistics with bincount/reduceat aggregation (no per-cluster scans)"""
+        n_clusters = len(self.model.cluster_centers_)
+        counts = np.bincount(predictions, minlength=n_clusters)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_lat = np.bincount(predictions, weights=X[:, 0], minlength=n_clusters) / counts
+            mean_lon = np.bincount(predictions, weights=X[:, 1], minlength=n_clusters) / counts
+            mean_temp = np.bincount(predictions, weights=X[:, 2], minlength=n_clusters) / counts
+
+        # Min/max per cluster: sort temperatures by label once, reduce each run
+        order = np.argsort(predictions, kind="stable")
+        sorted_temps = X[order, 2]
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+        max_temp = np.maximum.reduceat(sorted_temps, starts)
+        min_temp = np.minimum.reduceat(sorted_temps, starts)
+
+        zones = {}
+        for position, i in enumerate(present.tolist()):
+            avg_temp = float(mean_temp[i])
+            zones[i] = {
+                "cluster_id": i,
+                "avg_temperature": avg_temp,
+                "max_temperature": float(max_temp[position]),
+                "min_temperature": float(min_temp[position]),
+                "center": [float(mean_lat[i]), float(mean_lon[i])],
+                "point_count": int(counts[i]),
+                "severity": "high" if avg_temp > 38 else "medium" if avg_temp > 35 else "low"
+            }
+        return zones
+
     def get_hotspot_zones(self, coordinates: List[Tuple[float, float]], temperatures: List[float]) -> Dict:
         """Get all hotspot zones with their characteristics"""
         if not self.is_fitted:
             self.fit(coordinates, temperatures)
-        
-        predictions = self.model.predict(
-            np.array([[coord[0], coord[1], temp] for coord, temp in zip(coordinates, temperatures)])
-        )
-        
-        zones = {}
-        for i in range(self.n_clusters):
-            cluster_points = [j for j, pred in enumerate(predictions) if pred == i]
-            if cluster_points:
-                cluster_temps = [temperatures[j] for j in cluster_points]
-                cluster_coords = [coordinates[j] for j in cluster_points]
-                
-                zones[i] = {
-                    "cluster_id": i,
-                    "avg_temperature": np.mean(cluster_temps),
-                    "max_temperature": np.max(cluster_temps),
-                    "min_temperature": np.min(cluster_temps),
-                    "center": [
-                        np.mean([c[0] for c in cluster_coords]),
-                        np.mean([c[1] for c in cluster_coords])
-                    ],
-                    "point_count": len(cluster_points),
-                    "severity": "high" if np.mean(cluster_temps) > 38 else "medium" if np.mean(cluster_temps) > 35 else "low"
-                }
-        
-        return zones
+
+        X = self._features(coordinates, temperatures)
+        return self._zone_statistics(X, self.model.predict(X))
+
+    def update(self, lats: np.ndarray, lons: np.ndarray, temperatures: np.ndarray) -> Dict:
+        """
+        Re-cluster a new heatmap snapshot and return its hotspot zones.
+        In incremental mode this warm-starts from the previous snapshot's centroids.
+        """
+        X = np.column_stack([
+            np.asarray(lats, dtype=np.float64),
+            np.asarray(lons, dtype=np.float64),
+            np.asarray(temperatures, dtype=np.float64)
+        ])
+        if self.incremental:
+            self._fit_incremental(X)
+        else:
+            self.model.fit(X)
+        self.is_fitted = True
+        return self._zone_statistics(X, self.model.labels_)
 
 # Singleton instance
 _uhi_clusterer = None
@@ -66,7 +130,5 @@ def get_clusterer() -> UHIClusterer:
     """Get singleton clusterer instance"""
     global _uhi_clusterer
     if _uhi_clusterer is None:
-        _uhi_clusterer = UHIClusterer(n_clusters=5)
+        _uhi_clusterer = UHIClusterer(n_clusters=5, incremental=True)
     return _uhi_clusterer
-
-
@@ -1,118 +1,167 @@
 """
 XGBoost Regression Model for Intervention Impact Prediction
 """
+import math
+import os
+import threading
+from pathlib import Path
 import numpy as np
-import xgboost as xgb
-from typing import Dict, List, Tuple
-import json
+from typing import Dict, List, Tuple, Union
+from app.utils.rng import coordinate_keys, counter_uniforms
+
+# Intervention type codes; unknown types use code UNKNOWN_TYPE_CODE
+INTERVENTION_TYPES = ("trees", "cool_roof", "park", "green_roof")
+TYPE_CODES = {name: code for code, name in enumerate(INTERVENTION_TYPES)}
+UNKNOWN_TYPE_CODE = len(INTERVENTION_TYPES)
+
+# Realistic impact coefficients (localized impact, not city-wide)
+# These represent LOCAL temperature reduction in the immediate area
+# Columns: temp_reduction, energy_saving, co2_reduction, health_score
+IMPACT_COEFFICIENTS = np.array([
+    [0.08, 0.03, 0.02, 0.05],  # trees: per tree (MWh / kg CO2 / points per tree per year)
+    [0.12, 0.08, 0.05, 0.08],  # cool_roof: per 100m²
+    [0.20, 0.05, 0.08, 0.12],  # park: per 100m² (parks have larger impact)
+    [0.15, 0.06, 0.04, 0.10],  # green_roof: per 100m²
+    [0.08, 0.03, 0.02, 0.05],  # unknown: falls back to tree coefficients
+])
+
+# Columnar intervention layout used by the vectorized impact model
+INTERVENTION_DTYPE = np.dtype([
+    ("type_code", np.int8),
+    ("count", np.float64),
+    ("area", np.float64),
+    ("lat", np.float64),
+    ("lon", np.float64),
+    ("base_temp", np.float64),
+])
+
+NOISE_FACTOR = 0.05  # Reduced noise for more consistent results
+
+# Trained booster written by train_model.py (UBJSON)
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parents[2] / "models" / "intervention_model.ubj"
+PREDICT_BATCH_SIZE = 65536
+
+
+def interventions_to_array(interventions: List[Dict]) -> np.ndarray:
+    """Convert intervention dicts to a structured INTERVENTION_DTYPE array"""
+    default_location = [18.5204, 73.8567]
+    records = []
+    for intervention in interventions:
+        location = intervention.get("location", default_location)
+        records.append((
+            TYPE_CODES.get(intervention.get("type", "trees"), UNKNOWN_TYPE_CODE),
+            intervention.get("count", 0) or 0,
+            intervention.get("area", 0) or 0,
+            location[0],
+            location[1],
+            intervention.get("base_temperature", 35)
+        ))
+    return np.array(records, dtype=INTERVENTION_DTYPE)
+
+
+def intervention_features(interventions: np.ndarray) -> np.ndarray:
+    """Model feature matrix (float32) for a structured INTERVENTION_DTYPE array"""
+    return np.column_stack([
+        interventions["type_code"],
+        interventions["count"],
+        interventions["area"],
+        interventions["lat"],
+        interventions["lon"],
+        interventions["base_temp"],
+    ]).astype(np.float32)
+
+
+def simulate_impacts(interventions: np.ndarray) -> np.ndarray:
+    """
+    Vectorized per-intervention impact for a structured INTERVENTION_DTYPE array.
+    Returns an (n, 4) array of temp_reduction, energy_saving, co2_reduction and
+    health_score_improvement, rounded to 2 decimals like the per-item model.
+    """
+    type_codes = interventions["type_code"]
+    count = interventions["count"]
+    area = interventions["area"]
+    coeffs = IMPACT_COEFFICIENTS[type_codes]
+    
+    # Trees: impact based on count with diminishing returns.
+    # First 10 trees have full impact, then 80% for next 10, then 60%
+    effective_count = (
+        np.minimum(count, 10)
+        + np.clip(count - 10, 0, 10) * 0.8
+        + np.maximum(0, count - 20) * 0.6
+    )
+    # Area-based: temperature scales with square root to represent localized effect
+    area_units = area / 100
+    area_factor = np.sqrt(np.maximum(area_units, 0))
+    
+    is_trees = type_codes == TYPE_CODES["trees"]
+    temp_scale = np.where(is_trees, effective_count, area_factor)
+    other_scale = np.where(is_trees, count, area_units)
+    scale = np.column_stack([temp_scale, other_scale, other_scale, other_scale])
+    impacts = coeffs * scale
+    
+    # Model uncertainty: counter-based noise keyed by location, so results are
+    # reproducible without touching the global NumPy RNG
+    noise = counter_uniforms(coordinate_keys(interventions["lat"], interventions["lon"], scale=10000), 4)
+    impacts *= 1 + (noise * 2 - 1) * NOISE_FACTOR
+    
+    # Ensure positive values
+    return np.round(np.maximum(impacts, 0), 2)
 
 class InterventionPredictor:
-    """XGBoost model for predicting intervention impact"""
+    """
+    XGBoost model for predicting intervention impact.
+
+    The trained booster is loaded on first prediction, not at import, so
+    startup stays fast. Without a model file, impacts come from the
+    rule-based simulator the model is trained on.
+    """
     
-    def __init__(self):
+    def __init__(self, model_path: Union[str, Path] = None):
+        self.model_path = Path(model_path or os.getenv("INTERVENTION_MODEL_PATH", DEFAULT_MODEL_PATH))
         self.model = None
         self.is_fitted = False
-        self._initialize_model()
+        self._load_attempted = False
+        self._load_lock = threading.Lock()
     
-    def _initialize_model(self):
-        """Initialize the XGBoost model"""
-        self.model = xgb.XGBRegressor(
-            n_estimators=100,
-            max_depth=6,
-            learning_rate=0.1,
-            random_state=42,
-            objective='reg:squarederror'
-        )
-        # For demo purposes, we'll use a pre-computed model behavior
-        # In production, this would be loaded from a trained model file
-        self.is_fitted = True
+    def _load_model(self):
+        """Load the trained booster once; fall back to the simulator if it is missing"""
+        with self._load_lock:
+            if self._load_attempted:
+                return
+            self._load_attempted = True
+            if not self.model_path.exists():
+                return
+            try:
+                import xgboost as xgb
+                booster = xgb.Booster()
+                booster.load_model(str(self.model_path))
+                # Requests are small and simulation workers are processes; avoid thread oversubscription
+                booster.set_param({"nthread": 1})
+                self.model = booster
+                self.is_fitted = True
+            except Exception as e:
+                print(f"Error loading intervention model from {self.model_path}: {e}")
     
-    def _simulate_intervention_impact(
-        self,
-        intervention_type: str,
-        count: int,
-        area: float,
-        base_temp: float,
-        lat: float,
-        lon: float
-    ) -> Dict:
+    def predict_impacts(self, interventions: np.ndarray) -> np.ndarray:
         """
-        Simulate the impact of an intervention based on type and parameters.
-        This uses rule-based logic to simulate a fine-tuned model.
+        Per-intervention (n, 4) impacts for a structured INTERVENTION_DTYPE array.
+        All interventions are scored with inplace_predict in fixed-size batches.
         """
-        # Realistic impact coefficients (localized impact, not city-wide)
-        # These represent LOCAL temperature reduction in the immediate area
-        impact_coefficients = {
-            "trees": {
-                "temp_reduction": 0.08,  # degrees per tree (localized, realistic)
-                "energy_saving": 0.03,   # MWh per tree per year
-                "co2_reduction": 0.02,   # kg CO2 per tree per year
-                "health_score": 0.05     # points per tree
-            },
-            "cool_roof": {
-                "temp_reduction": 0.12,  # degrees per 100m² (localized)
-                "energy_saving": 0.08,   # MWh per 100m² per year
-                "co2_reduction": 0.05,   # kg per 100m² per year
-                "health_score": 0.08     # points per 100m²
-            },
-            "park": {
-                "temp_reduction": 0.20,  # degrees per 100m² (localized, parks have larger impact)
-                "energy_saving": 0.05,   # MWh per 100m² per year
-                "co2_reduction": 0.08,   # kg per 100m² per year
-                "health_score": 0.12     # points per 100m²
-            },
-            "green_roof": {
-                "temp_reduction": 0.15,  # degrees per 100m² (localized)
-                "energy_saving": 0.06,   # MWh per 100m² per year
-                "co2_reduction": 0.04,   # kg per 100m² per year
-                "health_score": 0.10     # points per 100m²
-            }
-        }
-        
-        coeffs = impact_coefficients.get(intervention_type, impact_coefficients["trees"])
-        
-        # Calculate impact based on intervention type
-        if intervention_type == "trees":
-            # For trees, impact is based on count (with diminishing returns)
-            # First 10 trees have full impact, then 80% for next 10, then 60%
-            effective_count = min(count, 10) + min(max(0, count - 10), 10) * 0.8 + max(0, count - 20) * 0.6
-            temp_reduction = coeffs["temp_reduction"] * effective_count
-            energy_saving = coeffs["energy_saving"] * count
-            co2_reduction = coeffs["co2_reduction"] * count
-            health_score = coeffs["health_score"] * count
-        else:
-            # For area-based interventions, use area with diminishing returns
-            # Impact scales with square root to represent localized effect
-            area_factor = np.sqrt(area / 100)  # More realistic scaling
-            temp_reduction = coeffs["temp_reduction"] * area_factor
-            energy_saving = coeffs["energy_saving"] * (area / 100)
-            co2_reduction = coeffs["co2_reduction"] * (area / 100)
-            health_score = coeffs["health_score"] * (area / 100)
-        
-        # Add some randomness to simulate model uncertainty (with fixed seed for reproducibility)
-        np.random.seed(int(lat * 100 + lon * 100) % 1000)  # Deterministic based on location
-        noise_factor = 0.05  # Reduced noise for more consistent results
-        temp_reduction *= (1 + np.random.uniform(-noise_factor, noise_factor))
-        energy_saving *= (1 + np.random.uniform(-noise_factor, noise_factor))
-        co2_reduction *= (1 + np.random.uniform(-noise_factor, noise_factor))
-        health_score *= (1 + np.random.uniform(-noise_factor, noise_factor))
-        
-        # Ensure positive values
-        temp_reduction = max(0, temp_reduction)
-        energy_saving = max(0, energy_saving)
-        co2_reduction = max(0, co2_reduction)
-        health_score = max(0, health_score)
+        if not self._load_attempted:
+            self._load_model()
+        if self.model is None:
+            return simulate_impacts(interventions)
         
-        return {
-            "temperature_reduction": round(temp_reduction, 2),
-            "energy_saving": round(energy_saving, 2),
-            "co2_reduction": round(co2_reduction, 2),
-            "health_score_improvement": round(health_score, 2)
-        }
+        features = intervention_features(interventions)
+        impacts = np.empty((len(features), 4), dtype=np.float32)
+        for start in range(0, len(features), PREDICT_BATCH_SIZE):
+            batch = features[start:start + PREDICT_BATCH_SIZE]
+            impacts[start:start + len(batch)] = np.asarray(self.model.inplace_predict(batch)).reshape(len(batch), 4)
+        return np.round(np.maximum(impacts.astype(np.float64), 0), 2)
     
     def predict_intervention_impact(
         self,
-        interventions: List[Dict]
+        interventions: Union[List[Dict], np.ndarray]
     ) -> Dict:
         """
         Predict the cumulative impact of multiple interventions.
@@ -125,61 +174,65 @@ class InterventionPredictor:
                 - area: float (for area-based interventions)
                 - location: [lat, lon]
                 - base_temperature: float
+              or a structured INTERVENTION_DTYPE array (columnar fast path)
         
         Returns:
             Dict with cumulative impact metrics
         """
-        if not interventions:
-            return {
-                "average_temperature": 38.5,
-                "temperature_reduction": 0,
-                "energy_saving": 0,
-                "co2_reduction": 0,
-                "health_score": 7.2,
-                "intervention_count": 0
-            }
-        
-        total_temp_reduction = 0
-        total_energy_saving = 0
-        total_co2_reduction = 0
-        total_health_score = 0
-        
-        # Get baseline average temperature
-        base_temps = [i.get("base_temperature", 35) for i in interventions]
-        base_avg_temp = np.mean(base_temps) if base_temps else 35
-        
-        for intervention in interventions:
-            impact = self._simulate_intervention_impact(
-                intervention_type=intervention.get("type", "trees"),
-                count=intervention.get("count", 0),
-                area=intervention.get("area", 0),
-                base_temp=intervention.get("base_temperature", 35),
-                lat=intervention.get("location", [18.5204, 73.8567])[0],
-                lon=intervention.get("location", [18.5204, 73.8567])[1]
-            )
-            
-            total_temp_reduction += impact["temperature_reduction"]
-            total_energy_saving += impact["energy_saving"]
-            total_co2_reduction += impact["co2_reduction"]
-            total_health_score += impact["health_score_improvement"]
+        if len(interventions) == 0:
+            return impact_from_totals(0, 0.0, [0.0, 0.0, 0.0, 0.0])
         
-        # Calculate city-wide average temperature reduction
-        # Interventions have localized impact, so city-wide reduction is smaller
-        # Scale down by factor based on number of interventions (more interventions = more coverage)
-        coverage_factor = min(1.0, len(interventions) * 0.15)  # Max 15% city coverage per intervention
-        city_wide_temp_reduction = total_temp_reduction * coverage_factor
-        
-        # New average temperature (realistic city-wide impact)
-        new_avg_temp = max(25, base_avg_temp - city_wide_temp_reduction)  # Ensure reasonable minimum
+        if not isinstance(interventions, np.ndarray):
+            interventions = interventions_to_array(interventions)
         
+        # fsum is correctly rounded, so totals kept incrementally (exactly)
+        # by simulation sessions reproduce these values bit for bit
+        return impact_from_totals(
+            len(interventions),
+            math.fsum(interventions["base_temp"].tolist()),
+            [math.fsum(column) for column in self.predict_impacts(interventions).T.tolist()]
+        )
+
+
+def impact_from_totals(count: int, base_temp_sum: float, impact_totals: List[float]) -> Dict:
+    """
+    Cumulative impact metrics from running totals: the number of
+    interventions, the sum of their base temperatures and the column sums
+    of their per-intervention impacts. Totals can be kept up to date one
+    intervention at a time, so edits to a scenario cost O(1).
+    """
+    if count == 0:
         return {
-            "average_temperature": round(new_avg_temp, 1),
-            "temperature_reduction": round(city_wide_temp_reduction, 2),
-            "energy_saving": round(total_energy_saving, 2),
-            "co2_reduction": round(total_co2_reduction, 2),
-            "health_score": round(min(10, max(5, 7.2 + total_health_score)), 1),  # Scale to 5-10
-            "intervention_count": len(interventions)
+            "average_temperature": 38.5,
+            "temperature_reduction": 0,
+            "energy_saving": 0,
+            "co2_reduction": 0,
+            "health_score": 7.2,
+            "intervention_count": 0
         }
+    
+    # Get baseline average temperature
+    base_avg_temp = base_temp_sum / count
+    
+    total_temp_reduction, total_energy_saving, total_co2_reduction, total_health_score = impact_totals
+    
+    # Calculate city-wide average temperature reduction
+    # Interventions have localized impact, so city-wide reduction is smaller
+    # Scale down by factor based on number of interventions (more interventions = more coverage)
+    coverage_factor = min(1.0, count * 0.15)  # Max 15% city coverage per intervention
+    city_wide_temp_reduction = total_temp_reduction * coverage_factor
+    
+    # New average temperature (realistic city-wide impact)
+    new_avg_temp = max(25, base_avg_temp - city_wide_temp_reduction)  # Ensure reasonable minimum
+    
+    return {
+        "average_temperature": round(new_avg_temp, 1),
+        "temperature_reduction": round(city_wide_temp_reduction, 2),
+        "energy_saving": round(total_energy_saving, 2),
+        "co2_reduction": round(total_co2_reduction, 2),
+        "health_score": round(min(10, max(5, 7.2 + total_health_score)), 1),  # Scale to 5-10
+        "intervention_count": count
+    }
 
 # Singleton instance
 _predictor = None
@@ -0,0 +1,83 @@
+"""
+Offline training for the intervention impact model
+"""
+from pathlib import Path
+from typing import Tuple
+import numpy as np
+from app.models.prediction import (
+    INTERVENTION_DTYPE,
+    INTERVENTION_TYPES,
+    TYPE_CODES,
+    intervention_features,
+    simulate_impacts,
+)
+from app.utils.rng import make_generator
+
+# Sampling extent for synthetic interventions (Pune heatmap extent)
+PUNE_CENTER = (18.5204, 73.8567)
+SAMPLE_RANGE = 0.15
+
+
+def generate_dataset(n_samples: int = 200000, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a training set by sampling interventions around Pune and labelling
+    them with the rule-based impact simulator.
+    Returns (X, y): float32 features and (n, 4) impact targets.
+    """
+    rng = make_generator("training", seed)
+    interventions = np.empty(n_samples, dtype=INTERVENTION_DTYPE)
+    interventions["type_code"] = rng.integers(0, len(INTERVENTION_TYPES), n_samples)
+    is_trees = interventions["type_code"] == TYPE_CODES["trees"]
+    interventions["count"] = np.where(is_trees, rng.integers(1, 200, n_samples), 0)
+    interventions["area"] = np.where(is_trees, 0, rng.uniform(50, 20000, n_samples))
+    interventions["lat"] = PUNE_CENTER[0] + rng.uniform(-SAMPLE_RANGE, SAMPLE_RANGE, n_samples)
+    interventions["lon"] = PUNE_CENTER[1] + rng.uniform(-SAMPLE_RANGE, SAMPLE_RANGE, n_samples)
+    interventions["base_temp"] = rng.uniform(28, 44, n_samples)
+    return intervention_features(interventions), simulate_impacts(interventions).astype(np.float32)
+
+
+def save_dataset(path: Path, X: np.ndarray, y: np.ndarray):
+    """Save a dataset as a compressed .npz file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, X=X, y=y)
+
+
+def load_dataset(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """Load a dataset written by save_dataset"""
+    with np.load(path) as data:
+        return data["X"], data["y"]
+
+
+def train_model(X: np.ndarray, y: np.ndarray, output_path: Path,
+                n_estimators: int = 150, max_depth: int = 6) -> float:
+    """
+    Fit a multi-output XGBoost regressor and save its booster as UBJSON.
+    Vector-leaf trees predict all four impact metrics per tree, which keeps
+    inference several times cheaper than one tree ensemble per output.
+    Returns the R² on a 10% holdout split.
+    """
+    import xgboost as xgb
+
+    order = make_generator("training-split", len(X)).permutation(len(X))
+    n_holdout = max(1, len(X) // 10)
+    holdout, train = order[:n_holdout], order[n_holdout:]
+
+    model = xgb.XGBRegressor(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=0.2,
+        tree_method="hist",
+        multi_strategy="multi_output_tree",
+        random_state=42,
+        objective='reg:squarederror'
+    )
+    model.fit(X[train], y[train])
+
+    predictions = model.predict(X[holdout])
+    residual = ((y[holdout] - predictions) ** 2).sum()
+    total = ((y[holdout] - y[holdout].mean(axis=0)) ** 2).sum()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # The .ubj extension selects XGBoost's binary UBJSON format
+    model.get_booster().save_model(str(output_path))
+    return float(1 - residual / total)
@@ -4,6 +4,8 @@ Health Precautions API Routes
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Optional
 from app.services.health_service import get_health_service
+from app.services.precompute_service import get_precompute_scheduler
+from app.utils.executor import run_cpu
 
 router = APIRouter()
 
@@ -17,8 +19,13 @@ async def get_health_precautions(
     Returns list of health recommendations.
     """
     try:
+        # Point lookups use the nearest cell of the precomputed heatmap when available
+        temperature = None
+        snapshot = get_precompute_scheduler().get_finest_snapshot()
+        if snapshot is not None and lat is not None and lon is not None:
+            temperature = await run_cpu(snapshot.lookup_temperature, lat, lon)
         health_service = get_health_service()
-        precautions = health_service.get_health_precautions(lat, lon)
+        precautions = await health_service.get_health_precautions_async(lat, lon, temperature=temperature)
         return precautions
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching health precautions: {str(e)}")
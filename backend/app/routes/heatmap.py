@@ -1,25 +1,162 @@
 """
 Heatmap API Routes
 """
-from fastapi import APIRouter, HTTPException
-from typing import Dict
+import asyncio
+from datetime import datetime, timezone
+import numpy as np
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import AsyncIterator, Dict, Optional
+from app.services.heatmap_grid import BINARY_MEDIA_TYPE, STREAM_MIN_POINTS
+from app.services.history_store import HISTORY_UNITS, get_history_store, to_datetime, to_datetime64
 from app.services.weather_service import get_weather_service
+from app.services.precompute_service import get_precompute_scheduler
+from app.services.tile_service import get_tile_service, tile_bounds
+from app.utils.executor import run_cpu
 
 router = APIRouter()
 
+def _wants_binary(request: Request, format: str) -> bool:
+    """Binary is chosen by ?format=binary or an Accept header asking for it"""
+    if format == "binary":
+        return True
+    accept = request.headers.get("accept", "")
+    return BINARY_MEDIA_TYPE in accept or "application/octet-stream" in accept
+
 @router.get("/heatmap_data")
-async def get_heatmap_data() -> Dict:
+async def get_heatmap_data(
+    request: Request,
+    grid_size: int = Query(15, ge=2, le=500),
+    stream: Optional[bool] = None,
+    format: str = Query("geojson", pattern="^(geojson|binary)$")
+) -> Dict:
     """
     Get thermal heatmap data for Pune.
     Returns GeoJSON FeatureCollection with temperature data.
-    Optimized with smaller grid for faster response.
+    Defaults to a 15x15 grid (225 points) for fast response. Grids of
+    STREAM_MIN_POINTS or more (or any grid with stream=true) are serialized
+    in bounded chunks instead of one in-memory document; stream=false forces
+    a single buffer.
+    With format=binary (or Accept: application/vnd.uhi.heatmap+octet-stream)
+    returns a compact columnar float32 buffer of lat, lon and temperature.
     """
     try:
-        weather_service = get_weather_service()
-        # Reduced grid size from 30 to 15 for faster response (225 points instead of 900)
-        heatmap_data = weather_service.get_heatmap_data(grid_size=15)
-        return heatmap_data
+        # Serve the precomputed snapshot when the scheduler has published one
+        snapshot = get_precompute_scheduler().get_snapshot(city="pune", grid_size=grid_size)
+        if snapshot is not None:
+            grid = snapshot.grid
+        else:
+            weather_service = get_weather_service()
+            grid = await weather_service.get_heatmap_grid_async(grid_size=grid_size)
+        
+        if _wants_binary(request, format):
+            return Response(content=grid.to_binary(), media_type=BINARY_MEDIA_TYPE)
+        if stream is None:
+            stream = len(grid) >= STREAM_MIN_POINTS
+        if stream:
+            return StreamingResponse(grid.iter_geojson(), media_type="application/json")
+        return Response(content=await run_cpu(grid.to_geojson_bytes), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching heatmap data: {str(e)}")
 
+@router.get("/heatmap_tiles/{z}/{x}/{y}")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    format: str = Query("json", pattern="^(json|binary)$")
+):
+    """
+    Get one XYZ tile of the temperature raster pyramid.
+    JSON returns rows north to south with null outside the city;
+    format=binary returns the raw little-endian float32 raster (NaN outside).
+    """
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    try:
+        tile_service = get_tile_service()
+        # Tile rendering can wait on upstream lookups, so it runs on a plain thread
+        # rather than the bounded CPU executor
+        tile = await asyncio.to_thread(tile_service.get_tile, z, x, y)
+        
+        if format == "binary":
+            return Response(
+                content=tile.astype("<f4").tobytes(),
+                media_type="application/octet-stream",
+                headers={"X-Tile-Size": str(tile_service.tile_size)}
+            )
+        
+        lat_min, lon_min, lat_max, lon_max = tile_bounds(z, x, y)
+        rounded = np.round(tile.astype(np.float64), 1)
+        return ORJSONResponse({
+            "z": z,
+            "x": x,
+            "y": y,
+            "tile_size": tile_service.tile_size,
+            "bounds": [lon_min, lat_min, lon_max, lat_max],
+            "temperatures": np.where(np.isnan(rounded), None, rounded).tolist()
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching heatmap tile: {str(e)}")
+
+async def _stream_history(header: Dict, buckets, next_from: Optional[str]) -> AsyncIterator[bytes]:
+    """Serialize a history page as one JSON document, one bucket per chunk"""
+    yield orjson.dumps(header)[:-1] + b',"buckets":['
+    first = True
+    async for bucket in buckets:
+        yield (b"" if first else b",") + orjson.dumps(bucket.to_dict())
+        first = False
+    yield b'],"next_from":' + orjson.dumps(next_from) + b"}"
 
+@router.get("/heatmap_history")
+async def get_heatmap_history(
+    from_: datetime = Query(..., alias="from"),
+    to: Optional[datetime] = None,
+    agg: str = Query("hourly", pattern="^(hourly|daily)$"),
+    grid_size: Optional[int] = Query(None, ge=2, le=500),
+    limit: int = Query(24, ge=1, le=1000)
+):
+    """
+    Get aggregated temperature rasters for a time range of recorded heatmaps.
+    Each hourly/daily bucket carries per-location mean/min/max temperatures.
+    Long ranges are paged: a page covers at most `limit` buckets and
+    `next_from` is the `from` of the next page (null on the last one).
+    Times without a timezone are taken as UTC.
+    """
+    history_store = get_history_store()
+    if history_store is None:
+        raise HTTPException(status_code=503, detail="Heatmap history is not enabled")
+    
+    end = to or datetime.now(timezone.utc)
+    if from_.tzinfo is None:
+        from_ = from_.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if from_ >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    
+    # Buckets have a fixed width, so a page is a bucket-aligned time window
+    unit = HISTORY_UNITS[agg][0]
+    page_end = min(end, to_datetime(to_datetime64(from_).astype(f"datetime64[{unit}]") + np.timedelta64(limit, unit)))
+    next_from = page_end.isoformat() if page_end < end else None
+    
+    header = {
+        "city": "Pune",
+        "agg": agg,
+        "from": from_.isoformat(),
+        "to": page_end.isoformat(),
+        "grid_size": grid_size
+    }
+    buckets = history_store.iter_aggregates("pune", from_, page_end, agg=agg, grid_size=grid_size)
+    return StreamingResponse(_stream_history(header, buckets, next_from), media_type="application/json")
+
+@router.get("/heatmap_cache_stats")
+async def get_heatmap_cache_stats() -> Dict:
+    """
+    Get heatmap cache hit/miss/refresh counters for monitoring.
+    """
+    stats = get_weather_service().get_cache_stats()
+    stats["precompute"] = get_precompute_scheduler().get_stats()
+    stats["tiles"] = get_tile_service().get_stats()
+    return stats
@@ -0,0 +1,35 @@
+"""
+Hotspot Clustering API Routes
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict
+from app.services.hotspot_service import get_hotspot_service
+from app.services.weather_service import get_weather_service
+from app.services.precompute_service import get_precompute_scheduler
+from app.utils.executor import run_cpu
+
+router = APIRouter()
+
+@router.get("/hotspots")
+async def get_hotspots(grid_size: int = Query(15, ge=2, le=500)) -> Dict:
+    """
+    Get K-Means hotspot zones for the current heatmap snapshot.
+    Clustering is computed once per heatmap version and shared with recommendations.
+    """
+    try:
+        snapshot = get_precompute_scheduler().get_snapshot(city="pune", grid_size=grid_size)
+        if snapshot is not None and snapshot.clustering is not None:
+            grid = snapshot.grid
+            clustering = snapshot.clustering
+        else:
+            grid = await get_weather_service().get_heatmap_grid_async(grid_size=grid_size)
+            clustering = await run_cpu(get_hotspot_service().get_clustering, grid)
+        
+        return {
+            "city": grid.metadata["city"],
+            "grid_size": grid.grid_size,
+            "version": clustering.version,
+            "zones": clustering.zone_list()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching hotspots: {str(e)}")
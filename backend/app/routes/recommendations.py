@@ -5,6 +5,9 @@ from fastapi import APIRouter, HTTPException
 from typing import List, Dict
 from app.services.recommendation_service import get_recommendation_service
 from app.services.weather_service import get_weather_service
+from app.services.hotspot_service import get_hotspot_service
+from app.services.precompute_service import get_precompute_scheduler
+from app.utils.executor import run_cpu
 
 router = APIRouter()
 
@@ -16,14 +19,22 @@ async def get_recommendations() -> List[Dict]:
     Optimized with smaller grid and caching.
     """
     try:
+        # Serve recommendations precomputed alongside the heatmap snapshot
+        snapshot = get_precompute_scheduler().get_snapshot(city="pune", grid_size=12)
+        if snapshot is not None:
+            return snapshot.recommendations
+        
         recommendation_service = get_recommendation_service()
         weather_service = get_weather_service()
         
         # Reduced grid size from 20 to 12 for faster response (144 points instead of 400)
-        heatmap_data = weather_service.get_heatmap_data(grid_size=12)
+        grid = await weather_service.get_heatmap_grid_async(grid_size=12)
+        clustering = await run_cpu(get_hotspot_service().get_clustering, grid)
         
-        # Generate recommendations
-        recommendations = recommendation_service.generate_recommendations(heatmap_data)
+        # Generate recommendations straight from the grid arrays
+        recommendations = await recommendation_service.generate_recommendations_async(
+            clustering=clustering, grid=grid
+        )
         
         return recommendations
     except Exception as e:
@@ -1,12 +1,21 @@
 """
 Simulation API Routes
 """
+import asyncio
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-from app.models.prediction import get_predictor
-from app.services.weather_service import get_weather_service
-from app.services.health_service import get_health_service
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from app.models.prediction import INTERVENTION_TYPES
+from app.services.weather_service import get_weather_service, estimate_air_quality
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.simulation_service import evaluate_scenario, evaluate_spatial_scenario, get_batch_simulation_service
+from app.services.simulation_cache import get_simulation_cache, scenario_key
+from app.services.session_service import get_session_store
+from app.services.portfolio_service import DEFAULT_TARGET_TEMPERATURE, candidate_sites, get_portfolio_optimizer
+from app.services.precompute_service import get_precompute_scheduler
+from app.utils.executor import run_cpu
 
 router = APIRouter()
 
@@ -28,47 +37,77 @@ class SimulationResponse(BaseModel):
     health_score: float
     intervention_count: int
 
-@router.post("/simulate_intervention", response_model=SimulationResponse)
-async def simulate_intervention(request: SimulationRequest) -> SimulationResponse:
+class BatchSimulationRequest(BaseModel):
+    scenarios: List[SimulationRequest]
+
+class SpatialSimulationRequest(BaseModel):
+    interventions: List[Intervention]
+    grid_size: int = Field(15, ge=2, le=500)
+    resolution: int = Field(256, ge=32, le=1024)  # cooling raster cells per side
+
+class CandidateSite(BaseModel):
+    location: List[float]  # [lat, lon]
+    base_temperature: Optional[float] = None
+
+class PortfolioRequest(BaseModel):
+    budget: float = Field(..., gt=0)  # INR
+    max_area: Optional[float] = Field(None, gt=0)  # m² of land/roof area across all sites
+    sites: Optional[List[CandidateSite]] = None  # defaults to the hottest cells of the heatmap
+    types: Optional[List[str]] = None  # defaults to all intervention types
+    target_temperature: float = DEFAULT_TARGET_TEMPERATURE
+    method: str = Field("auto", pattern="^(auto|greedy|exact)$")
+    grid_size: int = Field(15, ge=2, le=500)
+    max_sites: int = Field(5000, ge=1, le=50000)
+
+async def _current_grid(grid_size: int) -> HeatmapGrid:
+    """The precomputed Pune heatmap for a grid size, or a freshly loaded one"""
+    snapshot = get_precompute_scheduler().get_snapshot(city="pune", grid_size=grid_size)
+    if snapshot is not None:
+        return snapshot.grid
+    return await get_weather_service().get_heatmap_grid_async(grid_size=grid_size)
+
+async def _resolve_scenarios(scenarios: List[List[Intervention]]) -> List[Tuple[List[Dict], List[str]]]:
     """
-    Simulate the impact of interventions on UHI.
-    Returns predicted impact metrics.
+    Convert request interventions to dict format, filling in missing base
+    temperatures and air quality. All scenarios share one vectorized
+    temperature call for every distinct location without a base temperature.
+    Every simulation path (single, batch, sessions) resolves through here,
+    so the same scenario always gets the same base temperatures.
     """
-    try:
-        predictor = get_predictor()
-        weather_service = get_weather_service()
-        health_service = get_health_service()
-        
-        # Convert interventions to dict format
-        # Optimized: batch process weather data if needed
+    weather_service = get_weather_service()
+    
+    missing_locations = list(dict.fromkeys(
+        (round(intervention.location[0], 4), round(intervention.location[1], 4))
+        for scenario in scenarios
+        for intervention in scenario
+        if intervention.base_temperature is None
+    ))
+    weather_cache = {}
+    if missing_locations:
+        lats, lons = zip(*missing_locations)
+        temperatures = await weather_service.get_temperatures_async(lats, lons)
+        for loc_key, temperature in zip(missing_locations, temperatures.tolist()):
+            weather_cache[loc_key] = {
+                "temperature": temperature,
+                "air_quality": estimate_air_quality(temperature)
+            }
+    
+    resolved = []
+    for scenario in scenarios:
         interventions = []
-        base_temps = []
         air_qualities = []
         
-        # Cache weather lookups to avoid redundant calculations
-        weather_cache = {}
-        
-        for intervention in request.interventions:
+        for intervention in scenario:
             # Get base temperature and air quality for location if not provided
             base_temp = intervention.base_temperature
             air_quality = "moderate"
             
             if base_temp is None:
-                # Use cached location key to avoid redundant calculations
                 loc_key = (round(intervention.location[0], 4), round(intervention.location[1], 4))
-                if loc_key not in weather_cache:
-                    weather = weather_service.get_current_weather(
-                        intervention.location[0],
-                        intervention.location[1]
-                    )
-                    weather_cache[loc_key] = weather
-                else:
-                    weather = weather_cache[loc_key]
-                
+                weather = weather_cache[loc_key]
                 base_temp = weather["temperature"]
                 air_quality = weather["air_quality"]
             
-            base_temps.append(base_temp)
             air_qualities.append(air_quality)
             
             interventions.append({
@@ -78,23 +117,176 @@ async def simulate_intervention(request: SimulationRequest) -> SimulationRespons
                 "location": intervention.location,
                 "base_temperature": base_temp
             })
+        resolved.append((interventions, air_qualities))
+    
+    return resolved
+
+@router.post("/simulate_intervention", response_model=SimulationResponse)
+async def simulate_intervention(request: SimulationRequest) -> SimulationResponse:
+    """
+    Simulate the impact of interventions on UHI.
+    Returns predicted impact metrics.
+    """
+    try:
+        # Key on the resolved scenario, so a cached result always matches the
+        # base temperatures (and air quality) an uncached run would use
+        [(interventions, air_qualities)] = await _resolve_scenarios([request.interventions])
         
-        # Predict impact
-        impact = predictor.predict_intervention_impact(interventions)
+        async def compute() -> Dict:
+            return await run_cpu(evaluate_scenario, interventions, air_qualities)
         
-        # Calculate health score using health service
-        avg_temp = impact["average_temperature"]
-        avg_air_quality = max(set(air_qualities), key=air_qualities.count) if air_qualities else "moderate"
-        health_score = health_service.get_health_score(
-            temperature=avg_temp,
-            air_quality=avg_air_quality,
-            interventions=interventions
+        impact = await get_simulation_cache().get_or_compute_async(
+            scenario_key(interventions, air_qualities=air_qualities), compute
         )
-        
-        impact["health_score"] = health_score
-        
         return SimulationResponse(**impact)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error simulating intervention: {str(e)}")
 
+async def _session_contribution(intervention: Intervention) -> Dict:
+    """Resolve one intervention's base temperature and predict its contribution"""
+    [(interventions, air_qualities)] = await _resolve_scenarios([[intervention]])
+    return await run_cpu(get_session_store().contribution, interventions[0], air_qualities[0])
+
+@router.post("/simulation_sessions")
+async def create_simulation_session() -> Dict:
+    """
+    Start an incremental simulation session. Interventions are then added,
+    updated and removed one at a time; each edit costs O(1) and returns only
+    the metrics it changed.
+    """
+    session_id, metrics = await asyncio.to_thread(get_session_store().create)
+    return {"session_id": session_id, "version": 0, "metrics": metrics}
+
+@router.get("/simulation_sessions/{session_id}")
+async def get_simulation_session(session_id: str) -> Dict:
+    """Get a session's full metrics and interventions"""
+    try:
+        state = await asyncio.to_thread(get_session_store().get, session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"session_id": session_id, **state}
+
+@router.post("/simulation_sessions/{session_id}/interventions")
+async def add_session_intervention(session_id: str, intervention: Intervention) -> Dict:
+    """Add an intervention to a session; returns its id and the changed metrics"""
+    try:
+        contribution = await _session_contribution(intervention)
+        result = await asyncio.to_thread(get_session_store().add, session_id, contribution)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating simulation session: {str(e)}")
+    return {"session_id": session_id, **result}
+
+@router.put("/simulation_sessions/{session_id}/interventions/{intervention_id}")
+async def update_session_intervention(session_id: str, intervention_id: int, intervention: Intervention) -> Dict:
+    """Replace an intervention in a session; returns the changed metrics"""
+    try:
+        contribution = await _session_contribution(intervention)
+        result = await asyncio.to_thread(get_session_store().update, session_id, intervention_id, contribution)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating simulation session: {str(e)}")
+    return {"session_id": session_id, **result}
+
+@router.delete("/simulation_sessions/{session_id}/interventions/{intervention_id}")
+async def remove_session_intervention(session_id: str, intervention_id: int) -> Dict:
+    """Remove an intervention from a session; returns the changed metrics"""
+    try:
+        result = await asyncio.to_thread(get_session_store().remove, session_id, intervention_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"session_id": session_id, **result}
+
+@router.delete("/simulation_sessions/{session_id}")
+async def delete_simulation_session(session_id: str) -> Dict:
+    """End a session"""
+    if not await asyncio.to_thread(get_session_store().delete, session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown or expired simulation session {session_id}")
+    return {"session_id": session_id, "deleted": True}
+
+@router.get("/simulation_cache_stats")
+async def get_simulation_cache_stats() -> Dict:
+    """
+    Get simulation result cache hit/miss counters for monitoring.
+    """
+    return get_simulation_cache().get_stats()
+
+@router.post("/simulate_batch")
+async def simulate_batch(request: BatchSimulationRequest) -> StreamingResponse:
+    """
+    Simulate many intervention scenarios in parallel across worker processes.
+    Streams one NDJSON line per scenario, in input order, each tagged with
+    its `index`. Failed scenarios produce a line with an `error` field.
+    """
+    try:
+        scenarios = await _resolve_scenarios([scenario.interventions for scenario in request.scenarios])
+        batch_service = get_batch_simulation_service()
+        return StreamingResponse(batch_service.stream(scenarios), media_type="application/x-ndjson")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error simulating batch: {str(e)}")
 
+@router.post("/simulate_spatial")
+async def simulate_spatial(request: SpatialSimulationRequest) -> Dict:
+    """
+    Simulate interventions on the raster cooling model. Each intervention
+    cools its surroundings with a distance-decay footprint and overlapping
+    footprints saturate. Returns city-wide metrics and the cooled heatmap
+    (same GeoJSON shape as /heatmap_data).
+    """
+    try:
+        grid = await _current_grid(request.grid_size)
+        interventions = [
+            {
+                "type": intervention.type,
+                "count": intervention.count or 0,
+                "area": intervention.area or 0,
+                "location": intervention.location,
+                "base_temperature": intervention.base_temperature
+            }
+            for intervention in request.interventions
+        ]
+        result = await run_cpu(evaluate_spatial_scenario, interventions, grid, request.resolution)
+        heatmap = await run_cpu(result["grid"].to_geojson)
+        return {"metrics": result["metrics"], "heatmap": heatmap}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error simulating spatial impact: {str(e)}")
+
+@router.post("/optimize_portfolio")
+async def optimize_portfolio(request: PortfolioRequest) -> Dict:
+    """
+    Choose the mix of trees, cool roofs, parks and green roofs across
+    candidate sites that maximizes predicted cooling within the budget and
+    area limit. Without explicit sites, the hottest heatmap cells above the
+    target temperature are the candidates.
+    """
+    types = request.types or list(INTERVENTION_TYPES)
+    unknown = [name for name in types if name not in INTERVENTION_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown intervention types: {', '.join(unknown)}")
+    
+    try:
+        if request.sites is not None:
+            lats = np.array([site.location[0] for site in request.sites], dtype=np.float64)
+            lons = np.array([site.location[1] for site in request.sites], dtype=np.float64)
+            base_temps = np.array([
+                np.nan if site.base_temperature is None else site.base_temperature for site in request.sites
+            ], dtype=np.float64)
+            missing = np.isnan(base_temps)
+            if missing.any():
+                base_temps[missing] = await get_weather_service().get_temperatures_async(lats[missing], lons[missing])
+        else:
+            grid = await _current_grid(request.grid_size)
+            lats, lons, base_temps = candidate_sites(grid, request.max_sites, request.target_temperature)
+        
+        return await run_cpu(
+            get_portfolio_optimizer().optimize,
+            lats, lons, base_temps, request.budget,
+            max_area=request.max_area,
+            types=types,
+            target_temperature=request.target_temperature,
+            method=request.method
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error optimizing portfolio: {str(e)}")
@@ -0,0 +1,173 @@
+"""
+Raster cooling model: spatial spread and overlap of intervention impacts
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.utils.geo import EARTH_RADIUS_KM
+
+# Gaussian cooling footprint (sigma, metres) per intervention type code:
+# trees, cool_roof, park, green_roof, unknown. Parks cool well beyond their edge.
+COOLING_SIGMA_M = np.array([60.0, 80.0, 150.0, 80.0, 60.0])
+KERNEL_TRUNCATE = 3.0  # kernel radius in sigmas
+
+
+def gaussian_kernel_1d(sigma_cells: float) -> np.ndarray:
+    """Unit-peak 1D Gaussian; its outer product with itself is the 2D footprint"""
+    radius = max(1, int(np.ceil(KERNEL_TRUNCATE * sigma_cells)))
+    offsets = np.arange(-radius, radius + 1)
+    return np.exp(-0.5 * (offsets / max(sigma_cells, 1e-6)) ** 2)
+
+
+class CoolingRaster:
+    """
+    A regular lat/lon raster over a heatmap's extent, for spatial cooling.
+
+    Each intervention's predicted local reduction is splatted onto the raster
+    at its location and spread with its type's Gaussian footprint. The
+    footprint is separable, so every intervention of a type is applied with
+    two 1D convolutions over the whole raster, however many there are.
+    Overlapping footprints saturate: cooling approaches, but never exceeds,
+    a cell's headroom above the coolest part of the base heatmap.
+    """
+
+    def __init__(self, grid: HeatmapGrid, resolution: int = 256):
+        self.grid = grid
+        self.resolution = resolution
+        self.lat_min, self.lat_max = float(grid.lats.min()), float(grid.lats.max())
+        self.lon_min, self.lon_max = float(grid.lons.min()), float(grid.lons.max())
+        self.shape = (resolution, resolution)
+        self.cell_lat = (self.lat_max - self.lat_min) / (resolution - 1)
+        self.cell_lon = (self.lon_max - self.lon_min) / (resolution - 1)
+        cos_ref = np.cos(np.radians((self.lat_min + self.lat_max) / 2))
+        self.cell_y_m = np.radians(self.cell_lat) * EARTH_RADIUS_KM * 1000
+        self.cell_x_m = np.radians(self.cell_lon) * EARTH_RADIUS_KM * 1000 * cos_ref
+        self.cell_area_km2 = self.cell_y_m * self.cell_x_m / 1e6
+
+        self.base = self._interpolate_base()
+        # Nothing cools below the coolest part of the city
+        self.headroom = np.maximum(self.base - float(grid.temperatures.min()), 0.0)
+        self._kernels = [
+            (gaussian_kernel_1d(sigma / self.cell_y_m), gaussian_kernel_1d(sigma / self.cell_x_m))
+            for sigma in COOLING_SIGMA_M
+        ]
+
+    def _interpolate_base(self) -> np.ndarray:
+        """Bilinearly resample the (row-major, jittered) heatmap onto the raster"""
+        from scipy.ndimage import map_coordinates
+        size = self.grid.grid_size
+        temperatures = self.grid.temperatures.reshape(size, size)
+        # Nominal axes of the jittered grid: mean latitude per row, longitude per column
+        row_lats = self.grid.lats.reshape(size, size).mean(axis=1)
+        col_lons = self.grid.lons.reshape(size, size).mean(axis=0)
+        raster_lats = self.lat_min + np.arange(self.resolution) * self.cell_lat
+        raster_lons = self.lon_min + np.arange(self.resolution) * self.cell_lon
+        rows = np.interp(raster_lats, row_lats, np.arange(size))
+        cols = np.interp(raster_lons, col_lons, np.arange(size))
+        row_grid, col_grid = np.meshgrid(rows, cols, indexing="ij")
+        return map_coordinates(temperatures, [row_grid, col_grid], order=1, mode="nearest")
+
+    def _fractional_cells(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        rows = (np.asarray(lats, dtype=np.float64) - self.lat_min) / self.cell_lat
+        cols = (np.asarray(lons, dtype=np.float64) - self.lon_min) / self.cell_lon
+        return rows, cols
+
+    def sample(self, raster: np.ndarray, lats, lons) -> np.ndarray:
+        """Bilinear raster values at locations (edge values outside the raster)"""
+        from scipy.ndimage import map_coordinates
+        rows, cols = self._fractional_cells(lats, lons)
+        return map_coordinates(raster, [rows, cols], order=1, mode="nearest")
+
+    def _splat(self, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Distribute point weights onto the four surrounding cells (bilinear)"""
+        n_rows, n_cols = self.shape
+        inside = (rows >= 0) & (rows <= n_rows - 1) & (cols >= 0) & (cols <= n_cols - 1)
+        rows, cols, weights = rows[inside], cols[inside], weights[inside]
+        row0 = np.minimum(np.floor(rows).astype(np.intp), n_rows - 2)
+        col0 = np.minimum(np.floor(cols).astype(np.intp), n_cols - 2)
+        dr, dc = rows - row0, cols - col0
+        impulses = np.zeros(n_rows * n_cols)
+        for row_offset, col_offset, share in (
+            (0, 0, (1 - dr) * (1 - dc)), (0, 1, (1 - dr) * dc),
+            (1, 0, dr * (1 - dc)), (1, 1, dr * dc)
+        ):
+            flat = (row0 + row_offset) * n_cols + col0 + col_offset
+            impulses += np.bincount(flat, weights=weights * share, minlength=impulses.size)
+        return impulses.reshape(self.shape)
+
+    def cooling(self, type_codes: np.ndarray, lats, lons, reductions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cooling raster for interventions with the given local (peak) reductions.
+        Returns (saturated cooling, linear sum of footprints).
+        """
+        from scipy.ndimage import convolve1d
+        rows, cols = self._fractional_cells(lats, lons)
+        reductions = np.asarray(reductions, dtype=np.float64)
+        linear = np.zeros(self.shape)
+        for type_code in np.unique(type_codes):
+            selected = type_codes == type_code
+            impulses = self._splat(rows[selected], cols[selected], reductions[selected])
+            if not impulses.any():
+                continue
+            kernel_rows, kernel_cols = self._kernels[type_code]
+            spread = convolve1d(impulses, kernel_rows, axis=0, mode="constant")
+            linear += convolve1d(spread, kernel_cols, axis=1, mode="constant")
+
+        # Overlap saturates towards the headroom: H * (1 - exp(-S / H))
+        headroom = self.headroom
+        with np.errstate(divide="ignore", invalid="ignore"):
+            saturated = np.where(headroom > 0, headroom * -np.expm1(-linear / headroom), 0.0)
+        return saturated, linear
+
+    def hotspot_mask(self) -> np.ndarray:
+        """Raster cells as hot as the hotspots recommendations target"""
+        temperatures = self.grid.temperatures
+        threshold = temperatures.mean() + 0.3 * np.ptp(temperatures)
+        return self.base >= threshold
+
+    def apply(self, type_codes: np.ndarray, lats, lons, reductions: np.ndarray) -> Dict:
+        """Cooled heatmap (at the original grid points) plus raster-wide metrics"""
+        cooling, linear = self.cooling(type_codes, lats, lons, reductions)
+        grid = self.grid
+        new_grid = HeatmapGrid(
+            grid.lats, grid.lons,
+            np.round(grid.temperatures - self.sample(cooling, grid.lats, grid.lons), 2),
+            city=grid.city, center=grid.center, grid_size=grid.grid_size
+        )
+        hotspots = self.hotspot_mask()
+        linear_total = float(linear.sum())
+        return {
+            "grid": new_grid,
+            "base_average_temperature": float(self.base.mean()),
+            "average_temperature": float((self.base - cooling).mean()),
+            "temperature_reduction": float(cooling.mean()),
+            "peak_cooling": float(cooling.max()),
+            "hotspot_cooling": float(cooling[hotspots].mean()) if hotspots.any() else 0.0,
+            "cooled_area_km2": float((cooling >= 0.1).sum() * self.cell_area_km2),
+            # Share of the summed footprints lost to saturation (overlap, little headroom)
+            "saturation_loss": 1 - float(cooling.sum()) / linear_total if linear_total > 0 else 0.0
+        }
+
+
+# Base rasters are reused for every simulation against the same heatmap version
+_rasters: "OrderedDict[Tuple[int, int], CoolingRaster]" = OrderedDict()
+_rasters_lock = threading.Lock()
+MAX_RASTERS = 8
+
+
+def get_cooling_raster(grid: HeatmapGrid, resolution: int = 256) -> CoolingRaster:
+    """Cooling raster for a heatmap version, built once and memoized"""
+    key = (grid.version, resolution)
+    with _rasters_lock:
+        raster = _rasters.get(key)
+        if raster is not None:
+            _rasters.move_to_end(key)
+            return raster
+    raster = CoolingRaster(grid, resolution)
+    with _rasters_lock:
+        _rasters[key] = raster
+        while len(_rasters) > MAX_RASTERS:
+            _rasters.popitem(last=False)
+    return raster
@@ -1,6 +1,7 @@
 """
 Health Precautions Service based on real climate data
 """
+import math
 from typing import List, Dict
 from app.services.weather_service import get_weather_service
 
@@ -10,12 +11,25 @@ class HealthService:
     def __init__(self):
         self.weather_service = get_weather_service()
     
-    def get_health_precautions(self, lat: float = None, lon: float = None) -> List[Dict]:
+    def get_health_precautions(self, lat: float = None, lon: float = None,
+                               temperature: float = None) -> List[Dict]:
         """
         Get health precautions based on real-time weather conditions.
         Uses live climate data to generate contextual, location-aware advice.
+        A known temperature for the location (e.g. from a precomputed
+        heatmap) skips the temperature lookup.
         """
-        weather = self.weather_service.get_current_weather(lat, lon)
+        weather = self.weather_service.get_current_weather(lat, lon, temperature=temperature)
+        return self._precautions_for_weather(weather)
+    
+    async def get_health_precautions_async(self, lat: float = None, lon: float = None,
+                                           temperature: float = None) -> List[Dict]:
+        """Async variant of get_health_precautions; weather lookups don't block the event loop"""
+        weather = await self.weather_service.get_current_weather_async(lat, lon, temperature=temperature)
+        return self._precautions_for_weather(weather)
+    
+    def _precautions_for_weather(self, weather: Dict) -> List[Dict]:
+        """Build the precaution list for a weather reading"""
         temperature = weather["temperature"]
         air_quality = weather["air_quality"]
         humidity = weather["humidity"]
@@ -190,38 +204,49 @@ class HealthService:
         Calculate health score based on environmental conditions and interventions.
         Score ranges from 0-10.
         """
-        base_score = 5.0
-        
-        # Temperature impact
-        if temperature > 40:
-            base_score -= 2.5
-        elif temperature > 38:
-            base_score -= 1.5
-        elif temperature > 35:
-            base_score -= 0.5
-        elif temperature < 30:
-            base_score += 0.5
-        
-        # Air quality impact
-        if air_quality == "poor":
-            base_score -= 1.5
-        elif air_quality == "moderate":
-            base_score -= 0.5
-        elif air_quality == "good":
-            base_score += 0.5
-        
-        # Intervention impact
-        if interventions:
-            for intervention in interventions:
-                if intervention.get("type") == "trees":
-                    base_score += 0.1 * intervention.get("count", 0) / 10
-                elif intervention.get("type") == "park":
-                    base_score += 0.2 * (intervention.get("area", 0) / 1000)
-                elif intervention.get("type") in ["cool_roof", "green_roof"]:
-                    base_score += 0.15 * (intervention.get("area", 0) / 1000)
-        
-        # Ensure score is within 0-10 range
-        return max(0, min(10, round(base_score, 1)))
+        bonus = math.fsum(intervention_health_bonus(intervention) for intervention in interventions or [])
+        return health_score_from_bonus(temperature, air_quality, bonus)
+
+def intervention_health_bonus(intervention: Dict) -> float:
+    """One intervention's contribution to the health score"""
+    if intervention.get("type") == "trees":
+        return 0.1 * intervention.get("count", 0) / 10
+    elif intervention.get("type") == "park":
+        return 0.2 * (intervention.get("area", 0) / 1000)
+    elif intervention.get("type") in ["cool_roof", "green_roof"]:
+        return 0.15 * (intervention.get("area", 0) / 1000)
+    return 0.0
+
+def health_score_from_bonus(temperature: float, air_quality: str, bonus: float) -> float:
+    """
+    Health score from conditions and the summed intervention bonuses, so a
+    running bonus total can be rescored without revisiting interventions.
+    """
+    base_score = 5.0
+    
+    # Temperature impact
+    if temperature > 40:
+        base_score -= 2.5
+    elif temperature > 38:
+        base_score -= 1.5
+    elif temperature > 35:
+        base_score -= 0.5
+    elif temperature < 30:
+        base_score += 0.5
+    
+    # Air quality impact
+    if air_quality == "poor":
+        base_score -= 1.5
+    elif air_quality == "moderate":
+        base_score -= 0.5
+    elif air_quality == "good":
+        base_score += 0.5
+    
+    # Intervention impact
+    base_score += bonus
+    
+    # Ensure score is within 0-10 range
+    return max(0, min(10, round(base_score, 1)))
 
 # Singleton instance
 _health_service = None
@@ -0,0 +1,134 @@
+"""
+Array-backed heatmap grid with GeoJSON and streaming serialization
+"""
+import itertools
+import struct
+from typing import Dict, Iterator
+import numpy as np
+import orjson
+
+# Compact columnar format (all little-endian):
+#   magic "UHIH" | u16 version | u16 n_columns | u32 n_points | u32 grid_size | u32 metadata_len
+#   metadata JSON (space-padded to a 4-byte boundary)
+#   float32 lat[n_points] | float32 lon[n_points] | float32 temperature[n_points]
+BINARY_MAGIC = b"UHIH"
+BINARY_VERSION = 1
+BINARY_MEDIA_TYPE = "application/vnd.uhi.heatmap+octet-stream"
+_BINARY_HEADER = struct.Struct("<4sHHIII")
+
+# Grids above this many points are streamed rather than encoded in one buffer,
+# and their encoded GeoJSON is never kept on the grid
+STREAM_MIN_POINTS = 10000
+
+# Every generated grid gets a process-unique version, so results derived
+# from it (clustering, recommendations) can be memoized per data refresh
+_grid_versions = itertools.count(1)
+
+
+class HeatmapGrid:
+    """
+    Heatmap points stored as flat NumPy arrays.
+
+    This is the form kept in caches and snapshots. GeoJSON is only built on
+    demand and never kept as a dict; small grids memoize the encoded bytes,
+    and large grids are streamed in bounded chunks straight from the arrays.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, temperatures: np.ndarray,
+                 city: str, center: tuple, grid_size: int):
+        self.lats = lats
+        self.lons = lons
+        self.temperatures = temperatures
+        self.city = city
+        self.center = center  # (lat, lon)
+        self.grid_size = grid_size
+        self.version = next(_grid_versions)
+        self.metadata = self._compute_metadata()
+        self._geojson_bytes = None
+        self._binary = None
+
+    def __len__(self) -> int:
+        return len(self.temperatures)
+
+    def _compute_metadata(self) -> Dict:
+        """Summary statistics straight from the temperature array"""
+        temperatures = self.temperatures
+        return {
+            "city": self.city.title(),
+            "center": [self.center[1], self.center[0]],
+            "total_points": len(temperatures),
+            "avg_temperature": round(float(temperatures.mean()), 1),
+            "max_temperature": round(float(temperatures.max()), 1),
+            "min_temperature": round(float(temperatures.min()), 1)
+        }
+
+    def _features(self, start: int, stop: int) -> list:
+        """Feature dicts for a slice of the grid"""
+        lats = self.lats[start:stop].tolist()
+        lons = self.lons[start:stop].tolist()
+        temperatures = self.temperatures[start:stop].tolist()
+        return [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [lon, lat]
+                },
+                "properties": {
+                    "temperature": temperature,
+                    "lat": lat,
+                    "lon": lon
+                }
+            }
+            for lat, lon, temperature in zip(lats, lons, temperatures)
+        ]
+
+    def to_geojson(self) -> Dict:
+        """GeoJSON FeatureCollection dict (built per call, not kept)"""
+        return {
+            "type": "FeatureCollection",
+            "features": self._features(0, len(self)),
+            "metadata": self.metadata
+        }
+
+    def to_geojson_bytes(self) -> bytes:
+        """
+        GeoJSON FeatureCollection encoded with orjson, chunk by chunk, so no
+        full feature dict list ever exists. Memoized for grids below
+        STREAM_MIN_POINTS only.
+        """
+        if self._geojson_bytes is not None:
+            return self._geojson_bytes
+        encoded = b"".join(self.iter_geojson())
+        if len(self) < STREAM_MIN_POINTS:
+            self._geojson_bytes = encoded
+        return encoded
+
+    def to_binary(self) -> bytes:
+        """
+        Compact columnar float32 encoding (see BINARY_MAGIC layout above).
+        Encoded once per grid; every later request reuses the same buffer.
+        Columns start 4-byte aligned so clients can view them without copying.
+        """
+        if self._binary is None:
+            metadata = orjson.dumps(self.metadata)
+            metadata += b" " * (-(len(metadata) + _BINARY_HEADER.size) % 4)
+            header = _BINARY_HEADER.pack(
+                BINARY_MAGIC, BINARY_VERSION, 3, len(self), self.grid_size, len(metadata)
+            )
+            columns = np.stack([self.lats, self.lons, self.temperatures]).astype("<f4")
+            self._binary = header + metadata + columns.tobytes()
+        return self._binary
+
+    def iter_geojson(self, chunk_size: int = 4096) -> Iterator[bytes]:
+        """
+        Serialize the FeatureCollection as a stream of JSON byte chunks.
+        Only `chunk_size` feature dicts exist at any time, so peak memory is
+        bounded regardless of grid size.
+        """
+        yield b'{"type":"FeatureCollection","metadata":' + orjson.dumps(self.metadata) + b',"features":['
+        for start in range(0, len(self), chunk_size):
+            # orjson encodes the chunk as a JSON array; strip its brackets
+            body = orjson.dumps(self._features(start, start + chunk_size))[1:-1]
+            yield (b"," + body) if start else body
+        yield b"]}"
@@ -0,0 +1,402 @@
+"""
+Historical heatmap temperature store (MongoDB time series or in-memory)
+"""
+import os
+from datetime import datetime, timezone
+from itertools import chain
+from operator import itemgetter
+from typing import AsyncIterator, Dict, List, Optional
+import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.utils.rng import coordinate_keys
+
+# Aggregation granularity -> (NumPy datetime64 unit, MongoDB $dateTrunc unit)
+HISTORY_UNITS = {"hourly": ("h", "hour"), "daily": ("D", "day")}
+
+# Flat reading fields projected by MongoHistoryStore.iter_readings (timestamp as epoch ms)
+_READING_FIELDS = ("timestamp_ms", "lat", "lon", "temperature")
+_reading_values = itemgetter(*_READING_FIELDS)
+
+
+def to_datetime(value: np.datetime64) -> datetime:
+    """UTC datetime for a NumPy datetime64"""
+    return value.astype("datetime64[ms]").astype(datetime).replace(tzinfo=timezone.utc)
+
+
+def to_datetime64(value: datetime, unit: str = "ms") -> np.datetime64:
+    """NumPy datetime64 (UTC) for a datetime; naive datetimes are taken as UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, unit)
+
+
+class HistoryBucket:
+    """Per-location temperature aggregate (a raster) for one time bucket"""
+
+    def __init__(self, start: np.datetime64, lats: np.ndarray, lons: np.ndarray, mean: np.ndarray,
+                 minimum: np.ndarray, maximum: np.ndarray, counts: np.ndarray):
+        self.start = start
+        self.lats = lats
+        self.lons = lons
+        self.mean = mean
+        self.minimum = minimum
+        self.maximum = maximum
+        self.counts = counts
+
+    def to_dict(self) -> Dict:
+        samples = int(self.counts.sum())
+        return {
+            "start": to_datetime(self.start).isoformat(),
+            "points": len(self.mean),
+            "samples": samples,
+            "avg_temperature": round(float((self.mean * self.counts).sum() / samples), 2),
+            "max_temperature": round(float(self.maximum.max()), 2),
+            "min_temperature": round(float(self.minimum.min()), 2),
+            "lat": self.lats.tolist(),
+            "lon": self.lons.tolist(),
+            "temperature": self.mean.round(2).tolist(),
+            "temperature_min": self.minimum.round(2).tolist(),
+            "temperature_max": self.maximum.round(2).tolist(),
+            "samples_per_point": self.counts.tolist()
+        }
+
+
+def _combine_partials(partials: List[tuple]) -> tuple:
+    """
+    Merge partial per-location aggregates
+    (keys, lat_sum, lon_sum, temp_sum, count, temp_min, temp_max) with one
+    unique/bincount pass. A single partial still goes through the pass,
+    since raw reading batches can repeat a location.
+    """
+    keys, lat_sum, lon_sum, temp_sum, count, temp_min, temp_max = (
+        np.concatenate(column) for column in zip(*partials)
+    )
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    n = len(unique_keys)
+    minimum = np.full(n, np.inf)
+    maximum = np.full(n, -np.inf)
+    np.minimum.at(minimum, inverse, temp_min)
+    np.maximum.at(maximum, inverse, temp_max)
+    return (
+        unique_keys,
+        np.bincount(inverse, weights=lat_sum, minlength=n),
+        np.bincount(inverse, weights=lon_sum, minlength=n),
+        np.bincount(inverse, weights=temp_sum, minlength=n),
+        np.bincount(inverse, weights=count, minlength=n),
+        minimum,
+        maximum
+    )
+
+
+def _finish_bucket(start: np.datetime64, partials: List[tuple]) -> HistoryBucket:
+    _, lat_sum, lon_sum, temp_sum, count, minimum, maximum = _combine_partials(partials)
+    return HistoryBucket(start, lat_sum / count, lon_sum / count, temp_sum / count,
+                         minimum, maximum, count.astype(np.int64))
+
+
+async def aggregate_batches(batches: AsyncIterator[Dict[str, np.ndarray]],
+                            unit: str) -> AsyncIterator[HistoryBucket]:
+    """
+    Vectorized time-bucket aggregation over time-ordered reading batches.
+    Each bucket is emitted as soon as a later one starts, and its partial
+    results are compacted as batches arrive, so memory stays bounded by one
+    bucket's locations rather than the length of the range.
+    """
+    open_bucket = None
+    partials: List[tuple] = []
+    async for batch in batches:
+        buckets = batch["timestamp"].astype(f"datetime64[{unit}]")
+        keys = coordinate_keys(batch["lat"], batch["lon"], scale=1e6)
+        # Batches are sorted by time, so each bucket is one contiguous run
+        starts = np.concatenate([[0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1, [len(buckets)]])
+        for begin, stop in zip(starts[:-1], starts[1:]):
+            bucket = buckets[begin]
+            if open_bucket is not None and bucket != open_bucket:
+                yield _finish_bucket(open_bucket, partials)
+                partials = []
+            open_bucket = bucket
+            temperatures = batch["temperature"][begin:stop]
+            partials.append((
+                keys[begin:stop], batch["lat"][begin:stop], batch["lon"][begin:stop], temperatures,
+                np.ones(stop - begin), temperatures, temperatures
+            ))
+            if len(partials) >= 8:
+                partials = [_combine_partials(partials)]
+    if open_bucket is not None:
+        yield _finish_bucket(open_bucket, partials)
+
+
+class InMemoryHistoryStore:
+    """
+    Process-local stand-in for the MongoDB store, with the same interface.
+    Each snapshot is kept as NumPy columns; useful for tests and local runs.
+    """
+
+    def __init__(self):
+        self._snapshots: List[Dict] = []
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def insert_snapshot(self, grid: HeatmapGrid, timestamp: datetime = None) -> int:
+        """Record every point of a heatmap grid; returns the number of readings stored"""
+        self._snapshots.append({
+            "timestamp": timestamp or datetime.now(timezone.utc),
+            "city": grid.city,
+            "grid_size": grid.grid_size,
+            "lat": np.array(grid.lats, dtype=np.float64),
+            "lon": np.array(grid.lons, dtype=np.float64),
+            "temperature": np.array(grid.temperatures, dtype=np.float64)
+        })
+        return len(grid)
+
+    async def iter_readings(self, city: str, start: datetime, end: datetime,
+                            grid_size: Optional[int] = None,
+                            batch_size: int = 10000) -> AsyncIterator[Dict[str, np.ndarray]]:
+        """
+        Readings for a city with start <= timestamp < end, oldest first, as
+        column batches: timestamp (datetime64[ms], UTC), lat, lon, temperature.
+        """
+        snapshots = sorted(
+            (s for s in self._snapshots
+             if s["city"] == city and start <= s["timestamp"] < end
+             and (grid_size is None or s["grid_size"] == grid_size)),
+            key=lambda s: s["timestamp"]
+        )
+        for snapshot in snapshots:
+            stamp = to_datetime64(snapshot["timestamp"])
+            for offset in range(0, len(snapshot["temperature"]), batch_size):
+                temperatures = snapshot["temperature"][offset:offset + batch_size]
+                yield {
+                    "timestamp": np.full(len(temperatures), stamp),
+                    "lat": snapshot["lat"][offset:offset + batch_size],
+                    "lon": snapshot["lon"][offset:offset + batch_size],
+                    "temperature": temperatures
+                }
+
+    async def iter_aggregates(self, city: str, start: datetime, end: datetime, agg: str = "hourly",
+                              grid_size: Optional[int] = None) -> AsyncIterator[HistoryBucket]:
+        """Per-location temperature rasters per hour/day bucket, aggregated with NumPy"""
+        unit = HISTORY_UNITS[agg][0]
+        async for bucket in aggregate_batches(self.iter_readings(city, start, end, grid_size), unit):
+            yield bucket
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "snapshots": len(self._snapshots),
+            "readings": sum(len(s["temperature"]) for s in self._snapshots)
+        }
+
+
+class MongoHistoryStore:
+    """
+    Heatmap readings in a MongoDB time-series collection.
+
+    One document per grid point, bucketed by MongoDB on (meta, timestamp):
+    meta holds city and grid size, location is a GeoJSON point. The client
+    (and its connection pool) is created once by connect() at startup;
+    snapshots are written with unordered bulk inserts.
+    """
+
+    def __init__(self, uri: str, database: str, collection: str = "heatmap_readings",
+                 max_pool_size: int = 20, insert_batch_size: int = 5000,
+                 retention_days: Optional[int] = None):
+        self.uri = uri
+        self.database_name = database
+        self.collection_name = collection
+        self.max_pool_size = max_pool_size
+        self.insert_batch_size = insert_batch_size
+        self.retention_days = retention_days
+        self._client = None
+        self._collection = None
+        self.readings_inserted = 0
+
+    async def connect(self):
+        """Create the pooled client and make sure the collection and indexes exist"""
+        if self._client is not None:
+            return
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self._client = AsyncIOMotorClient(
+            self.uri,
+            maxPoolSize=self.max_pool_size,
+            tz_aware=True,
+            serverSelectionTimeoutMS=5000
+        )
+        try:
+            await self._ensure_collection()
+        except Exception:
+            await self.close()
+            raise
+
+    async def _ensure_collection(self):
+        database = self._client[self.database_name]
+        if self.collection_name not in await database.list_collection_names():
+            options = {}
+            if self.retention_days:
+                options["expireAfterSeconds"] = self.retention_days * 86400
+            await database.create_collection(
+                self.collection_name,
+                timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "minutes"},
+                **options
+            )
+        self._collection = database[self.collection_name]
+        # Trend queries filter by city/grid over a time range; spatial ones by area over time
+        await self._collection.create_index([("meta.city", 1), ("meta.grid_size", 1), ("timestamp", 1)])
+        await self._collection.create_index([("location", "2dsphere"), ("timestamp", 1)])
+
+    async def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._collection = None
+
+    async def insert_snapshot(self, grid: HeatmapGrid, timestamp: datetime = None) -> int:
+        """Bulk-insert every point of a heatmap grid; returns the number of readings stored"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        meta = {"city": grid.city, "grid_size": grid.grid_size}
+        lats = grid.lats.tolist()
+        lons = grid.lons.tolist()
+        temperatures = grid.temperatures.tolist()
+
+        inserted = 0
+        for offset in range(0, len(temperatures), self.insert_batch_size):
+            documents = [
+                {
+                    "timestamp": timestamp,
+                    "meta": meta,
+                    "location": {"type": "Point", "coordinates": [lon, lat]},
+                    "temperature": temperature
+                }
+                for lat, lon, temperature in zip(
+                    lats[offset:offset + self.insert_batch_size],
+                    lons[offset:offset + self.insert_batch_size],
+                    temperatures[offset:offset + self.insert_batch_size]
+                )
+            ]
+            result = await self._collection.insert_many(documents, ordered=False)
+            inserted += len(result.inserted_ids)
+        self.readings_inserted += inserted
+        return inserted
+
+    async def iter_readings(self, city: str, start: datetime, end: datetime,
+                            grid_size: Optional[int] = None,
+                            batch_size: int = 10000) -> AsyncIterator[Dict[str, np.ndarray]]:
+        """
+        Readings for a city with start <= timestamp < end, oldest first, as
+        column batches: timestamp (datetime64[ms], UTC), lat, lon, temperature.
+        Fields are projected flat by the server (epoch milliseconds, lat and
+        lon pulled out of location.coordinates), so each batch is decoded
+        into one float64 block with a single np.fromiter pass.
+        """
+        query = {"meta.city": city, "timestamp": {"$gte": start, "$lt": end}}
+        if grid_size is not None:
+            query["meta.grid_size"] = grid_size
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"timestamp": 1}},
+            {"$project": {
+                "_id": 0,
+                "timestamp_ms": {"$toLong": "$timestamp"},
+                "lon": {"$arrayElemAt": ["$location.coordinates", 0]},
+                "lat": {"$arrayElemAt": ["$location.coordinates", 1]},
+                "temperature": 1
+            }}
+        ]
+        cursor = self._collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+        while True:
+            documents = await cursor.to_list(length=batch_size)
+            if not documents:
+                break
+            n_fields = len(_READING_FIELDS)
+            columns = np.fromiter(
+                chain.from_iterable(map(_reading_values, documents)),
+                dtype=np.float64, count=len(documents) * n_fields
+            ).reshape(len(documents), n_fields)
+            yield {
+                "timestamp": columns[:, 0].astype(np.int64).astype("datetime64[ms]"),
+                "lat": columns[:, 1].copy(),
+                "lon": columns[:, 2].copy(),
+                "temperature": columns[:, 3].copy()
+            }
+
+    async def iter_aggregates(self, city: str, start: datetime, end: datetime, agg: str = "hourly",
+                              grid_size: Optional[int] = None,
+                              batch_size: int = 10000) -> AsyncIterator[HistoryBucket]:
+        """
+        Per-location temperature rasters per hour/day bucket. MongoDB does the
+        grouping ($dateTrunc + $group); only one row per bucket and location
+        comes back, and consecutive rows are packed into arrays per bucket.
+        """
+        query = {"meta.city": city, "timestamp": {"$gte": start, "$lt": end}}
+        if grid_size is not None:
+            query["meta.grid_size"] = grid_size
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": {
+                    "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": HISTORY_UNITS[agg][1]}},
+                    "coordinates": "$location.coordinates"
+                },
+                "mean": {"$avg": "$temperature"},
+                "min": {"$min": "$temperature"},
+                "max": {"$max": "$temperature"},
+                "count": {"$sum": 1}
+            }},
+            {"$sort": {"_id.bucket": 1}}
+        ]
+        cursor = self._collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+        current, rows = None, []
+        async for document in cursor:
+            bucket = to_datetime64(document["_id"]["bucket"])
+            if current is not None and bucket != current:
+                yield self._bucket_from_rows(current, rows)
+                rows = []
+            current = bucket
+            lon, lat = document["_id"]["coordinates"]
+            rows.append((lat, lon, document["mean"], document["min"], document["max"], document["count"]))
+        if current is not None:
+            yield self._bucket_from_rows(current, rows)
+
+    @staticmethod
+    def _bucket_from_rows(start: np.datetime64, rows: List[tuple]) -> HistoryBucket:
+        columns = np.array(rows, dtype=np.float64)
+        return HistoryBucket(start, columns[:, 0], columns[:, 1], columns[:, 2],
+                             columns[:, 3], columns[:, 4], columns[:, 5].astype(np.int64))
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": "mongodb",
+            "connected": self._client is not None,
+            "collection": f"{self.database_name}.{self.collection_name}",
+            "readings_inserted": self.readings_inserted
+        }
+
+
+# Singleton instance
+_history_store = None
+
+def get_history_store():
+    """
+    Get the history store singleton, or None when HISTORY_ENABLED isn't true.
+    HISTORY_BACKEND selects mongodb (default) or memory.
+    """
+    global _history_store
+    if _history_store is None and os.getenv("HISTORY_ENABLED", "false").lower() == "true":
+        if os.getenv("HISTORY_BACKEND", "mongodb").lower() == "memory":
+            _history_store = InMemoryHistoryStore()
+        else:
+            retention = os.getenv("HISTORY_RETENTION_DAYS")
+            _history_store = MongoHistoryStore(
+                uri=os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+                database=os.getenv("MONGODB_DB", "uhi_db"),
+                max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", 20)),
+                retention_days=int(retention) if retention else None
+            )
+    return _history_store
@@ -0,0 +1,69 @@
+"""
+Hotspot clustering service memoized per heatmap version
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from app.models.clustering import UHIClusterer
+from app.services.heatmap_grid import HeatmapGrid
+
+
+class HotspotClustering:
+    """Cluster zones and per-point labels for one heatmap version"""
+
+    def __init__(self, version: int, zones: Dict, labels: np.ndarray):
+        self.version = version
+        self.zones = zones
+        self.labels = labels
+
+    def zone_list(self) -> List[Dict]:
+        """Zones ordered by cluster id"""
+        return [self.zones[cluster_id] for cluster_id in sorted(self.zones)]
+
+
+class HotspotService:
+    """
+    Clusters each heatmap version exactly once.
+
+    Every (city, grid_size) series keeps its own incremental clusterer, so a
+    refresh warm-starts from that series' previous centroids, and the result
+    is shared by the /hotspots endpoint and recommendation generation.
+    """
+
+    def __init__(self, n_clusters: int = 5, max_versions: int = 16):
+        self.n_clusters = n_clusters
+        self.max_versions = max_versions
+        self._clusterers: Dict[Tuple[str, int], UHIClusterer] = {}
+        self._memo: "OrderedDict[int, HotspotClustering]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_clustering(self, grid: HeatmapGrid) -> HotspotClustering:
+        """Cluster zones for a heatmap grid, computed once per grid version"""
+        with self._lock:
+            cached = self._memo.get(grid.version)
+            if cached is not None:
+                return cached
+
+            series = (grid.city, grid.grid_size)
+            clusterer = self._clusterers.get(series)
+            if clusterer is None:
+                clusterer = UHIClusterer(n_clusters=self.n_clusters, incremental=True)
+                self._clusterers[series] = clusterer
+
+            zones = clusterer.update(grid.lats, grid.lons, grid.temperatures)
+            clustering = HotspotClustering(grid.version, zones, clusterer.model.labels_)
+            self._memo[grid.version] = clustering
+            while len(self._memo) > self.max_versions:
+                self._memo.popitem(last=False)
+            return clustering
+
+# Singleton instance
+_hotspot_service = None
+
+def get_hotspot_service() -> HotspotService:
+    """Get singleton hotspot service instance"""
+    global _hotspot_service
+    if _hotspot_service is None:
+        _hotspot_service = HotspotService()
+    return _hotspot_service
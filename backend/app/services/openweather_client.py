@@ -0,0 +1,259 @@
+"""
+Concurrent OpenWeatherMap client with connection pooling and request coalescing
+"""
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.geo import haversine_km
+
+if TYPE_CHECKING:
+    import httpx
+
+# Box endpoint responses meaning "not available for this key/plan"; any other
+# failure (timeout, 429, 5xx) only pauses the endpoint with exponential backoff
+BOX_UNSUPPORTED_STATUSES = (401, 403, 404)
+BOX_BACKOFF_INITIAL = 30.0
+BOX_BACKOFF_MAX = 600.0
+
+
+class OpenWeatherClient:
+    """
+    Async OpenWeatherMap fetch layer.
+
+    All requests run on a dedicated event loop thread that owns one pooled
+    httpx.AsyncClient, so both sync code and async FastAPI handlers can share
+    the same connection pool and in-flight lookups without blocking the
+    caller's event loop.
+
+    Points are snapped to `cell_size` degree cells before lookup; concurrent
+    lookups for the same cell are coalesced into a single request. When the
+    box endpoint is available, one request covers the whole bounding box and
+    only cells without a nearby station fall back to per-cell requests.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        max_concurrency: int = 8,
+        timeout: float = 5.0,
+        cell_size: float = 0.05,
+        box_zoom: int = 12
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cell_size = cell_size
+        self.box_zoom = box_zoom
+        # Stations further than one cell diagonal away don't represent a cell
+        self.station_radius_km = cell_size * 111.0 * 1.5
+
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._client = None
+        self._semaphore = None
+        self._inflight: Dict[Tuple[float, float], asyncio.Future] = {}
+        self._box_supported = True
+        self._box_retry_at = 0.0
+        self._box_backoff = BOX_BACKOFF_INITIAL
+
+        # Monitoring counters
+        self.requests_made = 0
+        self.coalesced_lookups = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the client's event loop thread on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="openweather-client",
+                    daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                self._thread = thread
+        return self._loop
+
+    def _submit(self, coro):
+        """Schedule a coroutine on the client loop and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def fetch_temperatures(self, lats, lons) -> np.ndarray:
+        """Blocking batch lookup. Returns NaN for points that could not be fetched."""
+        return self._submit(self._fetch_all(lats, lons)).result()
+
+    async def fetch_temperatures_async(self, lats, lons) -> np.ndarray:
+        """Non-blocking batch lookup for use inside async handlers"""
+        return await asyncio.wrap_future(self._submit(self._fetch_all(lats, lons)))
+
+    def close(self):
+        """Close the pooled HTTP session and stop the loop thread"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=self.timeout)
+        loop.close()
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Create the pooled session lazily on the client loop"""
+        if self._client is None:
+            import httpx
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _get(self, path: str, params: Dict) -> Tuple[Optional[int], Optional[Dict]]:
+        """GET a JSON document as (status code, document); (None, None) on transport errors"""
+        import httpx
+        client = self._get_client()
+        params = dict(params, appid=self.api_key, units="metric")
+        async with self._semaphore:
+            self.requests_made += 1
+            try:
+                response = await client.get(f"{self.base_url}/{path}", params=params)
+            except httpx.HTTPError as e:
+                print(f"Error fetching weather data: {e}")
+                return None, None
+        if response.status_code != 200:
+            return response.status_code, None
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            # Invalid or truncated body: handled like any other failed request
+            return response.status_code, None
+
+    async def _request(self, path: str, params: Dict) -> Optional[Dict]:
+        """GET a JSON document, returning None on any failure"""
+        _, data = await self._get(path, params)
+        return data
+
+    def _cell_key(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a coordinate to the centre of its lookup cell"""
+        return (
+            round(round(lat / self.cell_size) * self.cell_size, 6),
+            round(round(lon / self.cell_size) * self.cell_size, 6)
+        )
+
+    async def _fetch_all(self, lats, lons) -> np.ndarray:
+        """Resolve temperatures for every point using as few requests as possible"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        point_keys = [self._cell_key(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+        cells = list(dict.fromkeys(point_keys))
+
+        cell_temps: Dict[Tuple[float, float], float] = {}
+        if len(cells) > 1 and self._box_available():
+            cell_temps.update(await self._fetch_box_cells(cells))
+
+        remaining = [cell for cell in cells if cell not in cell_temps]
+        if remaining:
+            results = await asyncio.gather(*(self._fetch_cell(cell) for cell in remaining))
+            cell_temps.update(zip(remaining, results))
+
+        return np.array([
+            np.nan if cell_temps.get(key) is None else cell_temps[key]
+            for key in point_keys
+        ], dtype=np.float64)
+
+    def _box_available(self) -> bool:
+        """Box endpoint is supported and not backing off after a transient failure"""
+        return self._box_supported and time.monotonic() >= self._box_retry_at
+
+    async def _fetch_box_cells(self, cells: List[Tuple[float, float]]) -> Dict[Tuple[float, float], float]:
+        """
+        Fetch every station inside the cells' bounding box in one request and
+        assign each cell the temperature of its nearest station.
+        """
+        cell_array = np.array(cells)
+        pad = self.cell_size / 2
+        bbox = "{},{},{},{},{}".format(
+            cell_array[:, 1].min() - pad, cell_array[:, 0].min() - pad,
+            cell_array[:, 1].max() + pad, cell_array[:, 0].max() + pad,
+            self.box_zoom
+        )
+        status, data = await self._get("box/city", {"bbox": bbox})
+        if data is None:
+            if status in BOX_UNSUPPORTED_STATUSES:
+                # Endpoint unavailable for this key/plan; don't retry on every call
+                self._box_supported = False
+            else:
+                # Transient (timeout, rate limit, server error): retry after a backoff
+                self._box_retry_at = time.monotonic() + self._box_backoff
+                self._box_backoff = min(self._box_backoff * 2, BOX_BACKOFF_MAX)
+            return {}
+        self._box_backoff = BOX_BACKOFF_INITIAL
+
+        stations = []
+        for item in data.get("list", []):
+            coord = item.get("coord", {})
+            lat = coord.get("Lat", coord.get("lat"))
+            lon = coord.get("Lon", coord.get("lon"))
+            temp = item.get("main", {}).get("temp")
+            if lat is not None and lon is not None and temp is not None:
+                stations.append((lat, lon, temp))
+        if not stations:
+            return {}
+
+        station_array = np.array(stations, dtype=np.float64)
+        distances = haversine_km(
+            cell_array[:, 0:1], cell_array[:, 1:2],
+            station_array[:, 0], station_array[:, 1]
+        )
+        nearest = np.argmin(distances, axis=1)
+        nearest_distance = distances[np.arange(len(cells)), nearest]
+
+        return {
+            cell: float(station_array[station, 2])
+            for cell, station, distance in zip(cells, nearest.tolist(), nearest_distance.tolist())
+            if distance <= self.station_radius_km
+        }
+
+    async def _fetch_cell(self, key: Tuple[float, float]) -> Optional[float]:
+        """Fetch one cell, joining an in-flight request for the same cell if any"""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced_lookups += 1
+            # Shielded: a cancelled waiter must not cancel the shared lookup
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._request("weather", {"lat": key[0], "lon": key[1]})
+            temperature = data["main"]["temp"] if data and "main" in data else None
+            future.set_result(temperature)
+            return temperature
+        except Exception as e:
+            future.set_result(None)
+            print(f"Error fetching weather data: {e}")
+            return None
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # The leading lookup was cancelled; waiters treat it as a failed lookup
+                future.set_result(None)
+
+    def get_stats(self) -> Dict:
+        """Request counters for monitoring"""
+        return {
+            "requests_made": self.requests_made,
+            "coalesced_lookups": self.coalesced_lookups,
+            "box_endpoint_enabled": self._box_supported,
+            "box_endpoint_backing_off": self._box_supported and not self._box_available(),
+            "max_concurrency": self.max_concurrency
+        }
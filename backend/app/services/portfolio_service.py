@@ -0,0 +1,402 @@
+"""
+Intervention portfolio optimization under budget and area constraints
+"""
+import heapq
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.models.prediction import (
+    INTERVENTION_DTYPE, INTERVENTION_TYPES, TYPE_CODES, get_predictor, interventions_to_array
+)
+from app.services.health_service import get_health_service
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.weather_service import estimate_air_quality
+
+# Sizing options per intervention type:
+#   size field, cost per unit (INR per tree / per m²), land or roof area per unit (m²), size levels
+INTERVENTION_OPTIONS = {
+    "trees": ("count", 2500.0, 10.0, (10, 20, 30, 40, 60, 80)),
+    "cool_roof": ("area", 600.0, 1.0, (200, 400, 600, 800, 1200, 1600)),
+    "park": ("area", 3000.0, 1.0, (500, 1000, 1500, 2000, 3000, 4000)),
+    "green_roof": ("area", 4500.0, 1.0, (200, 400, 600, 800, 1200, 1600)),
+}
+N_LEVELS = 6  # size levels per type; level 0 means "not built"
+
+# Sites cool towards this temperature; cooling beyond a site's headroom earns nothing
+DEFAULT_TARGET_TEMPERATURE = 30.0
+MIN_HEADROOM = 0.5
+# Instances up to this many sites are solved exactly (ILP) in "auto" mode
+EXACT_MAX_SITES = 20
+EXACT_TIME_LIMIT = 5.0
+
+
+def option_tables(types: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(sizes, costs, areas), each (n_types, N_LEVELS + 1) with a zero "not built" level"""
+    sizes = np.zeros((len(types), N_LEVELS + 1))
+    costs = np.zeros_like(sizes)
+    areas = np.zeros_like(sizes)
+    for row, name in enumerate(types):
+        _, unit_cost, unit_area, levels = INTERVENTION_OPTIONS[name]
+        sizes[row, 1:] = levels
+        costs[row, 1:] = np.asarray(levels) * unit_cost
+        areas[row, 1:] = np.asarray(levels) * unit_area
+    return sizes, costs, areas
+
+
+class PortfolioOptimizer:
+    """
+    Chooses the intervention mix (type and size per candidate site) that
+    maximizes total cooling under a budget and an area limit.
+
+    Each site's cooling is the sum of its interventions' predicted
+    temperature reductions, capped at the site's headroom above the target
+    temperature. That objective is monotone submodular, so large instances
+    use a lazy greedy (cost-benefit priority queue, re-scoring an entry only
+    when it reaches the top stale) and small ones are solved exactly as an
+    integer program. Predictions for a site are memoized, so repeated
+    requests over the same hotspots skip the predictor.
+
+    Sites are treated as independent: cooling at one site does not spill
+    over to, or overlap with, its neighbours. Candidates should therefore be
+    spaced at least a cooling footprint apart (heatmap cells are); the
+    raster model in cooling_service accounts for overlap when a chosen
+    portfolio is simulated spatially.
+    """
+
+    def __init__(self, cache_size: int = 100000):
+        self.cache_size = cache_size
+        self._impacts: "OrderedDict[Tuple[float, float, float], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def site_reductions(self, lats: np.ndarray, lons: np.ndarray, base_temps: np.ndarray) -> np.ndarray:
+        """
+        Predicted temperature reduction of every type and size level at each
+        site, (n_sites, len(INTERVENTION_TYPES), N_LEVELS + 1). Sites not seen
+        before are scored with a single batched predictor call.
+        """
+        keys = [(round(lat, 5), round(lon, 5), round(temp, 2))
+                for lat, lon, temp in zip(lats.tolist(), lons.tolist(), base_temps.tolist())]
+        reductions = np.zeros((len(keys), len(INTERVENTION_TYPES), N_LEVELS + 1))
+        missing = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                cached = self._impacts.get(key)
+                if cached is None:
+                    missing.append(position)
+                else:
+                    self._impacts.move_to_end(key)
+                    reductions[position] = cached
+            self.cache_hits += len(keys) - len(missing)
+            self.cache_misses += len(missing)
+        if not missing:
+            return reductions
+
+        # One row per (site, type, level >= 1)
+        missing = np.asarray(missing)
+        sizes, _, _ = option_tables(INTERVENTION_TYPES)
+        n_options = len(INTERVENTION_TYPES) * N_LEVELS
+        rows = np.zeros(len(missing) * n_options, dtype=INTERVENTION_DTYPE)
+        type_codes = np.repeat([TYPE_CODES[name] for name in INTERVENTION_TYPES], N_LEVELS)
+        is_count = np.repeat([INTERVENTION_OPTIONS[name][0] == "count" for name in INTERVENTION_TYPES], N_LEVELS)
+        option_sizes = sizes[:, 1:].ravel()
+        rows["type_code"] = np.tile(type_codes, len(missing))
+        rows["count"] = np.tile(np.where(is_count, option_sizes, 0), len(missing))
+        rows["area"] = np.tile(np.where(is_count, 0, option_sizes), len(missing))
+        rows["lat"] = np.repeat(lats[missing], n_options)
+        rows["lon"] = np.repeat(lons[missing], n_options)
+        rows["base_temp"] = np.repeat(base_temps[missing], n_options)
+
+        predicted = get_predictor().predict_impacts(rows)[:, 0].reshape(len(missing), len(INTERVENTION_TYPES), N_LEVELS)
+        # A larger installation never cools less than a smaller one at the same site
+        reductions[missing, :, 1:] = np.maximum.accumulate(predicted, axis=2)
+
+        with self._lock:
+            for position in missing.tolist():
+                self._impacts[keys[position]] = reductions[position]
+            while len(self._impacts) > self.cache_size:
+                self._impacts.popitem(last=False)
+        return reductions
+
+    def optimize(self, lats, lons, base_temps, budget: float, max_area: Optional[float] = None,
+                 types: Sequence[str] = INTERVENTION_TYPES,
+                 target_temperature: float = DEFAULT_TARGET_TEMPERATURE, method: str = "auto") -> Dict:
+        """
+        Best portfolio for the candidate sites. `method` is "greedy", "exact"
+        or "auto" (exact up to EXACT_MAX_SITES sites).
+        """
+        start = time.perf_counter()
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        base_temps = np.asarray(base_temps, dtype=np.float64)
+        types = list(types)
+        max_area = np.inf if max_area is None else float(max_area)
+
+        all_reductions = self.site_reductions(lats, lons, base_temps)
+        reductions = all_reductions[:, [INTERVENTION_TYPES.index(name) for name in types]]
+        _, costs, areas = option_tables(types)
+        caps = np.maximum(base_temps - target_temperature, MIN_HEADROOM)
+
+        if method == "auto":
+            method = "exact" if len(lats) <= EXACT_MAX_SITES else "greedy"
+        optimal = False
+        if method == "exact":
+            levels, optimal = self._solve_exact(reductions, costs, areas, caps, budget, max_area)
+        else:
+            levels = self._solve_greedy(reductions, costs, areas, caps, budget, max_area)
+
+        result = self._portfolio(levels, lats, lons, base_temps, types, reductions, costs, areas, caps)
+        result.update({
+            "method": method,
+            "optimal": optimal,
+            "candidate_sites": len(lats),
+            "budget": budget,
+            "max_area": None if np.isinf(max_area) else max_area,
+            "solve_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+        return result
+
+    def _solve_greedy(self, reductions: np.ndarray, costs: np.ndarray, areas: np.ndarray,
+                      caps: np.ndarray, budget: float, max_area: float) -> np.ndarray:
+        """
+        Lazy greedy over size upgrades. Heap entries are (site, type) upgrades
+        keyed by cooling gained per rupee. Gains only shrink as a site cools
+        and the feasible sizes only shrink as budget is spent, so a popped
+        entry whose site is unchanged and which still fits is the true best
+        and is taken without rescoring the rest.
+        """
+        n_sites, n_types, _ = reductions.shape
+        levels = np.zeros((n_sites, n_types), dtype=np.intp)
+        if n_sites == 0:
+            return levels
+        reduction_rows = reductions.tolist()
+        cost_rows = costs.tolist()
+        area_rows = areas.tolist()
+        cap_list = caps.tolist()
+        cooled = [0.0] * n_sites
+        site_versions = [0] * n_sites
+        remaining = [budget, max_area]
+
+        def best_upgrade(site: int, type_index: int) -> Optional[Tuple[float, int]]:
+            """Best (gain per rupee, target level) upgrade that still fits, if any"""
+            current = levels[site, type_index]
+            row = reduction_rows[site][type_index]
+            cost_row = cost_rows[type_index]
+            area_row = area_rows[type_index]
+            cap = cap_list[site]
+            base = min(cooled[site], cap)
+            best = None
+            for level in range(current + 1, N_LEVELS + 1):
+                extra_cost = cost_row[level] - cost_row[current]
+                if extra_cost > remaining[0] or area_row[level] - area_row[current] > remaining[1]:
+                    break  # levels only get bigger
+                gain = min(cooled[site] + row[level] - row[current], cap) - base
+                if gain > 0 and (best is None or gain / extra_cost > best[0]):
+                    best = (gain / extra_cost, level)
+            return best
+
+        def push(site: int, type_index: int):
+            upgrade = best_upgrade(site, type_index)
+            if upgrade is not None:
+                heapq.heappush(heap, (-upgrade[0], site, type_index, upgrade[1], site_versions[site]))
+
+        # Initial scores, vectorized: nothing is built yet
+        gains = np.minimum(reductions[:, :, 1:], caps[:, None, None])
+        feasible = (costs[None, :, 1:] <= budget) & (areas[None, :, 1:] <= max_area) & (gains > 0)
+        ratios = np.where(feasible, gains / costs[None, :, 1:], -np.inf)
+        best_levels = ratios.argmax(axis=2) + 1
+        best_ratios = ratios.max(axis=2)
+        heap = [
+            (-ratio, site, type_index, int(best_levels[site, type_index]), 0)
+            for (site, type_index), ratio in np.ndenumerate(best_ratios) if ratio > -np.inf
+        ]
+        heapq.heapify(heap)
+
+        while heap:
+            _, site, type_index, level, seen_version = heapq.heappop(heap)
+            current = levels[site, type_index]
+            extra_cost = cost_rows[type_index][level] - cost_rows[type_index][current]
+            extra_area = area_rows[type_index][level] - area_rows[type_index][current]
+            if seen_version != site_versions[site] or extra_cost > remaining[0] or extra_area > remaining[1]:
+                # Stale: rescore and push back; it is taken once it is fresh at the top
+                push(site, type_index)
+                continue
+            remaining[0] -= extra_cost
+            remaining[1] -= extra_area
+            cooled[site] += reduction_rows[site][type_index][level] - reduction_rows[site][type_index][current]
+            levels[site, type_index] = level
+            site_versions[site] += 1
+            push(site, type_index)
+
+        # Cost-benefit greedy can starve on one large, valuable option; keep the
+        # best single intervention instead when it beats the whole greedy portfolio
+        greedy_value = np.minimum(np.take_along_axis(reductions, levels[:, :, None], axis=2)[:, :, 0].sum(axis=1), caps).sum()
+        single = np.where((costs[None] <= budget) & (areas[None] <= max_area),
+                          np.minimum(reductions, caps[:, None, None]), -np.inf)
+        site, type_index, level = np.unravel_index(np.argmax(single), single.shape)
+        if single[site, type_index, level] > greedy_value:
+            levels[:] = 0
+            levels[site, type_index] = level
+        return levels
+
+    def _solve_exact(self, reductions: np.ndarray, costs: np.ndarray, areas: np.ndarray,
+                     caps: np.ndarray, budget: float, max_area: float) -> Tuple[np.ndarray, bool]:
+        """
+        Integer program: binary z[site, type, level] (at most one size per site
+        and type) and continuous cooling y[site] <= min(cap, sum of chosen
+        reductions); maximize sum(y). Returns (levels, proven optimal).
+        """
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import coo_matrix
+
+        n_sites, n_types, _ = reductions.shape
+        n_z = n_sites * n_types * N_LEVELS
+        z_sites, z_types, z_levels = np.unravel_index(np.arange(n_z), (n_sites, n_types, N_LEVELS))
+        z_levels = z_levels + 1
+        z_costs = costs[z_types, z_levels]
+        z_areas = areas[z_types, z_levels]
+        z_reductions = reductions[z_sites, z_types, z_levels]
+
+        rows, cols, values = [], [], []
+        # One size per (site, type)
+        rows.append(z_sites * n_types + z_types)
+        cols.append(np.arange(n_z))
+        values.append(np.ones(n_z))
+        n_groups = n_sites * n_types
+        # Budget and area
+        rows.extend([np.full(n_z, n_groups), np.full(n_z, n_groups + 1)])
+        cols.extend([np.arange(n_z), np.arange(n_z)])
+        values.extend([z_costs, np.where(np.isinf(max_area), 0.0, z_areas)])
+        # y[site] - sum(reduction * z) <= 0
+        link_row = n_groups + 2 + z_sites
+        rows.extend([link_row, n_groups + 2 + np.arange(n_sites)])
+        cols.extend([np.arange(n_z), n_z + np.arange(n_sites)])
+        values.extend([-z_reductions, np.ones(n_sites)])
+
+        n_rows = n_groups + 2 + n_sites
+        matrix = coo_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n_rows, n_z + n_sites)
+        ).tocsr()
+        upper = np.concatenate([np.ones(n_groups), [budget, 0.0 if np.isinf(max_area) else max_area], np.zeros(n_sites)])
+        result = milp(
+            c=np.concatenate([np.zeros(n_z), -np.ones(n_sites)]),
+            integrality=np.concatenate([np.ones(n_z), np.zeros(n_sites)]),
+            bounds=Bounds(np.zeros(n_z + n_sites), np.concatenate([np.ones(n_z), caps])),
+            constraints=LinearConstraint(matrix, -np.inf, upper),
+            options={"time_limit": EXACT_TIME_LIMIT}
+        )
+        if result.x is None:
+            # No incumbent within the time limit
+            return self._solve_greedy(reductions, costs, areas, caps, budget, max_area), False
+
+        levels = np.zeros((n_sites, n_types), dtype=np.intp)
+        chosen = result.x[:n_z] > 0.5
+        levels[z_sites[chosen], z_types[chosen]] = z_levels[chosen]
+        return levels, result.status == 0
+
+    def _portfolio(self, levels: np.ndarray, lats: np.ndarray, lons: np.ndarray, base_temps: np.ndarray,
+                   types: List[str], reductions: np.ndarray, costs: np.ndarray, areas: np.ndarray,
+                   caps: np.ndarray) -> Dict:
+        """
+        Chosen interventions, constraint usage and impact for a level
+        assignment. The impact is built from the same per-site, capped
+        reductions the solvers maximize; it is not a re-simulation of the
+        whole portfolio as one city-wide scenario.
+        """
+        sizes, _, _ = option_tables(types)
+        interventions = []
+        for site, type_index in zip(*np.nonzero(levels)):
+            level = levels[site, type_index]
+            name = types[type_index]
+            size_field = INTERVENTION_OPTIONS[name][0]
+            interventions.append({
+                "type": name,
+                "count": int(sizes[type_index, level]) if size_field == "count" else 0,
+                "area": float(sizes[type_index, level]) if size_field == "area" else 0,
+                "location": [float(lats[site]), float(lons[site])],
+                "base_temperature": float(base_temps[site]),
+                "predicted_reduction": round(float(reductions[site, type_index, level]), 2),
+                "cost": float(costs[type_index, level])
+            })
+
+        chosen = np.take_along_axis(reductions, levels[:, :, None], axis=2)[:, :, 0]
+        site_cooling = np.minimum(chosen.sum(axis=1), caps)
+        type_rows = np.arange(len(types))[None, :]
+        return {
+            "cooling": round(float(site_cooling.sum()), 2),
+            "cost": float(costs[type_rows, levels].sum()),
+            "area_used": float(areas[type_rows, levels].sum()),
+            "type_counts": dict(Counter(intervention["type"] for intervention in interventions)),
+            "impact": self._site_impact(levels.any(axis=1), base_temps, site_cooling, interventions),
+            "interventions": interventions
+        }
+
+    def _site_impact(self, built: np.ndarray, base_temps: np.ndarray, site_cooling: np.ndarray,
+                     interventions: List[Dict]) -> Dict:
+        """
+        Impact metrics over the sites that received interventions: local
+        temperatures after their (capped) cooling, and energy and CO2
+        summed per intervention.
+        """
+        if not interventions:
+            return {
+                "average_temperature": None,
+                "temperature_reduction": 0,
+                "energy_saving": 0,
+                "co2_reduction": 0,
+                "health_score": None,
+                "intervention_count": 0,
+                "site_count": 0
+            }
+
+        impacts = get_predictor().predict_impacts(interventions_to_array(interventions))
+        base_temps = base_temps[built]
+        cooling = site_cooling[built]
+        average_temperature = float((base_temps - cooling).mean())
+        # Counter breaks ties by first occurrence, like evaluate_scenario
+        air_quality = Counter(estimate_air_quality(temp) for temp in base_temps.tolist()).most_common(1)[0][0]
+        return {
+            "average_temperature": round(average_temperature, 1),
+            "temperature_reduction": round(float(cooling.mean()), 2),
+            "max_site_reduction": round(float(cooling.max()), 2),
+            "energy_saving": round(float(impacts[:, 1].sum()), 2),
+            "co2_reduction": round(float(impacts[:, 2].sum()), 2),
+            "health_score": get_health_service().get_health_score(
+                temperature=average_temperature,
+                air_quality=air_quality,
+                interventions=interventions
+            ),
+            "intervention_count": len(interventions),
+            "site_count": int(built.sum())
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            "cached_sites": len(self._impacts),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses
+        }
+
+
+def candidate_sites(grid: HeatmapGrid, max_sites: int,
+                    target_temperature: float = DEFAULT_TARGET_TEMPERATURE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The hottest (up to max_sites) grid cells above the target temperature: (lats, lons, temperatures)"""
+    cells = np.flatnonzero(grid.temperatures > target_temperature)
+    if len(cells) > max_sites:
+        cells = cells[np.argpartition(-grid.temperatures[cells], max_sites - 1)[:max_sites]]
+    return grid.lats[cells], grid.lons[cells], grid.temperatures[cells]
+
+
+# Singleton instance
+_portfolio_optimizer = None
+
+def get_portfolio_optimizer() -> PortfolioOptimizer:
+    """Get singleton portfolio optimizer instance"""
+    global _portfolio_optimizer
+    if _portfolio_optimizer is None:
+        _portfolio_optimizer = PortfolioOptimizer()
+    return _portfolio_optimizer
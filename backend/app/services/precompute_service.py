@@ -0,0 +1,254 @@
+"""
+Background precompute scheduler for heatmap and recommendation snapshots
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.history_store import get_history_store
+from app.services.hotspot_service import get_hotspot_service
+from app.services.weather_service import get_weather_service, CITY_CENTERS
+from app.services.recommendation_service import get_recommendation_service
+from app.services.snapshot_store import SnapshotStore, get_snapshot_store
+from app.utils.executor import run_cpu
+from app.utils.spatial import SpatialIndex
+
+
+class HeatmapSnapshot:
+    """
+    A precomputed heatmap, its spatial index and the recommendations derived from it.
+    The index and GeoJSON are built once per snapshot, on first use, and
+    shared by every consumer.
+    """
+
+    def __init__(self, version: int, city: str, grid_size: int, grid: HeatmapGrid):
+        self.version = version
+        self.city = city
+        self.grid_size = grid_size
+        self.grid = grid
+        self.recommendations: List[Dict] = []
+        self.clustering = None
+        self.created_at = time.time()
+
+        self.lats = grid.lats
+        self.lons = grid.lons
+        self.temperatures = grid.temperatures
+        # Point lookups further than ~1.5 grid cells away are outside the grid
+        cell_km = 111.0 * (np.ptp(self.lats) / max(grid_size - 1, 1)) if len(grid) else 0.0
+        self.lookup_radius_km = cell_km * 1.5
+        self._index = None
+        self._weather_version = None
+
+    @property
+    def index(self) -> SpatialIndex:
+        if self._index is None:
+            self._index = SpatialIndex(self.lats, self.lons)
+        return self._index
+
+    @property
+    def weather_version(self) -> str:
+        """Content digest of the temperatures; stable across restarts and workers"""
+        if self._weather_version is None:
+            data = np.ascontiguousarray(self.temperatures, dtype="<f8").tobytes()
+            self._weather_version = hashlib.blake2b(data, digest_size=8).hexdigest()
+        return self._weather_version
+
+    @property
+    def heatmap(self) -> Dict:
+        return self.grid.to_geojson()
+
+    def lookup_temperature(self, lat: float, lon: float) -> Optional[float]:
+        """Temperature of the grid cell nearest a location, or None if outside the grid"""
+        if len(self.index) == 0:
+            return None
+        distances, indices = self.index.nearest([lat], [lon])
+        if distances[0] > self.lookup_radius_km:
+            return None
+        return float(self.temperatures[indices[0]])
+
+
+class PrecomputeScheduler:
+    """
+    Periodically rebuilds heatmaps for the configured cities and grid sizes.
+
+    Each refresh builds a complete new set of snapshots and publishes it with
+    a single reference swap, so readers always see a consistent set and never
+    wait on the upstream weather source.
+
+    With a shared SnapshotStore only one worker process (the producer) builds
+    snapshots; the others follow the store and map its arrays read-only, and
+    take over as producer if the current one exits. The producer also
+    records each refresh in the history store when one is configured.
+    """
+
+    def __init__(self, cities: List[str], grid_sizes: List[int], interval: float = 120,
+                 store: Optional[SnapshotStore] = None, poll_interval: float = 1.0,
+                 history=None):
+        self.cities = cities
+        self.grid_sizes = grid_sizes
+        self.interval = interval
+        self.store = store
+        self.poll_interval = poll_interval
+        self.history = history
+        self.history_failures = 0
+        self.version = 0
+        self._snapshots: Dict[Tuple[str, int], HeatmapSnapshot] = {}
+        self._store_token = None
+        self._task = None
+        self.last_refresh_seconds = None
+        self.refresh_failures = 0
+
+    async def _build_snapshot(self, city: str, grid_size: int, version: int) -> HeatmapSnapshot:
+        weather_service = get_weather_service()
+        recommendation_service = get_recommendation_service()
+        grid = await weather_service.refresh_heatmap_async(grid_size=grid_size, city=city)
+        # Index building and recommendation generation are CPU work; keep them off the event loop
+        snapshot = await run_cpu(HeatmapSnapshot, version, city, grid_size, grid)
+        snapshot.clustering = await run_cpu(get_hotspot_service().get_clustering, grid)
+        snapshot.recommendations = await run_cpu(
+            recommendation_service.generate_recommendations_from_arrays,
+            snapshot.lats, snapshot.lons, snapshot.temperatures, snapshot.index, snapshot.clustering
+        )
+        return snapshot
+
+    async def refresh_once(self) -> int:
+        """Build every configured snapshot and publish them together"""
+        start = time.perf_counter()
+        version = self.version + 1
+        targets = [(city, grid_size) for city in self.cities for grid_size in self.grid_sizes]
+        snapshots = await asyncio.gather(
+            *(self._build_snapshot(city, grid_size, version) for city, grid_size in targets)
+        )
+        # Atomic publish: readers see either the old set or the new one
+        self._snapshots = dict(zip(targets, snapshots))
+        self.version = version
+        if self.store is not None:
+            await asyncio.to_thread(self.store.publish, version, self._snapshots)
+        if self.history is not None:
+            await self._record_history(snapshots)
+        self.last_refresh_seconds = round(time.perf_counter() - start, 3)
+        return version
+
+    async def _record_history(self, snapshots: List[HeatmapSnapshot]):
+        """Persist a refresh; history is best effort and never fails the refresh"""
+        timestamp = datetime.now(timezone.utc)
+        try:
+            await asyncio.gather(
+                *(self.history.insert_snapshot(snapshot.grid, timestamp) for snapshot in snapshots)
+            )
+        except Exception as e:
+            self.history_failures += 1
+            print(f"Error recording heatmap history: {e}")
+
+    def is_producer(self) -> bool:
+        """Whether this process builds snapshots (always, without a shared store)"""
+        return self.store is None or self.store.try_acquire_producer()
+
+    def sync_from_store(self) -> bool:
+        """Adopt the store's current snapshot set if it changed; True if it did"""
+        manifest = self.store.manifest()
+        if manifest is None:
+            return False
+        token = (manifest["producer"], manifest["version"])
+        if token == self._store_token:
+            return False
+
+        snapshots = {}
+        for key, name in manifest["files"].items():
+            city, grid_size = key.split(":")
+            stored = self.store.load(name)
+            snapshot = HeatmapSnapshot(stored.version, city, int(grid_size), stored.grid)
+            snapshot.recommendations = stored.recommendations
+            snapshot.clustering = stored.clustering
+            snapshots[(city, int(grid_size))] = snapshot
+        self._snapshots = snapshots
+        self.version = manifest["version"]
+        self._store_token = token
+        return True
+
+    async def refresh_now(self) -> bool:
+        """Refresh (or, as a store reader, sync) once, keeping the previous snapshots on failure"""
+        try:
+            if self.is_producer():
+                await self.refresh_once()
+            else:
+                await asyncio.to_thread(self.sync_from_store)
+            return True
+        except Exception as e:
+            self.refresh_failures += 1
+            print(f"Heatmap precompute failed: {e}")
+            return False
+
+    async def _run(self):
+        # Skip the immediate refresh if snapshots were already built (e.g. at warm-up)
+        if self.version:
+            await asyncio.sleep(self.poll_interval if not self.is_producer() else self.interval)
+        while True:
+            await self.refresh_now()
+            # Readers poll the store (a stat call) and become producer if the lock frees up
+            await asyncio.sleep(self.interval if self.is_producer() else self.poll_interval)
+
+    def start(self):
+        """Start the refresh loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the refresh loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.store is not None:
+            self.store.close()
+
+    def get_snapshot(self, city: str = "pune", grid_size: int = 15) -> Optional[HeatmapSnapshot]:
+        """Get the latest published snapshot, or None if it isn't precomputed"""
+        return self._snapshots.get((city, grid_size))
+
+    def get_finest_snapshot(self, city: str = "pune") -> Optional[HeatmapSnapshot]:
+        """Get the highest-resolution published snapshot for a city"""
+        snapshots = [snapshot for (snapshot_city, _), snapshot in self._snapshots.items() if snapshot_city == city]
+        return max(snapshots, key=lambda snapshot: snapshot.grid_size, default=None)
+
+    def get_stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "role": "producer" if self.store is None or self.store.get_stats()["producer"] else "reader",
+            "version": self.version,
+            "snapshots": len(self._snapshots),
+            "interval": self.interval,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "refresh_failures": self.refresh_failures,
+            "history_failures": self.history_failures
+        }
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Singleton instance
+_precompute_scheduler = None
+
+def get_precompute_scheduler() -> PrecomputeScheduler:
+    """Get singleton precompute scheduler instance"""
+    global _precompute_scheduler
+    if _precompute_scheduler is None:
+        cities = [city for city in _parse_list(os.getenv("PRECOMPUTE_CITIES", "pune")) if city in CITY_CENTERS]
+        grid_sizes = [int(size) for size in _parse_list(os.getenv("PRECOMPUTE_GRID_SIZES", "15,12"))]
+        _precompute_scheduler = PrecomputeScheduler(
+            cities=cities,
+            grid_sizes=grid_sizes,
+            interval=float(os.getenv("PRECOMPUTE_INTERVAL", 120)),
+            store=get_snapshot_store(),
+            history=get_history_store()
+        )
+    return _precompute_scheduler
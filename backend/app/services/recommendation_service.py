@@ -1,9 +1,80 @@
 """
 AI Recommendation Service for UHI Mitigation Strategies
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.hotspot_service import HotspotClustering
 from app.services.weather_service import get_weather_service
+from app.utils.executor import run_cpu
+from app.utils.geo import EARTH_RADIUS_KM
+from app.utils.spatial import SpatialIndex
+
+# Intervention templates. "impact" is the share of a cell's excess over the city
+# average the intervention removes; sized interventions scale by position in the tier.
+INTERVENTION_TEMPLATES = {
+    "park": {
+        "action": "Create urban park",
+        "description": "Convert area into green space. Current temp: {temp}°C. Expected reduction: {reduction}°C",
+        "address": "Critical Hotspot",
+        "impact": 0.35, "cost": "Medium", "timeframe": "6-12 months",
+        "type": "park", "size": ("area", 1500, 200)
+    },
+    "urban_forest": {
+        "action": "Plant urban forest",
+        "description": "Plant {size} trees to create canopy cover. Current temp: {temp}°C",
+        "address": "Hotspot Zone",
+        "impact": 0.32, "cost": "Low", "timeframe": "3-6 months",
+        "type": "trees", "size": ("count", 25, 5)
+    },
+    "cool_roof": {
+        "action": "Install cool roof system",
+        "description": "Apply reflective coating to buildings. Current temp: {temp}°C",
+        "address": "Building Zone",
+        "impact": 0.28, "cost": "Medium", "timeframe": "1-2 months",
+        "type": "cool_roof", "size": ("area", 600, 100)
+    },
+    "green_roof": {
+        "action": "Install green roof",
+        "description": "Convert rooftop to vegetation. Current temp: {temp}°C",
+        "address": "Rooftop Zone",
+        "impact": 0.22, "cost": "High", "timeframe": "2-4 months",
+        "type": "green_roof", "size": ("area", 500, 50)
+    },
+    "shade_trees": {
+        "action": "Plant shade trees",
+        "description": "Plant {size} trees along streets. Current temp: {temp}°C",
+        "address": "Street Zone",
+        "impact": 0.25, "cost": "Low", "timeframe": "3-6 months",
+        "type": "trees", "size": ("count", 20, 3)
+    }
+}
+
+# High priority tier (hottest 4 cells, when the city peaks above 38°C):
+# the first template whose temperature floor a cell exceeds
+HIGH_PRIORITY_TIERS = [(40.0, "park"), (39.0, "urban_forest"), (-np.inf, "cool_roof")]
+HIGH_PRIORITY_COUNT = 4
+# Medium priority tier (next 3 hot cells, when the city averages above 35°C): alternating
+MEDIUM_PRIORITY_CYCLE = ["green_roof", "shade_trees"]
+MEDIUM_PRIORITY_COUNT = 3
+
+
+def _top_k(indices: np.ndarray, temperatures: np.ndarray, k: int) -> np.ndarray:
+    """
+    The k hottest of the given cell indices, hottest first (ties in grid order).
+    Uses argpartition so the cost is linear in the number of candidates.
+    """
+    if k <= 0 or len(indices) == 0:
+        return indices[:0]
+    values = temperatures[indices]
+    if len(indices) > k:
+        # Keep every candidate tied with the k-th hottest so tie order stays stable
+        kth = values[np.argpartition(values, len(values) - k)[len(values) - k]]
+        keep = values >= kth
+        indices, values = indices[keep], values[keep]
+    order = np.lexsort((indices, -values))
+    return indices[order[:k]]
+
 
 class RecommendationService:
     """Service for generating AI-driven recommendations"""
@@ -11,175 +82,112 @@ class RecommendationService:
     def __init__(self):
         self.weather_service = get_weather_service()
     
-    def generate_recommendations(self, heatmap_data: Dict = None) -> List[Dict]:
+    def generate_recommendations(
+        self,
+        heatmap_data: Dict = None,
+        spatial_index: SpatialIndex = None,
+        clustering: HotspotClustering = None
+    ) -> List[Dict]:
         """
         Generate AI-driven recommendations based on real-time heatmap data.
         Analyzes hotspots and provides diverse, contextual interventions.
+        Pass the snapshot's spatial index and hotspot clustering to reuse them.
         """
+        if not heatmap_data or "features" not in heatmap_data or not heatmap_data["features"]:
+            return self._get_default_recommendations()
+        
+        properties = [f["properties"] for f in heatmap_data["features"]]
+        return self.generate_recommendations_from_arrays(
+            np.array([p["lat"] for p in properties], dtype=np.float64),
+            np.array([p["lon"] for p in properties], dtype=np.float64),
+            np.array([p["temperature"] for p in properties], dtype=np.float64),
+            spatial_index,
+            clustering
+        )
+    
+    def generate_recommendations_from_arrays(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        temperatures: np.ndarray,
+        spatial_index: SpatialIndex = None,
+        clustering: HotspotClustering = None
+    ) -> List[Dict]:
+        """
+        Generate recommendations directly from heatmap arrays (e.g. a HeatmapGrid).
+        Only a handful of cells are ever recommended, so hotspots are selected
+        with partial sorts and masks and the cost stays flat as the grid grows.
+        """
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        if len(temperatures) == 0:
+            return self._get_default_recommendations()
+        
+        avg_temp = float(temperatures.mean())
+        max_temp = float(temperatures.max())
+        min_temp = float(temperatures.min())
+        temp_range = max_temp - min_temp
+        
+        # Hot cells: more than 30% of the temperature range above the mean;
+        # the n_wanted hottest of them get recommendations
+        temp_threshold = avg_temp + (temp_range * 0.3)
+        hot_cells = np.flatnonzero(temperatures >= temp_threshold)
+        n_wanted = HIGH_PRIORITY_COUNT + MEDIUM_PRIORITY_COUNT
+        if clustering is not None:
+            # Spread interventions across hotspot zones: the hottest cell of each
+            # zone (hottest zones first) goes ahead of the remaining hot cells
+            selected = self._select_by_hotspot_zone(hot_cells, temperatures, clustering, n_wanted)
+        else:
+            selected = _top_k(hot_cells, temperatures, n_wanted)
+        
         recommendations = []
         
-        # Analyze heatmap data to identify hotspots
-        if heatmap_data and "features" in heatmap_data:
-            features = heatmap_data["features"]
-            if not features:
-                return self._get_default_recommendations()
-                
-            temperatures = [f["properties"]["temperature"] for f in features]
-            avg_temp = np.mean(temperatures)
-            max_temp = max(temperatures)
-            min_temp = min(temperatures)
-            temp_range = max_temp - min_temp
-            
-            # Find hottest areas (top 20% of temperatures)
-            temp_threshold = avg_temp + (temp_range * 0.3)
-            hot_features = [f for f in features if f["properties"]["temperature"] >= temp_threshold]
-            
-            # Sort by temperature (hottest first)
-            hot_features.sort(key=lambda x: x["properties"]["temperature"], reverse=True)
-            
-            # Generate diverse recommendations based on temperature patterns
-            intervention_types = []
-            
-            # High priority: Very hot areas (>38°C)
-            if max_temp > 38:
-                for i, feature in enumerate(hot_features[:4]):
-                    props = feature["properties"]
-                    temp = props["temperature"]
-                    
-                    # Vary recommendations based on temperature severity
-                    if temp > 40:
-                        # Extreme heat - recommend parks (largest impact)
-                        recommendations.append({
-                            "id": len(recommendations) + 1,
-                            "action": "Create urban park",
-                            "description": f"Convert area into green space. Current temp: {temp}°C. Expected reduction: {round((temp - avg_temp) * 0.35, 1)}°C",
-                            "location": {
-                                "lat": props["lat"],
-                                "lon": props["lon"],
-                                "address": f"Critical Hotspot {i+1} ({temp}°C)"
-                            },
-                            "priority": "High",
-                            "estimated_impact": {
-                                "temp_reduction": round((temp - avg_temp) * 0.35, 1),
-                                "cost": "Medium",
-                                "timeframe": "6-12 months"
-                            },
-                            "type": "park",
-                            "area": 1500 + (i * 200)  # Vary park sizes
-                        })
-                    elif temp > 39:
-                        # Very hot - recommend tree planting
-                        tree_count = 25 + (i * 5)
-                        recommendations.append({
-                            "id": len(recommendations) + 1,
-                            "action": "Plant urban forest",
-                            "description": f"Plant {tree_count} trees to create canopy cover. Current temp: {temp}°C",
-                            "location": {
-                                "lat": props["lat"],
-                                "lon": props["lon"],
-                                "address": f"Hotspot Zone {i+1} ({temp}°C)"
-                            },
-                            "priority": "High",
-                            "estimated_impact": {
-                                "temp_reduction": round((temp - avg_temp) * 0.32, 1),
-                                "cost": "Low",
-                                "timeframe": "3-6 months"
-                            },
-                            "type": "trees",
-                            "count": tree_count
-                        })
-                    else:
-                        # Hot - recommend cool roofs
-                        recommendations.append({
-                            "id": len(recommendations) + 1,
-                            "action": "Install cool roof system",
-                            "description": f"Apply reflective coating to buildings. Current temp: {temp}°C",
-                            "location": {
-                                "lat": props["lat"],
-                                "lon": props["lon"],
-                                "address": f"Building Zone {i+1} ({temp}°C)"
-                            },
-                            "priority": "High",
-                            "estimated_impact": {
-                                "temp_reduction": round((temp - avg_temp) * 0.28, 1),
-                                "cost": "Medium",
-                                "timeframe": "1-2 months"
-                            },
-                            "type": "cool_roof",
-                            "area": 600 + (i * 100)
-                        })
-            
-            # Medium priority: Moderately hot areas (35-38°C)
-            if avg_temp > 35 and len(hot_features) > 4:
-                for i, feature in enumerate(hot_features[4:7]):
-                    props = feature["properties"]
-                    temp = props["temperature"]
-                    
-                    # Alternate between intervention types
-                    if i % 2 == 0:
-                        recommendations.append({
-                            "id": len(recommendations) + 1,
-                            "action": "Install green roof",
-                            "description": f"Convert rooftop to vegetation. Current temp: {temp}°C",
-                            "location": {
-                                "lat": props["lat"],
-                                "lon": props["lon"],
-                                "address": f"Rooftop Zone {i+1} ({temp}°C)"
-                            },
-                            "priority": "Medium",
-                            "estimated_impact": {
-                                "temp_reduction": round((temp - avg_temp) * 0.22, 1),
-                                "cost": "High",
-                                "timeframe": "2-4 months"
-                            },
-                            "type": "green_roof",
-                            "area": 500 + (i * 50)
-                        })
-                    else:
-                        recommendations.append({
-                            "id": len(recommendations) + 1,
-                            "action": "Plant shade trees",
-                            "description": f"Plant {20 + (i * 3)} trees along streets. Current temp: {temp}°C",
-                            "location": {
-                                "lat": props["lat"],
-                                "lon": props["lon"],
-                                "address": f"Street Zone {i+1} ({temp}°C)"
-                            },
-                            "priority": "Medium",
-                            "estimated_impact": {
-                                "temp_reduction": round((temp - avg_temp) * 0.25, 1),
-                                "cost": "Low",
-                                "timeframe": "3-6 months"
-                            },
-                            "type": "trees",
-                            "count": 20 + (i * 3)
-                        })
-            
-            # Add strategic recommendations based on overall heat distribution
-            if temp_range > 5:
-                # High variation - recommend targeted interventions
-                mid_temp_features = [f for f in features if avg_temp - 1 <= f["properties"]["temperature"] <= avg_temp + 1]
-                if mid_temp_features:
-                    feature = mid_temp_features[0]
-                    props = feature["properties"]
-                    recommendations.append({
-                        "id": len(recommendations) + 1,
-                        "action": "Create cooling corridor",
-                        "description": "Connect green spaces to create cooling pathways",
-                        "location": {
-                            "lat": props["lat"],
-                            "lon": props["lon"],
-                            "address": "Strategic Location"
-                        },
-                        "priority": "Medium",
-                        "estimated_impact": {
-                            "temp_reduction": round(temp_range * 0.15, 1),
-                            "cost": "Medium",
-                            "timeframe": "6-12 months"
-                        },
-                        "type": "park",
-                        "area": 1000
-                    })
+        # High priority: Very hot areas (>38°C), template chosen by temperature severity
+        if max_temp > 38:
+            for i, cell in enumerate(selected[:HIGH_PRIORITY_COUNT]):
+                temp = float(temperatures[cell])
+                key = next(key for floor, key in HIGH_PRIORITY_TIERS if temp > floor)
+                recommendations.append(self._build_recommendation(
+                    len(recommendations) + 1, key, "High", i, lats[cell], lons[cell], temp, avg_temp
+                ))
+        
+        # Medium priority: Moderately hot areas (35-38°C), alternating intervention types
+        if avg_temp > 35 and len(hot_cells) > HIGH_PRIORITY_COUNT:
+            for i, cell in enumerate(selected[HIGH_PRIORITY_COUNT:]):
+                key = MEDIUM_PRIORITY_CYCLE[i % len(MEDIUM_PRIORITY_CYCLE)]
+                recommendations.append(self._build_recommendation(
+                    len(recommendations) + 1, key, "Medium", i, lats[cell], lons[cell],
+                    float(temperatures[cell]), avg_temp
+                ))
+        
+        # Add strategic recommendations based on overall heat distribution
+        if temp_range > 5:
+            # High variation - recommend targeted interventions
+            # Corridor goes through the average-temperature cell nearest the hottest spot
+            in_band = (temperatures >= avg_temp - 1) & (temperatures <= avg_temp + 1)
+            hottest = int(np.argmax(temperatures))
+            if spatial_index is not None:
+                corridor_index = spatial_index.nearest_where(lats[hottest], lons[hottest], in_band)
+            else:
+                corridor_index = self._nearest_in_mask(lats, lons, hottest, in_band)
+            if corridor_index is not None:
+                recommendations.append({
+                    "id": len(recommendations) + 1,
+                    "action": "Create cooling corridor",
+                    "description": "Connect green spaces to create cooling pathways",
+                    "location": {
+                        "lat": float(lats[corridor_index]),
+                        "lon": float(lons[corridor_index]),
+                        "address": "Strategic Location"
+                    },
+                    "priority": "Medium",
+                    "estimated_impact": {
+                        "temp_reduction": round(temp_range * 0.15, 1),
+                        "cost": "Medium",
+                        "timeframe": "6-12 months"
+                    },
+                    "type": "park",
+                    "area": 1000
+                })
         
         # Add some default recommendations if none generated
         if not recommendations:
@@ -194,6 +202,84 @@ class RecommendationService:
         
         return recommendations[:8]  # Return top 8 for better UX
     
+    async def generate_recommendations_async(
+        self,
+        heatmap_data: Dict = None,
+        spatial_index: SpatialIndex = None,
+        clustering: HotspotClustering = None,
+        grid: HeatmapGrid = None
+    ) -> List[Dict]:
+        """
+        Async variant of generate_recommendations. Pass a HeatmapGrid to skip
+        GeoJSON entirely; with neither, the current 12x12 grid is fetched. The
+        analysis runs on the bounded CPU executor.
+        """
+        if heatmap_data is not None:
+            return await run_cpu(self.generate_recommendations, heatmap_data, spatial_index, clustering)
+        if grid is None:
+            grid = await self.weather_service.get_heatmap_grid_async(grid_size=12)
+        return await run_cpu(
+            self.generate_recommendations_from_arrays,
+            grid.lats, grid.lons, grid.temperatures, spatial_index, clustering
+        )
+    
+    def _build_recommendation(self, rec_id: int, key: str, priority: str, position: int,
+                              lat: float, lon: float, temp: float, avg_temp: float) -> Dict:
+        """Fill an intervention template for one hotspot cell"""
+        template = INTERVENTION_TEMPLATES[key]
+        reduction = round((temp - avg_temp) * template["impact"], 1)
+        size_field, size_base, size_step = template["size"]
+        size = size_base + position * size_step
+        return {
+            "id": rec_id,
+            "action": template["action"],
+            "description": template["description"].format(temp=temp, reduction=reduction, size=size),
+            "location": {
+                "lat": float(lat),
+                "lon": float(lon),
+                "address": f"{template['address']} {position + 1} ({temp}°C)"
+            },
+            "priority": priority,
+            "estimated_impact": {
+                "temp_reduction": reduction,
+                "cost": template["cost"],
+                "timeframe": template["timeframe"]
+            },
+            "type": template["type"],
+            size_field: size
+        }
+    
+    def _select_by_hotspot_zone(self, hot_cells: np.ndarray, temperatures: np.ndarray,
+                                clustering: HotspotClustering, k: int) -> np.ndarray:
+        """
+        The first k hot cells with each hotspot zone represented first: every
+        zone's hottest cell (hottest zones first), then the hottest of the rest.
+        """
+        labels = np.asarray(clustering.labels)[hot_cells]
+        leaders = []
+        for zone in np.unique(labels):
+            zone_cells = hot_cells[labels == zone]
+            leaders.append(int(_top_k(zone_cells, temperatures, 1)[0]))
+        leaders = np.array(leaders, dtype=np.intp)
+        
+        # Order leaders by zone average, then as they rank among hot cells
+        zone_avgs = np.array([clustering.zones[int(clustering.labels[cell])]["avg_temperature"] for cell in leaders])
+        leaders = leaders[np.lexsort((leaders, -temperatures[leaders], -zone_avgs))][:k]
+        rest = _top_k(np.setdiff1d(hot_cells, leaders, assume_unique=True), temperatures, k - len(leaders))
+        return np.concatenate([leaders, rest])
+    
+    def _nearest_in_mask(self, lats: np.ndarray, lons: np.ndarray, origin: int,
+                         mask: np.ndarray) -> Optional[int]:
+        """Nearest masked cell to a cell by linear scan, for callers without a spatial index"""
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return None
+        # Same equirectangular projection as SpatialIndex
+        cos_ref = np.cos(np.radians(np.mean(lats)))
+        dx = np.radians(lons[candidates] - lons[origin]) * EARTH_RADIUS_KM * cos_ref
+        dy = np.radians(lats[candidates] - lats[origin]) * EARTH_RADIUS_KM
+        return int(candidates[np.argmin(dx * dx + dy * dy)])
+    
     def _get_default_recommendations(self) -> List[Dict]:
         """Get default recommendations for Pune"""
         return [
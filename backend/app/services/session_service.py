@@ -0,0 +1,456 @@
+"""
+Session-scoped incremental simulation: O(1) add/update/remove of interventions
+"""
+import heapq
+from fractions import Fraction
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+import orjson
+from app.models.prediction import get_predictor, impact_from_totals, interventions_to_array
+from app.services.health_service import health_score_from_bonus, intervention_health_bonus
+
+AIR_QUALITIES = ("good", "moderate", "poor")
+PRUNE_EVERY = 512  # operations between removals of expired sessions
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    next_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    count INTEGER NOT NULL,
+    base_temp_sum TEXT NOT NULL,
+    temp_reduction_sum TEXT NOT NULL,
+    energy_saving_sum TEXT NOT NULL,
+    co2_reduction_sum TEXT NOT NULL,
+    health_impact_sum TEXT NOT NULL,
+    health_bonus_sum TEXT NOT NULL,
+    good_count INTEGER NOT NULL,
+    moderate_count INTEGER NOT NULL,
+    poor_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_interventions (
+    session_id TEXT NOT NULL,
+    intervention_id INTEGER NOT NULL,
+    air_quality TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (session_id, intervention_id)
+);
+CREATE INDEX IF NOT EXISTS session_interventions_air_quality
+    ON session_interventions (session_id, air_quality, intervention_id);
+"""
+
+# Running totals kept per session, in column order. Sums are exact (Fraction,
+# stored as "n/d" text) so a total after any sequence of adds and removes
+# rounds exactly like math.fsum over the remaining interventions
+_SUM_COLUMNS = ("base_temp_sum", "temp_reduction_sum", "energy_saving_sum",
+                "co2_reduction_sum", "health_impact_sum", "health_bonus_sum")
+_TOTAL_COLUMNS = ("count",) + _SUM_COLUMNS + tuple(f"{quality}_count" for quality in AIR_QUALITIES)
+
+
+def session_contribution(intervention: Dict, air_quality: str) -> Dict:
+    """
+    One intervention's contribution to a session's running totals. The
+    intervention must already carry its base temperature.
+    """
+    impacts = get_predictor().predict_impacts(interventions_to_array([intervention]))[0].tolist()
+    return {
+        "intervention": intervention,
+        "air_quality": air_quality,
+        "sums": [intervention["base_temperature"]] + impacts + [intervention_health_bonus(intervention)]
+    }
+
+
+def metrics_from_totals(totals: Tuple, first_id: Callable[[str], int]) -> Dict:
+    """
+    Scenario metrics (as evaluate_scenario computes them) from a totals tuple
+    in _TOTAL_COLUMNS order. `first_id(quality)` gives the earliest
+    intervention id with that air quality; it is only called to break ties.
+    """
+    count = totals[0]
+    sums = [float(total) for total in totals[1:1 + len(_SUM_COLUMNS)]]
+    air_counts = dict(zip(AIR_QUALITIES, totals[1 + len(_SUM_COLUMNS):]))
+    impact = impact_from_totals(count, sums[0], list(sums[1:5]))
+
+    # Most common air quality; ties go to the earliest-added intervention
+    top = max(air_counts.values())
+    tied = [quality for quality, n in air_counts.items() if n == top and n > 0]
+    if len(tied) > 1:
+        tied.sort(key=first_id)
+    air_quality = tied[0] if tied else "moderate"
+    impact["health_score"] = health_score_from_bonus(impact["average_temperature"], air_quality, sums[5])
+    return impact
+
+
+def _changed(before: Dict, after: Dict) -> Dict:
+    return {key: value for key, value in after.items() if before.get(key) != value}
+
+
+class _Session:
+    """One in-memory session: running totals plus its contributions by id"""
+
+    __slots__ = ("version", "next_id", "updated_at", "count", "sums", "air_counts",
+                 "contributions", "_quality_ids")
+
+    def __init__(self):
+        self.version = 0
+        self.next_id = 1
+        self.updated_at = time.time()
+        self.count = 0
+        self.sums = [Fraction(0)] * len(_SUM_COLUMNS)
+        self.air_counts = dict.fromkeys(AIR_QUALITIES, 0)
+        self.contributions: Dict[int, Dict] = {}
+        # Per air quality, a min-heap of ids (lazily cleaned) for tie-breaking
+        self._quality_ids = {quality: [] for quality in AIR_QUALITIES}
+
+    def totals(self) -> Tuple:
+        return (self.count, *self.sums, *(self.air_counts[quality] for quality in AIR_QUALITIES))
+
+    def first_id(self, quality: str) -> int:
+        """Earliest live intervention id with an air quality"""
+        ids = self._quality_ids[quality]
+        while ids and self.contributions.get(ids[0], {}).get("air_quality") != quality:
+            heapq.heappop(ids)
+        return ids[0]
+
+    def apply(self, intervention_id: int, contribution: Dict, sign: int):
+        """Add (sign=1) or subtract (sign=-1) one contribution from the totals"""
+        self.count += sign
+        self.sums = [total + sign * Fraction(value) for total, value in zip(self.sums, contribution["sums"])]
+        self.air_counts[contribution["air_quality"]] += sign
+        if sign > 0:
+            self.contributions[intervention_id] = contribution
+            heapq.heappush(self._quality_ids[contribution["air_quality"]], intervention_id)
+        else:
+            del self.contributions[intervention_id]
+
+
+class InMemorySessionStore:
+    """
+    Simulation state for interactive editing sessions, held in process memory.
+
+    A session keeps running totals of its interventions' contributions
+    (base temperature, predicted impacts, health bonus and air quality
+    counts), so adding, updating or removing one intervention predicts only
+    that intervention and rescores the scenario from the totals in O(1),
+    instead of re-simulating the whole list. Results match
+    evaluate_scenario on the same interventions. Edits touch no disk; this
+    is the store used unless sessions must be shared between workers.
+    Sessions expire `ttl` seconds after their last edit.
+    """
+
+    contribution = staticmethod(session_contribution)
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self._operations = 0
+
+    def _session(self, session_id: str) -> _Session:
+        """A live session (caller holds the lock); KeyError if unknown or expired"""
+        session = self._sessions.get(session_id)
+        if session is None or time.time() - session.updated_at >= self.ttl:
+            raise KeyError(f"Unknown or expired simulation session {session_id}")
+        return session
+
+    def create(self) -> Tuple[str, Dict]:
+        """Start an empty session: (session_id, metrics)"""
+        session_id = uuid.uuid4().hex
+        session = _Session()
+        with self._lock:
+            self._sessions[session_id] = session
+            self._maybe_prune()
+            return session_id, metrics_from_totals(session.totals(), session.first_id)
+
+    def _apply(self, session_id: str, intervention_id: Optional[int],
+               added: Optional[Dict], removed_must_exist: bool) -> Dict:
+        """Swap one contribution and return {version, intervention_id, changed}"""
+        with self._lock:
+            session = self._session(session_id)
+            before = metrics_from_totals(session.totals(), session.first_id)
+            if removed_must_exist:
+                old = session.contributions.get(intervention_id)
+                if old is None:
+                    raise KeyError(f"Unknown intervention {intervention_id} in session {session_id}")
+                session.apply(intervention_id, old, -1)
+            else:
+                intervention_id = session.next_id
+                session.next_id += 1
+            if added is not None:
+                session.apply(intervention_id, added, 1)
+            session.version += 1
+            session.updated_at = time.time()
+            after = metrics_from_totals(session.totals(), session.first_id)
+            self._maybe_prune()
+            return {"version": session.version, "intervention_id": intervention_id, "changed": _changed(before, after)}
+
+    def add(self, session_id: str, contribution: Dict) -> Dict:
+        """Add an intervention (see contribution()); it gets the next intervention id"""
+        return self._apply(session_id, None, contribution, removed_must_exist=False)
+
+    def update(self, session_id: str, intervention_id: int, contribution: Dict) -> Dict:
+        """Replace an intervention, keeping its id and position"""
+        return self._apply(session_id, intervention_id, contribution, removed_must_exist=True)
+
+    def remove(self, session_id: str, intervention_id: int) -> Dict:
+        """Remove an intervention"""
+        return self._apply(session_id, intervention_id, None, removed_must_exist=True)
+
+    def get(self, session_id: str) -> Dict:
+        """Full session state: version, metrics and interventions by id"""
+        with self._lock:
+            session = self._session(session_id)
+            metrics = metrics_from_totals(session.totals(), session.first_id)
+            interventions: List[Dict] = [
+                {"id": intervention_id, **session.contributions[intervention_id]["intervention"]}
+                for intervention_id in sorted(session.contributions)
+            ]
+            return {"version": session.version, "metrics": metrics, "interventions": interventions}
+
+    def delete(self, session_id: str) -> bool:
+        """End a session; False if it didn't exist"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _maybe_prune(self):
+        """Drop expired sessions every PRUNE_EVERY operations (caller holds the lock)"""
+        self._operations += 1
+        if self._operations < PRUNE_EVERY:
+            return
+        self._operations = 0
+        cutoff = time.time() - self.ttl
+        for session_id in [key for key, session in self._sessions.items() if session.updated_at < cutoff]:
+            del self._sessions[session_id]
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "ttl": self.ttl, "shared": False}
+
+
+class SimulationSessionStore:
+    """
+    Session state shared by every worker process through a SQLite file.
+
+    Same running-totals model and interface as InMemorySessionStore, but
+    each edit is one short transaction on the file. That disk round trip is
+    the price of sharing: with several API workers (run.py --production)
+    any worker may receive a session's next edit, so no worker's memory can
+    be the source of truth. Single-process deployments use
+    InMemorySessionStore instead. Sessions expire `ttl` seconds after their
+    last edit.
+    """
+
+    contribution = staticmethod(session_contribution)
+
+    def __init__(self, path: str, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._db = None
+        self._lock = threading.Lock()
+        self._operations = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.path != ":memory:" and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _metrics(self, db: sqlite3.Connection, session_id: str, totals: Tuple) -> Dict:
+        """Scenario metrics from a session's totals row"""
+        # Index lookup: the first intervention id of a tied air quality
+        return metrics_from_totals(totals, lambda quality: db.execute(
+            "SELECT MIN(intervention_id) FROM session_interventions WHERE session_id = ? AND air_quality = ?",
+            (session_id, quality)
+        ).fetchone()[0])
+
+    # Session lifecycle
+
+    def create(self) -> Tuple[str, Dict]:
+        """Start an empty session: (session_id, metrics)"""
+        session_id = uuid.uuid4().hex
+        totals = (0,) + (Fraction(0),) * len(_SUM_COLUMNS) + (0,) * len(AIR_QUALITIES)
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                f"INSERT INTO sessions (id, version, next_id, updated_at, {', '.join(_TOTAL_COLUMNS)}) "
+                f"VALUES (?, 0, 1, ?, {', '.join('?' * len(_TOTAL_COLUMNS))})",
+                (session_id, time.time(), *self._stored(totals))
+            )
+            self._maybe_prune(db)
+            return session_id, self._metrics(db, session_id, totals)
+
+    def _load_totals(self, db: sqlite3.Connection, session_id: str) -> Tuple[int, int, Tuple]:
+        """(version, next_id, totals) of a live session; KeyError if unknown or expired"""
+        row = db.execute(
+            f"SELECT version, next_id, updated_at, {', '.join(_TOTAL_COLUMNS)} FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[2] >= self.ttl:
+            raise KeyError(f"Unknown or expired simulation session {session_id}")
+        totals = row[3:]
+        sums = tuple(Fraction(total) for total in totals[1:1 + len(_SUM_COLUMNS)])
+        return row[0], row[1], (totals[0], *sums, *totals[1 + len(_SUM_COLUMNS):])
+
+    @staticmethod
+    def _stored(totals: Tuple) -> Tuple:
+        """Totals as written to SQLite: exact sums as "n/d" text"""
+        sums = tuple(str(total) for total in totals[1:1 + len(_SUM_COLUMNS)])
+        return (totals[0], *sums, *totals[1 + len(_SUM_COLUMNS):])
+
+    def _apply(self, session_id: str, intervention_id: Optional[int],
+               added: Optional[Dict], removed_must_exist: bool) -> Dict:
+        """
+        Replace (or insert/delete) one intervention's contribution inside a
+        transaction and return {version, intervention_id, changed}, where
+        `changed` holds only the metrics whose values changed.
+        """
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                version, next_id, totals = self._load_totals(db, session_id)
+                before = self._metrics(db, session_id, totals)
+                delta_count = 0
+                delta_sums = [Fraction(0)] * len(_SUM_COLUMNS)
+                delta_air = dict.fromkeys(AIR_QUALITIES, 0)
+
+                if removed_must_exist:
+                    row = db.execute(
+                        "SELECT body FROM session_interventions WHERE session_id = ? AND intervention_id = ?",
+                        (session_id, intervention_id)
+                    ).fetchone()
+                    if row is None:
+                        raise KeyError(f"Unknown intervention {intervention_id} in session {session_id}")
+                    old = orjson.loads(row[0])
+                    delta_count -= 1
+                    delta_sums = [delta - Fraction(value) for delta, value in zip(delta_sums, old["sums"])]
+                    delta_air[old["air_quality"]] -= 1
+                else:
+                    intervention_id = next_id
+                    next_id += 1
+
+                if added is not None:
+                    delta_count += 1
+                    delta_sums = [delta + Fraction(value) for delta, value in zip(delta_sums, added["sums"])]
+                    delta_air[added["air_quality"]] += 1
+                    db.execute(
+                        "INSERT OR REPLACE INTO session_interventions "
+                        "(session_id, intervention_id, air_quality, body) VALUES (?, ?, ?, ?)",
+                        (session_id, intervention_id, added["air_quality"], orjson.dumps(added))
+                    )
+                else:
+                    db.execute(
+                        "DELETE FROM session_interventions WHERE session_id = ? AND intervention_id = ?",
+                        (session_id, intervention_id)
+                    )
+
+                count = totals[0] + delta_count
+                sums = [total + delta for total, delta in zip(totals[1:1 + len(_SUM_COLUMNS)], delta_sums)]
+                air = [n + delta_air[quality] for quality, n in zip(AIR_QUALITIES, totals[1 + len(_SUM_COLUMNS):])]
+                new_totals = (count, *sums, *air)
+                db.execute(
+                    f"UPDATE sessions SET version = ?, next_id = ?, updated_at = ?, "
+                    f"{', '.join(f'{column} = ?' for column in _TOTAL_COLUMNS)} WHERE id = ?",
+                    (version + 1, next_id, time.time(), *self._stored(new_totals), session_id)
+                )
+                after = self._metrics(db, session_id, new_totals)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._maybe_prune(db)
+
+        return {
+            "version": version + 1,
+            "intervention_id": intervention_id,
+            "changed": _changed(before, after)
+        }
+
+    def add(self, session_id: str, contribution: Dict) -> Dict:
+        """Add an intervention (see contribution()); it gets the next intervention id"""
+        return self._apply(session_id, None, contribution, removed_must_exist=False)
+
+    def update(self, session_id: str, intervention_id: int, contribution: Dict) -> Dict:
+        """Replace an intervention, keeping its id and position"""
+        return self._apply(session_id, intervention_id, contribution, removed_must_exist=True)
+
+    def remove(self, session_id: str, intervention_id: int) -> Dict:
+        """Remove an intervention"""
+        return self._apply(session_id, intervention_id, None, removed_must_exist=True)
+
+    def get(self, session_id: str) -> Dict:
+        """Full session state: version, metrics and interventions by id"""
+        with self._lock:
+            db = self._connect()
+            version, _, totals = self._load_totals(db, session_id)
+            rows = db.execute(
+                "SELECT intervention_id, body FROM session_interventions WHERE session_id = ? ORDER BY intervention_id",
+                (session_id,)
+            ).fetchall()
+            metrics = self._metrics(db, session_id, totals)
+        interventions: List[Dict] = [
+            {"id": intervention_id, **orjson.loads(body)["intervention"]} for intervention_id, body in rows
+        ]
+        return {"version": version, "metrics": metrics, "interventions": interventions}
+
+    def delete(self, session_id: str) -> bool:
+        """End a session; False if it didn't exist"""
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM session_interventions WHERE session_id = ?", (session_id,))
+            return db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def _maybe_prune(self, db: sqlite3.Connection):
+        """Drop expired sessions every PRUNE_EVERY operations (caller holds the lock)"""
+        self._operations += 1
+        if self._operations < PRUNE_EVERY:
+            return
+        self._operations = 0
+        cutoff = time.time() - self.ttl
+        db.execute(
+            "DELETE FROM session_interventions WHERE session_id IN (SELECT id FROM sessions WHERE updated_at < ?)",
+            (cutoff,)
+        )
+        db.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            db = self._connect()
+            sessions, = db.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return {"sessions": sessions, "ttl": self.ttl, "shared": self.path != ":memory:"}
+
+
+# Singleton instance
+_session_store = None
+
+def get_session_store():
+    """
+    Get singleton session store: in process memory, or a SQLite file shared
+    between workers when SIMULATION_SESSION_PATH is set.
+    """
+    global _session_store
+    if _session_store is None:
+        path = os.getenv("SIMULATION_SESSION_PATH")
+        ttl = float(os.getenv("SIMULATION_SESSION_TTL", 3600))
+        _session_store = SimulationSessionStore(path=path, ttl=ttl) if path else InMemorySessionStore(ttl=ttl)
+    return _session_store
@@ -0,0 +1,218 @@
+"""
+Process-wide simulation result cache keyed by canonical scenario hash
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Sequence
+import orjson
+
+# Rounding that makes near-identical scenarios share a key:
+# ~11 m for locations, 0.1 m² for areas, 0.01°C for base temperatures
+LOCATION_DECIMALS = 4
+AREA_DECIMALS = 1
+TEMPERATURE_DECIMALS = 2
+PRUNE_EVERY = 256  # puts between removals of expired rows from disk
+
+
+def scenario_key(interventions: Iterable[Dict], weather_version: Optional[str] = None,
+                 air_qualities: Optional[Sequence[str]] = None) -> str:
+    """
+    Canonical hash of a scenario: interventions rounded and sorted, so order
+    and float noise don't matter, plus the air quality each was resolved
+    with and the weather version (if any) of unresolved base temperatures.
+    """
+    interventions = list(interventions)
+    if air_qualities is None:
+        air_qualities = [None] * len(interventions)
+    canonical = sorted(
+        (
+            intervention.get("type", "trees"),
+            int(intervention.get("count") or 0),
+            round(float(intervention.get("area") or 0), AREA_DECIMALS),
+            round(float(intervention["location"][0]), LOCATION_DECIMALS),
+            round(float(intervention["location"][1]), LOCATION_DECIMALS),
+            # (has base temperature, value): keeps the tuples sortable
+            intervention.get("base_temperature") is not None,
+            round(float(intervention.get("base_temperature") or 0), TEMPERATURE_DECIMALS),
+            air_quality or ""
+        )
+        for intervention, air_quality in zip(interventions, air_qualities)
+    )
+    payload = orjson.dumps({"interventions": canonical, "weather": weather_version})
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class SimulationResultCache:
+    """
+    LRU cache of simulation results with a TTL, shared by all requests in a
+    process and optionally persisted to SQLite so hits survive restarts (and
+    are shared by workers pointing at the same file). Concurrent misses for
+    the same key share a single computation.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 600, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._puts_since_prune = 0
+
+        # Monitoring counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.shared = 0
+
+    # Memory tier
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Fresh in-memory entry for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if time.time() - created_at >= self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _remember(self, key: str, value: Dict, created_at: float):
+        with self._lock:
+            self._entries[key] = (created_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Disk tier (blocking; called off the event loop)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, created_at REAL, value BLOB)")
+            self._db = db
+        return self._db
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Fresh persisted entry for a key (promoted to memory), or None"""
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT created_at, value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[0] >= self.ttl:
+            return None
+        value = orjson.loads(row[1])
+        self._remember(key, value, row[0])
+        return value
+
+    def persist(self, key: str, value: Dict, created_at: float):
+        """Write an entry to disk, pruning expired rows now and then"""
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, created_at, value) VALUES (?, ?, ?)",
+                (key, created_at, orjson.dumps(value))
+            )
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= PRUNE_EVERY:
+                self._puts_since_prune = 0
+                db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,))
+
+    # Async API
+
+    async def get_or_compute_async(self, key: str, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Cached result for a key, computing (once, however many callers wait) on a miss"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await asyncio.to_thread(self.load, key) if self.path else None
+            if value is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                value = await compute()
+                created_at = time.time()
+                self._remember(key, value, created_at)
+                if self.path:
+                    await asyncio.to_thread(self.persist, key, value, created_at)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict:
+        """Hit, miss and eviction counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.shared + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": self.path is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "shared": self.shared,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits + self.shared) / lookups, 3) if lookups else 0.0
+            }
+
+
+# Singleton instance
+_simulation_cache = None
+
+def get_simulation_cache() -> SimulationResultCache:
+    """Get singleton simulation result cache (persisted when SIMULATION_CACHE_PATH is set)"""
+    global _simulation_cache
+    if _simulation_cache is None:
+        _simulation_cache = SimulationResultCache(
+            max_entries=int(os.getenv("SIMULATION_CACHE_SIZE", 4096)),
+            ttl=float(os.getenv("SIMULATION_CACHE_TTL", 600)),
+            path=os.getenv("SIMULATION_CACHE_PATH") or None
+        )
+    return _simulation_cache
@@ -0,0 +1,157 @@
+"""
+Scenario evaluation and process-pool batch simulation
+"""
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Tuple
+import numpy as np
+from app.models.prediction import get_predictor, interventions_to_array
+from app.services.cooling_service import get_cooling_raster
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.health_service import get_health_service
+from app.services.weather_service import estimate_air_quality
+
+
+def evaluate_scenario(interventions: List[Dict], air_qualities: List[str]) -> Dict:
+    """
+    Evaluate one scenario: predicted impact plus health score.
+    Interventions must already carry their base temperature.
+    """
+    predictor = get_predictor()
+    health_service = get_health_service()
+
+    # Predict impact
+    impact = predictor.predict_intervention_impact(interventions)
+
+    # Calculate health score using health service
+    avg_temp = impact["average_temperature"]
+    # Counter breaks ties by first occurrence, so every worker picks the same value
+    avg_air_quality = Counter(air_qualities).most_common(1)[0][0] if air_qualities else "moderate"
+    impact["health_score"] = health_service.get_health_score(
+        temperature=avg_temp,
+        air_quality=avg_air_quality,
+        interventions=interventions
+    )
+    return impact
+
+
+def evaluate_spatial_scenario(interventions: List[Dict], grid: HeatmapGrid, resolution: int = 256) -> Dict:
+    """
+    Evaluate one scenario on the raster cooling model: each intervention's
+    predicted local reduction spreads over the heatmap by distance, and
+    overlapping footprints saturate. Interventions without a base
+    temperature take it from the heatmap at their location.
+    Returns metrics plus the cooled HeatmapGrid under "grid".
+    """
+    raster = get_cooling_raster(grid, resolution)
+    array = interventions_to_array([
+        {**intervention, "base_temperature": np.nan if intervention.get("base_temperature") is None
+         else intervention["base_temperature"]}
+        for intervention in interventions
+    ])
+    missing = np.isnan(array["base_temp"])
+    if missing.any():
+        array["base_temp"][missing] = raster.sample(raster.base, array["lat"][missing], array["lon"][missing])
+    
+    impacts = get_predictor().predict_impacts(array) if len(array) else np.zeros((0, 4))
+    result = raster.apply(array["type_code"], array["lat"], array["lon"], impacts[:, 0])
+    
+    health_score = get_health_service().get_health_score(
+        temperature=result["average_temperature"],
+        air_quality=estimate_air_quality(result["base_average_temperature"]),
+        interventions=interventions
+    )
+    metrics = {key: round(value, 3) for key, value in result.items() if key != "grid"}
+    metrics.update({
+        "energy_saving": round(float(impacts[:, 1].sum()), 2),
+        "co2_reduction": round(float(impacts[:, 2].sum()), 2),
+        "health_score": health_score,
+        "intervention_count": len(array),
+        "resolution": resolution,
+        "cell_size_m": round(float(np.sqrt(raster.cell_x_m * raster.cell_y_m)), 1)
+    })
+    return {"metrics": metrics, "grid": result["grid"]}
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, List[Dict], List[str]]]) -> List[Dict]:
+    """Worker entry point: evaluate a chunk of (index, interventions, air_qualities)"""
+    results = []
+    for index, interventions, air_qualities in chunk:
+        try:
+            result = evaluate_scenario(interventions, air_qualities)
+        except Exception as e:
+            result = {"error": str(e)}
+        result["index"] = index
+        results.append(result)
+    return results
+
+
+class BatchSimulationService:
+    """Runs scenario sweeps across a pool of worker processes"""
+
+    def __init__(self, max_workers: int = None, max_chunk_size: int = 256):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_chunk_size = max_chunk_size
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the worker pool on first use"""
+        if self._pool is None:
+            # spawn: workers must not inherit the API's event loop / client threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _chunk_size(self, n_scenarios: int) -> int:
+        # Several chunks per worker keeps the pool balanced and the stream flowing
+        return max(1, min(self.max_chunk_size, math.ceil(n_scenarios / (self.max_workers * 4))))
+
+    async def stream(self, scenarios: List[Tuple[List[Dict], List[str]]]) -> AsyncIterator[bytes]:
+        """
+        Evaluate scenarios in parallel and yield NDJSON lines in input order.
+        Each line is the scenario's impact metrics plus its input `index`.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        size = self._chunk_size(len(scenarios))
+
+        futures = []
+        for start in range(0, len(scenarios), size):
+            chunk = [
+                (start + offset, interventions, air_qualities)
+                for offset, (interventions, air_qualities) in enumerate(scenarios[start:start + size])
+            ]
+            futures.append(loop.run_in_executor(pool, _evaluate_chunk, chunk))
+
+        try:
+            # Chunks are awaited in submission order so output order matches input
+            for future in futures:
+                results = await future
+                yield "".join(json.dumps(result) + "\n" for result in results).encode()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Singleton instance
+_batch_simulation_service = None
+
+def get_batch_simulation_service() -> BatchSimulationService:
+    """Get singleton batch simulation service instance"""
+    global _batch_simulation_service
+    if _batch_simulation_service is None:
+        workers = os.getenv("SIMULATION_WORKERS")
+        _batch_simulation_service = BatchSimulationService(max_workers=int(workers) if workers else None)
+    return _batch_simulation_service
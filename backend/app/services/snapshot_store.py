@@ -0,0 +1,215 @@
+"""
+Cross-process heatmap snapshot store backed by memory-mapped files
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.hotspot_service import HotspotClustering
+
+# Snapshot file layout (all little-endian):
+#   magic "UHIS" | u16 format | u16 reserved | u64 version | u32 n_points | u32 header_len
+#   header JSON (space-padded to an 8-byte boundary): city, center, grid_size,
+#       recommendations and hotspot zones
+#   float64 lat[n] | float64 lon[n] | float64 temperature[n] | int32 cluster_label[n]
+STORE_MAGIC = b"UHIS"
+STORE_FORMAT = 1
+_STORE_HEADER = struct.Struct("<4sHHQII")
+MANIFEST_NAME = "current.json"
+LOCK_NAME = "producer.lock"
+
+
+def _json_default(value):
+    # Recommendations may carry NumPy scalars (np.float64 subclasses float, which orjson rejects)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError
+
+
+class StoredSnapshot:
+    """A snapshot read from the store; its arrays are read-only views of the mapped file"""
+
+    def __init__(self, version: int, grid: HeatmapGrid, recommendations: List[Dict],
+                 clustering: Optional[HotspotClustering]):
+        self.version = version
+        self.grid = grid
+        self.recommendations = recommendations
+        self.clustering = clustering
+
+
+class SnapshotStore:
+    """
+    Heatmap snapshots shared between worker processes through a directory.
+
+    One process (the producer, elected with an exclusive lock file) writes
+    each snapshot set to new files and then atomically replaces a small
+    manifest naming them and their version. Every other worker maps those
+    files read-only and views the arrays in place, so the page cache holds a
+    single copy however many workers there are.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+        self._manifest_stat = None
+        self._manifest = None
+        self._manifest_lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def try_acquire_producer(self) -> bool:
+        """Become the producer unless another live process holds the lock"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self._path(LOCK_NAME), "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # The OS drops the lock if this process dies, letting a reader take over
+        self._lock_file = lock_file
+        return True
+
+    def close(self):
+        """Release the producer lock"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # Producer side
+
+    def _write_snapshot(self, name: str, version: int, grid: HeatmapGrid,
+                        recommendations: List[Dict], clustering: Optional[HotspotClustering]):
+        header_json = orjson.dumps({
+            "city": grid.city,
+            "center": list(grid.center),
+            "grid_size": grid.grid_size,
+            "recommendations": recommendations,
+            "zones": clustering.zone_list() if clustering is not None else None
+        }, default=_json_default)
+        header_json += b" " * (-(len(header_json) + _STORE_HEADER.size) % 8)
+        labels = clustering.labels if clustering is not None else np.full(len(grid), -1)
+
+        temp_path = self._path(f".{name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(_STORE_HEADER.pack(STORE_MAGIC, STORE_FORMAT, 0, version, len(grid), len(header_json)))
+            f.write(header_json)
+            for column in (grid.lats, grid.lons, grid.temperatures):
+                f.write(np.ascontiguousarray(column, dtype="<f8").tobytes())
+            f.write(np.ascontiguousarray(labels, dtype="<i4").tobytes())
+        os.replace(temp_path, self._path(name))
+
+    def _replace_manifest(self, manifest: Dict):
+        temp_path = self._path(f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(orjson.dumps(manifest))
+        for attempt in range(5):
+            try:
+                os.replace(temp_path, self._path(MANIFEST_NAME))
+                return
+            except PermissionError:
+                # Windows refuses to replace a file a reader has open; retry briefly
+                if attempt == 4:
+                    raise
+                time.sleep(0.01)
+
+    def _remove_unreferenced(self, keep: set):
+        for name in os.listdir(self.directory):
+            if name.endswith(".snap") and name not in keep:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass  # still mapped by a reader on Windows; removed on a later publish
+
+    def publish(self, version: int, snapshots: Dict[Tuple[str, int], object]):
+        """
+        Write a complete snapshot set, then switch the manifest to it.
+        `snapshots` maps (city, grid_size) to objects with grid, recommendations
+        and clustering attributes.
+        """
+        files = {}
+        for (city, grid_size), snapshot in snapshots.items():
+            name = f"{city}-{grid_size}-{os.getpid()}-{version}.snap"
+            self._write_snapshot(name, version, snapshot.grid, snapshot.recommendations, snapshot.clustering)
+            files[f"{city}:{grid_size}"] = name
+        self._replace_manifest({"producer": os.getpid(), "version": version, "files": files})
+        self._remove_unreferenced(set(files.values()))
+
+    # Reader side
+
+    def manifest(self) -> Optional[Dict]:
+        """The current manifest, re-read only when the file changes"""
+        try:
+            stat = os.stat(self._path(MANIFEST_NAME))
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._manifest_lock:
+            if key != self._manifest_stat:
+                try:
+                    with open(self._path(MANIFEST_NAME), "rb") as f:
+                        self._manifest = orjson.loads(f.read())
+                except (OSError, orjson.JSONDecodeError):
+                    return self._manifest
+                self._manifest_stat = key
+            return self._manifest
+
+    def load(self, name: str) -> StoredSnapshot:
+        """Map a snapshot file read-only and view its arrays without copying"""
+        with open(self._path(name), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, file_format, _, version, n_points, header_len = _STORE_HEADER.unpack_from(buffer, 0)
+        if magic != STORE_MAGIC or file_format != STORE_FORMAT:
+            raise ValueError(f"{name} is not a format {STORE_FORMAT} snapshot file")
+        offset = _STORE_HEADER.size
+        header = orjson.loads(buffer[offset:offset + header_len])
+        offset += header_len
+
+        columns = []
+        for _ in range(3):
+            columns.append(np.frombuffer(buffer, dtype="<f8", count=n_points, offset=offset))
+            offset += 8 * n_points
+        labels = np.frombuffer(buffer, dtype="<i4", count=n_points, offset=offset)
+
+        grid = HeatmapGrid(*columns, city=header["city"], center=tuple(header["center"]),
+                           grid_size=header["grid_size"])
+        clustering = None
+        if header["zones"] is not None:
+            zones = {zone["cluster_id"]: zone for zone in header["zones"]}
+            clustering = HotspotClustering(grid.version, zones, labels)
+        return StoredSnapshot(version, grid, header["recommendations"], clustering)
+
+    def get_stats(self) -> Dict:
+        manifest = self.manifest()
+        return {
+            "directory": self.directory,
+            "producer": self._lock_file is not None,
+            "version": manifest["version"] if manifest else None
+        }
+
+
+# Singleton instance
+_snapshot_store = None
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Get the shared snapshot store, or None when SNAPSHOT_STORE_DIR is unset"""
+    global _snapshot_store
+    directory = os.getenv("SNAPSHOT_STORE_DIR")
+    if _snapshot_store is None and directory:
+        _snapshot_store = SnapshotStore(directory)
+    return _snapshot_store
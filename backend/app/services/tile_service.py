@@ -0,0 +1,130 @@
+"""
+Multi-resolution heatmap tile pyramid (XYZ / Web Mercator tiles)
+"""
+import math
+import os
+from typing import Dict, Tuple
+import numpy as np
+from app.services.weather_service import get_weather_service, CITY_CENTERS
+from app.utils.cache import SWRCache
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Bounds of an XYZ tile as (lat_min, lon_min, lat_max, lon_max)"""
+    n = 2 ** z
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return lat_min, lon_min, lat_max, lon_max
+
+
+class HeatmapTileService:
+    """
+    Lazily built temperature raster pyramid.
+
+    Tiles at `max_zoom` (the base level) are sampled from the temperature
+    source at each pixel centre, but only inside the city bounds. The
+    `pool_levels` zooms just below it are 2x2 mean-pooled from their four
+    children, so one request renders at most 4 ** pool_levels base tiles.
+    Coarser tiles are sampled directly at their own resolution, which costs
+    the same as one base tile and never touches the fine grid. Tiles above
+    `max_zoom` are nearest-neighbour crops of their base ancestor. Every tile
+    is computed on first request and then served from an LRU cache.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float], max_zoom: int = 14,
+                 tile_size: int = 64, cache_entries: int = 2048, cache_ttl: float = 300,
+                 pool_levels: int = 2):
+        self.bounds = bounds  # (lat_min, lon_min, lat_max, lon_max)
+        self.max_zoom = max_zoom
+        self.pool_levels = pool_levels
+        self.tile_size = tile_size
+        self._cache = SWRCache(max_entries=cache_entries, ttl=cache_ttl, stale_ttl=3600)
+        self._empty = np.full((tile_size, tile_size), np.nan, dtype=np.float32)
+        self._empty.setflags(write=False)
+
+    def _intersects(self, z: int, x: int, y: int) -> bool:
+        lat_min, lon_min, lat_max, lon_max = tile_bounds(z, x, y)
+        b_lat_min, b_lon_min, b_lat_max, b_lon_max = self.bounds
+        return not (lat_max < b_lat_min or lat_min > b_lat_max or lon_max < b_lon_min or lon_min > b_lon_max)
+
+    def _pixel_centers(self, z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes (north to south) and longitudes (west to east) of pixel centres"""
+        n = 2 ** z
+        offsets = (np.arange(self.tile_size) + 0.5) / self.tile_size
+        lons = (x + offsets) / n * 360.0 - 180.0
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+        return lats, lons
+
+    def _render_sampled(self, z: int, x: int, y: int) -> np.ndarray:
+        """Sample the temperature source at every in-bounds pixel centre"""
+        lats, lons = self._pixel_centers(z, x, y)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        inside = (lat_grid >= lat_min) & (lat_grid <= lat_max) & (lon_grid >= lon_min) & (lon_grid <= lon_max)
+
+        tile = np.full((self.tile_size, self.tile_size), np.nan, dtype=np.float32)
+        if inside.any():
+            tile[inside] = get_weather_service().get_temperatures(lat_grid[inside], lon_grid[inside])
+        return tile
+
+    def _render_from_children(self, z: int, x: int, y: int) -> np.ndarray:
+        """Downsample the four child tiles with a NaN-aware 2x2 mean"""
+        size = self.tile_size
+        mosaic = np.empty((2 * size, 2 * size), dtype=np.float32)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                mosaic[dy * size:(dy + 1) * size, dx * size:(dx + 1) * size] = self.get_tile(z + 1, 2 * x + dx, 2 * y + dy)
+
+        blocks = mosaic.reshape(size, 2, size, 2)
+        valid = ~np.isnan(blocks)
+        counts = valid.sum(axis=(1, 3))
+        sums = np.where(valid, blocks, 0).sum(axis=(1, 3))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+    def _render_overzoom(self, z: int, x: int, y: int) -> np.ndarray:
+        """Nearest-neighbour crop of the base-level ancestor tile"""
+        factor = 2 ** (z - self.max_zoom)
+        ancestor = self.get_tile(self.max_zoom, x // factor, y // factor)
+        offsets = np.arange(self.tile_size) + 0.5
+        cols = (((x % factor) * self.tile_size + offsets) / factor).astype(int)
+        rows = (((y % factor) * self.tile_size + offsets) / factor).astype(int)
+        return ancestor[np.ix_(rows, cols)]
+
+    def _render(self, z: int, x: int, y: int) -> np.ndarray:
+        if z > self.max_zoom:
+            return self._render_overzoom(z, x, y)
+        if not self._intersects(z, x, y):
+            return self._empty
+        if z == self.max_zoom or z < self.max_zoom - self.pool_levels:
+            return self._render_sampled(z, x, y)
+        return self._render_from_children(z, x, y)
+
+    def get_tile(self, z: int, x: int, y: int) -> np.ndarray:
+        """Temperature raster for a tile, rows north to south; NaN outside the city"""
+        if z <= self.max_zoom and not self._intersects(z, x, y):
+            return self._empty
+        return self._cache.get_or_load((z, x, y), lambda: self._render(z, x, y))
+
+    def get_stats(self) -> Dict:
+        return self._cache.get_stats()
+
+
+# Singleton instance
+_tile_service = None
+
+def get_tile_service() -> HeatmapTileService:
+    """Get singleton tile service instance, covering the Pune heatmap extent"""
+    global _tile_service
+    if _tile_service is None:
+        weather_service = get_weather_service()
+        center_lat, center_lon = CITY_CENTERS["pune"]
+        extent = weather_service.grid_range
+        _tile_service = HeatmapTileService(
+            bounds=(center_lat - extent, center_lon - extent, center_lat + extent, center_lon + extent),
+            max_zoom=int(os.getenv("HEATMAP_TILE_MAX_ZOOM", 14)),
+            pool_levels=int(os.getenv("HEATMAP_TILE_POOL_LEVELS", 2))
+        )
+    return _tile_service
@@ -0,0 +1,32 @@
+"""
+Optional warm-up of lazily imported dependencies and models
+"""
+import importlib
+import time
+from typing import Dict
+from app.models.prediction import get_predictor
+
+# Heavy dependencies the API defers until first use
+LAZY_MODULES = ("scipy.spatial", "sklearn.cluster", "xgboost", "httpx")
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Import deferred dependencies and load the intervention model ahead of
+    the first request. Returns the time spent on each step in milliseconds.
+    """
+    timings = {}
+    for module in LAZY_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Warm-up could not import {module}: {e}")
+        timings[module] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    get_predictor().predict_intervention_impact([
+        {"type": "trees", "count": 1, "location": [18.5204, 73.8567], "base_temperature": 35}
+    ])
+    timings["intervention_model"] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
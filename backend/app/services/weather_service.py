@@ -1,214 +1,257 @@
 """
 Weather Service for fetching real-time Pune temperature data
 """
-import requests
 import os
 from typing import List, Dict, Tuple
 import numpy as np
 import json
-import math
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.openweather_client import OpenWeatherClient
+from app.utils.cache import SWRCache
+from app.utils.executor import run_cpu
+from app.utils.geo import haversine_km
+from app.utils.rng import coordinate_keys, make_generator, splitmix64
+from app.utils.spatial import SpatialIndex
+
+# City centers available for heatmap generation
+CITY_CENTERS = {
+    "pune": (18.5204, 73.8567),
+}
+
+# UHI hotspot zones as (lat, lon, peak temperature °C)
+HOTSPOT_ZONES = np.array([
+    (18.5204, 73.8567, 38.5),  # City center - hottest
+    (18.5350, 73.8400, 37.2),  # Commercial area
+    (18.5100, 73.8700, 36.8),  # Dense residential
+    (18.5500, 73.8200, 35.5),  # Suburban
+    (18.4800, 73.8900, 34.2),  # Peri-urban
+])
+
+# Built once on first use; scales sub-linearly as hotspot zones are added
+_hotspot_index = None
+
+def _get_hotspot_index() -> SpatialIndex:
+    global _hotspot_index
+    if _hotspot_index is None:
+        _hotspot_index = SpatialIndex(HOTSPOT_ZONES[:, 0], HOTSPOT_ZONES[:, 1])
+    return _hotspot_index
+
+
+def _coordinate_variation(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Deterministic -1.5..1.5°C variation per coordinate (rounded to 3 decimals).
+    Uses a stable integer hash so every process and worker agrees.
+    """
+    coord_hash = (splitmix64(coordinate_keys(lats, lons, scale=1000)) % np.uint64(1000)).astype(np.float64)
+    return (coord_hash / 1000.0 - 0.5) * 3.0
+
 
 class WeatherService:
     """Service for fetching and processing weather data"""
     
     def __init__(self):
         self.openweather_api_key = os.getenv("OPENWEATHER_API_KEY", "")
-        self.pune_center = (18.5204, 73.8567)  # Pune coordinates
-        self.base_url = "http://api.openweathermap.org/data/2.5"
-        self._heatmap_cache = None
-        self._cache_timestamp = None
+        self.pune_center = CITY_CENTERS["pune"]  # Pune coordinates
+        self.base_url = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5")
+        self.api_max_concurrency = int(os.getenv("OPENWEATHER_MAX_CONCURRENCY", 8))
+        self._api_client = None
         self._cache_ttl = 300  # Cache for 5 minutes
+        self._cache_stale_ttl = 3600  # Serve stale for up to an hour while refreshing
+        self.grid_range = 0.15  # ~15km radius
+        self._heatmap_cache = SWRCache(
+            max_entries=16,
+            ttl=self._cache_ttl,
+            stale_ttl=self._cache_stale_ttl
+        )
     
-    def _generate_grid_coordinates(self, center_lat: float, center_lon: float, grid_size: int = 20) -> List[Tuple[float, float]]:
+    def _generate_grid_coordinates(self, center_lat: float, center_lon: float, grid_size: int = 20) -> Tuple[np.ndarray, np.ndarray]:
         """
         Generate a grid of coordinates around Pune for heatmap visualization.
         Creates a smooth distribution for continuous heatmap appearance.
+        Returns flat (lats, lons) arrays in row-major order.
         """
-        coordinates = []
         # Create a grid with some randomness for natural look
-        lat_range = 0.15  # ~15km radius
-        lon_range = 0.15
+        lat_range = self.grid_range
+        lon_range = self.grid_range
         
-        # Use fixed seed for consistent heatmap (can be removed for more variation)
-        np.random.seed(42)
+        steps = np.arange(grid_size) / grid_size - 0.5
+        lat_steps, lon_steps = np.meshgrid(steps * 2 * lat_range, steps * 2 * lon_range, indexing="ij")
         
-        for i in range(grid_size):
-            for j in range(grid_size):
-                # Create a more uniform grid with slight variations
-                lat_step = (i / grid_size - 0.5) * 2 * lat_range
-                lon_step = (j / grid_size - 0.5) * 2 * lon_range
-                
-                # Add small random offset for natural variation
-                lat_offset = np.random.uniform(-0.01, 0.01)
-                lon_offset = np.random.uniform(-0.01, 0.01)
-                
-                lat = center_lat + lat_step + lat_offset
-                lon = center_lon + lon_step + lon_offset
-                
-                coordinates.append((lat, lon))
+        # Per-call generator seeded from the grid parameters: consistent heatmap
+        # without touching global RNG state, so grids can be built in parallel threads
+        rng = make_generator("grid", center_lat, center_lon, grid_size)
+        offsets = rng.uniform(-0.01, 0.01, size=(grid_size * grid_size, 2))
         
-        return coordinates
+        lats = center_lat + lat_steps.ravel() + offsets[:, 0]
+        lons = center_lon + lon_steps.ravel() + offsets[:, 1]
+        return lats, lons
     
-    def _get_temperature_from_api(self, lat: float, lon: float) -> float:
-        """Get temperature from OpenWeatherMap API"""
-        if not self.openweather_api_key:
-            # Fallback: Generate realistic temperature based on location
-            return self._generate_synthetic_temperature(lat, lon)
-        
-        try:
-            url = f"{self.base_url}/weather"
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "appid": self.openweather_api_key,
-                "units": "metric"
-            }
-            response = requests.get(url, params=params, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return data["main"]["temp"]
-            else:
-                return self._generate_synthetic_temperature(lat, lon)
-        except Exception as e:
-            print(f"Error fetching weather data: {e}")
-            return self._generate_synthetic_temperature(lat, lon)
-    
-    def _fast_distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """
-        Fast distance calculation using Haversine formula (much faster than geodesic).
-        Accurate enough for small distances like within a city.
-        """
-        # Haversine formula
-        R = 6371  # Earth radius in km
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = (math.sin(dlat / 2) ** 2 + 
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-             math.sin(dlon / 2) ** 2)
-        c = 2 * math.asin(math.sqrt(a))
-        return R * c
+    def _get_api_client(self) -> OpenWeatherClient:
+        """Get the pooled OpenWeatherMap client, created on first use"""
+        if self._api_client is None:
+            self._api_client = OpenWeatherClient(
+                api_key=self.openweather_api_key,
+                base_url=self.base_url,
+                max_concurrency=self.api_max_concurrency
+            )
+        return self._api_client
     
-    def _generate_synthetic_temperature(self, lat: float, lon: float) -> float:
+    def generate_synthetic_temperatures(self, lats, lons) -> np.ndarray:
         """
-        Generate synthetic temperature data that creates realistic UHI patterns.
-        Simulates higher temperatures in urban centers and lower in peripheral areas.
-        Optimized with fast distance calculation.
+        Generate synthetic temperatures for many points at once.
+        Creates realistic UHI patterns: higher temperatures in urban centers and
+        lower in peripheral areas. Distances to every hotspot zone are computed
+        with a spatial-index lookup of each point's closest hotspot zone.
         """
-        # Base temperature (Pune average: ~28-35°C)
-        base_temp = 32.0
-        
-        # UHI effect: higher temperature in city center, lower in periphery
-        # Create hotspot zones
-        hotspot_zones = [
-            (18.5204, 73.8567, 38.5),  # City center - hottest
-            (18.5350, 73.8400, 37.2),  # Commercial area
-            (18.5100, 73.8700, 36.8),  # Dense residential
-            (18.5500, 73.8200, 35.5),  # Suburban
-            (18.4800, 73.8900, 34.2),  # Peri-urban
-        ]
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
         
-        # Find closest hotspot using fast distance calculation
-        min_distance = float('inf')
-        closest_temp = base_temp
+        # Closest hotspot via KD-tree, then exact Haversine distance to it
+        _, closest = _get_hotspot_index().nearest(lats, lons)
+        min_distance = haversine_km(lats, lons, HOTSPOT_ZONES[closest, 0], HOTSPOT_ZONES[closest, 1])
         
-        for zone_lat, zone_lon, zone_temp in hotspot_zones:
-            zone_distance = self._fast_distance_km(zone_lat, zone_lon, lat, lon)
-            if zone_distance < min_distance:
-                min_distance = zone_distance
-                closest_temp = zone_temp
+        # Apply distance-based cooling from the closest hotspot
+        temperatures = HOTSPOT_ZONES[closest, 2] - (min_distance * 0.1)  # Cool by 0.1°C per km
         
-        # Apply distance-based cooling
-        temperature = closest_temp - (min_distance * 0.1)  # Cool by 0.1°C per km
-        
-        # Add some natural variation (using deterministic seed for consistency)
-        # Use hash of coordinates for consistent variation
-        coord_hash = hash((round(lat, 3), round(lon, 3))) % 1000
-        variation = (coord_hash / 1000.0 - 0.5) * 3.0  # -1.5 to 1.5
-        temperature += variation
+        # Add deterministic natural variation for consistency across requests
+        temperatures += _coordinate_variation(lats, lons)
         
         # Ensure reasonable range
-        temperature = max(25, min(42, temperature))
-        
-        return round(temperature, 1)
+        return np.round(np.clip(temperatures, 25, 42), 1)
+    
+    def _generate_synthetic_temperature(self, lat: float, lon: float) -> float:
+        """Generate synthetic temperature for a single point"""
+        return float(self.generate_synthetic_temperatures([lat], [lon])[0])
     
-    def get_heatmap_data(self, grid_size: int = 25) -> Dict:
+    def _fill_missing_temperatures(self, lats, lons, temperatures: np.ndarray) -> np.ndarray:
+        """Replace failed API lookups (NaN) with synthetic temperatures"""
+        missing = np.isnan(temperatures)
+        if missing.any():
+            lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+            lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+            temperatures[missing] = self.generate_synthetic_temperatures(lats[missing], lons[missing])
+        return np.round(temperatures, 1)
+    
+    def get_temperatures(self, lats, lons) -> np.ndarray:
         """
-        Get heatmap data for Pune as GeoJSON FeatureCollection.
-        Returns smooth, continuous heatmap data.
-        Uses caching to improve performance.
+        Get temperatures for a batch of coordinates.
+        Uses the vectorized synthetic engine unless an OpenWeatherMap key is configured,
+        in which case points are fetched concurrently through the pooled API client.
         """
-        import time
-        
-        # Check cache (use same grid size or smaller)
-        current_time = time.time()
-        if (self._heatmap_cache and 
-            self._cache_timestamp and 
-            (current_time - self._cache_timestamp) < self._cache_ttl and
-            len(self._heatmap_cache.get("features", [])) >= grid_size * grid_size):
-            # Return cached data (it has enough points)
-            return self._heatmap_cache
-        
-        coordinates = self._generate_grid_coordinates(
-            self.pune_center[0],
-            self.pune_center[1],
-            grid_size
+        if not self.openweather_api_key:
+            return self.generate_synthetic_temperatures(lats, lons)
+        temperatures = self._get_api_client().fetch_temperatures(lats, lons)
+        return self._fill_missing_temperatures(lats, lons, temperatures)
+    
+    async def get_temperatures_async(self, lats, lons) -> np.ndarray:
+        """Async variant of get_temperatures that doesn't block the event loop on API calls"""
+        if not self.openweather_api_key:
+            return await run_cpu(self.generate_synthetic_temperatures, lats, lons)
+        temperatures = await self._get_api_client().fetch_temperatures_async(lats, lons)
+        return self._fill_missing_temperatures(lats, lons, temperatures)
+    
+    def _heatmap_cache_key(self, grid_size: int, city: str = "pune") -> Tuple:
+        """Cache key: (grid_size, bbox, data source)"""
+        center_lat, center_lon = CITY_CENTERS[city]
+        bbox = (
+            round(center_lat - self.grid_range, 4),
+            round(center_lon - self.grid_range, 4),
+            round(center_lat + self.grid_range, 4),
+            round(center_lon + self.grid_range, 4)
+        )
+        source = "openweather" if self.openweather_api_key else "synthetic"
+        return (grid_size, bbox, source)
+    
+    def _build_heatmap(self, lats: np.ndarray, lons: np.ndarray, temperatures: np.ndarray,
+                       city: str, grid_size: int) -> HeatmapGrid:
+        """Wrap grid arrays in a HeatmapGrid"""
+        return HeatmapGrid(lats, lons, temperatures, city, CITY_CENTERS[city], grid_size)
+    
+    def _load_heatmap(self, grid_size: int, city: str = "pune") -> HeatmapGrid:
+        """Generate a fresh heatmap, bypassing the cache"""
+        center_lat, center_lon = CITY_CENTERS[city]
+        lats, lons = self._generate_grid_coordinates(center_lat, center_lon, grid_size)
+        temperatures = self.get_temperatures(lats, lons)
+        return self._build_heatmap(lats, lons, temperatures, city, grid_size)
+    
+    async def _load_heatmap_async(self, grid_size: int, city: str = "pune") -> HeatmapGrid:
+        """Async variant of _load_heatmap; CPU steps run on the bounded executor"""
+        center_lat, center_lon = CITY_CENTERS[city]
+        lats, lons = await run_cpu(self._generate_grid_coordinates, center_lat, center_lon, grid_size)
+        temperatures = await self.get_temperatures_async(lats, lons)
+        return await run_cpu(self._build_heatmap, lats, lons, temperatures, city, grid_size)
+    
+    def get_heatmap_grid(self, grid_size: int = 25, city: str = "pune") -> HeatmapGrid:
+        """
+        Get the array-backed heatmap grid for a city.
+        Cached per (grid_size, bbox, source); stale entries are served while
+        a background refresh regenerates them.
+        """
+        return self._heatmap_cache.get_or_load(
+            self._heatmap_cache_key(grid_size, city),
+            lambda: self._load_heatmap(grid_size, city)
         )
-        
-        features = []
-        for lat, lon in coordinates:
-            temperature = self._get_temperature_from_api(lat, lon)
-            
-            # Create a small circular area for each point (for heatmap visualization)
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [lon, lat]
-                },
-                "properties": {
-                    "temperature": temperature,
-                    "lat": lat,
-                    "lon": lon
-                }
-            }
-            features.append(feature)
-        
-        result = {
-            "type": "FeatureCollection",
-            "features": features,
-            "metadata": {
-                "city": "Pune",
-                "center": [self.pune_center[1], self.pune_center[0]],
-                "total_points": len(features),
-                "avg_temperature": round(np.mean([f["properties"]["temperature"] for f in features]), 1),
-                "max_temperature": round(max([f["properties"]["temperature"] for f in features]), 1),
-                "min_temperature": round(min([f["properties"]["temperature"] for f in features]), 1)
-            }
-        }
-        
-        # Cache the result
-        self._heatmap_cache = result
-        self._cache_timestamp = current_time
-        
-        return result
     
-    def get_current_weather(self, lat: float = None, lon: float = None) -> Dict:
-        """Get current weather for a specific location"""
+    async def get_heatmap_grid_async(self, grid_size: int = 25, city: str = "pune") -> HeatmapGrid:
+        """Async variant of get_heatmap_grid; API lookups run concurrently off the event loop"""
+        return await self._heatmap_cache.get_or_load_async(
+            self._heatmap_cache_key(grid_size, city),
+            lambda: self._load_heatmap_async(grid_size, city)
+        )
+    
+    def get_heatmap_data(self, grid_size: int = 25, city: str = "pune") -> Dict:
+        """
+        Get heatmap data for a city as GeoJSON FeatureCollection.
+        Returns smooth, continuous heatmap data.
+        """
+        return self.get_heatmap_grid(grid_size, city).to_geojson()
+    
+    async def get_heatmap_data_async(self, grid_size: int = 25, city: str = "pune") -> Dict:
+        """Async variant of get_heatmap_data"""
+        grid = await self.get_heatmap_grid_async(grid_size, city)
+        return await run_cpu(grid.to_geojson)
+    
+    async def refresh_heatmap_async(self, grid_size: int = 25, city: str = "pune") -> HeatmapGrid:
+        """Regenerate a heatmap unconditionally and store it in the cache"""
+        grid = await self._load_heatmap_async(grid_size, city)
+        self._heatmap_cache.put(self._heatmap_cache_key(grid_size, city), grid)
+        return grid
+    
+    def get_cache_stats(self) -> Dict:
+        """Heatmap cache and upstream API counters for monitoring"""
+        stats = {"heatmap_cache": self._heatmap_cache.get_stats()}
+        if self._api_client is not None:
+            stats["openweather"] = self._api_client.get_stats()
+        return stats
+    
+    def get_current_weather(self, lat: float = None, lon: float = None, temperature: float = None) -> Dict:
+        """
+        Get current weather for a specific location.
+        A known temperature (e.g. from a heatmap cell) skips the temperature lookup.
+        """
         if lat is None or lon is None:
             lat, lon = self.pune_center
         
-        temperature = self._get_temperature_from_api(lat, lon)
+        if temperature is None:
+            temperature = float(self.get_temperatures([lat], [lon])[0])
+        return self._weather_reading(lat, lon, temperature)
+    
+    async def get_current_weather_async(self, lat: float = None, lon: float = None, temperature: float = None) -> Dict:
+        """Async variant of get_current_weather"""
+        if lat is None or lon is None:
+            lat, lon = self.pune_center
         
+        if temperature is None:
+            temperature = float((await self.get_temperatures_async([lat], [lon]))[0])
+        return self._weather_reading(lat, lon, temperature)
+    
+    def _weather_reading(self, lat: float, lon: float, temperature: float) -> Dict:
+        """Weather dict with air quality and humidity estimates for a temperature"""
         # Generate air quality and humidity estimates
-        air_quality = "moderate"
-        if temperature > 38:
-            air_quality = "poor"
-        elif temperature > 35:
-            air_quality = "moderate"
-        else:
-            air_quality = "good"
+        air_quality = estimate_air_quality(temperature)
         
-        humidity = np.random.uniform(40, 80)
+        # Deterministic per-location estimate (no global RNG state)
+        humidity = make_generator("humidity", lat, lon).uniform(40, 80)
         
         return {
             "temperature": temperature,
@@ -216,6 +259,20 @@ class WeatherService:
             "humidity": round(humidity, 1),
             "location": {"lat": lat, "lon": lon}
         }
+    
+    def close(self):
+        """Release the pooled API client, if one was created"""
+        if self._api_client is not None:
+            self._api_client.close()
+            self._api_client = None
+
+def estimate_air_quality(temperature: float) -> str:
+    """Estimate air quality category from temperature"""
+    if temperature > 38:
+        return "poor"
+    elif temperature > 35:
+        return "moderate"
+    return "good"
 
 # Singleton instance
 _weather_service = None
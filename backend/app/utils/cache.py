@@ -0,0 +1,200 @@
+"""
+LRU cache with per-entry TTL and stale-while-revalidate refresh
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _CacheEntry:
+    """A cached value with its own freshness window"""
+
+    __slots__ = ("value", "created_at", "ttl")
+
+    def __init__(self, value: Any, ttl: float):
+        self.value = value
+        self.created_at = time.time()
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class SWRCache:
+    """
+    Multi-entry LRU cache with stale-while-revalidate semantics.
+
+    Entries younger than their TTL are served as fresh hits. Entries past
+    their TTL but within `stale_ttl` are still served immediately while a
+    single background refresh replaces them. Only entries older than
+    `ttl + stale_ttl` (or missing ones) are loaded inline.
+    """
+
+    def __init__(self, max_entries: int = 16, ttl: float = 300, stale_ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._background_tasks = set()
+        self._executor = None
+
+        # Monitoring counters
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable):
+        """Return (value, state) where state is 'fresh', 'stale' or 'miss'"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, "miss"
+            age = entry.age()
+            if age < entry.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, "fresh"
+            if age < entry.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return entry.value, "stale"
+            # Too old to serve at all
+            del self._entries[key]
+            self.misses += 1
+            return None, "miss"
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Insert or replace an entry, evicting the least recently used if full"""
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, self.ttl if ttl is None else ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _claim_refresh(self, key: Hashable) -> bool:
+        """Mark a key as refreshing; False if a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _finish_refresh(self, key: Hashable, value: Any = None, failed: bool = False):
+        if failed:
+            with self._lock:
+                self.refresh_failures += 1
+        else:
+            self.put(key, value)
+            with self._lock:
+                self.refreshes += 1
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _refresh_in_thread(self, key: Hashable, loader: Callable[[], Any]):
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"Background cache refresh failed for {key}: {e}")
+            self._finish_refresh(key, failed=True)
+            return
+        self._finish_refresh(key, value)
+
+    async def _refresh_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            value = await loader()
+        except Exception as e:
+            print(f"Background cache refresh failed for {key}: {e}")
+            self._finish_refresh(key, failed=True)
+            return
+        self._finish_refresh(key, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Get a value, loading it inline on miss and in a background thread when stale"""
+        value, state = self._lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self._claim_refresh(key):
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+                self._executor.submit(self._refresh_in_thread, key, loader)
+            return value
+
+        value = loader()
+        self.put(key, value)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of get_or_load. Stale entries are refreshed in a background
+        task, and concurrent misses for the same key share a single load.
+        """
+        value, state = self._lookup(key)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            if self._claim_refresh(key):
+                task = asyncio.get_running_loop().create_task(self._refresh_async(key, loader))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return value
+
+        pending = self._inflight.get(key)
+        while pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only the leading load was cancelled: load it here instead
+                if not pending.cancelled():
+                    raise
+            pending = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Waiters take over the load instead of waiting forever
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        self.put(key, value)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Hit, miss and refresh counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,38 @@
+"""
+Bounded thread pool for CPU-bound work called from async code
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+_cpu_executor = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """
+    Shared executor for CPU work (grid generation, clustering, serialization).
+    Bounded by CPU_EXECUTOR_WORKERS (default: CPU count, at most 4) so a burst
+    of requests queues instead of oversubscribing the cores; NumPy releases
+    the GIL for most of this work.
+    """
+    global _cpu_executor
+    if _cpu_executor is None:
+        workers = int(os.getenv("CPU_EXECUTOR_WORKERS") or min(4, os.cpu_count() or 1))
+        _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="uhi-cpu")
+    return _cpu_executor
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound call on the bounded executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_cpu_executor():
+    """Stop the executor's threads"""
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
@@ -0,0 +1,81 @@
+"""
+KD-tree spatial index over locally projected coordinates
+"""
+from typing import Optional, Tuple
+import numpy as np
+from app.utils.geo import EARTH_RADIUS_KM, haversine_km
+
+
+class SpatialIndex:
+    """
+    Spatial index for nearest, k-nearest and radius queries on lat/lon points.
+
+    Points are projected to an equirectangular plane (km) around their mean
+    latitude, which is accurate to well under 1% at city scale, and stored in
+    a KD-tree so queries are O(log n) instead of a linear scan.
+    """
+
+    def __init__(self, lats, lons):
+        from scipy.spatial import cKDTree
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        self.lats = lats
+        self.lons = lons
+        self._cos_ref = np.cos(np.radians(lats.mean())) if len(lats) else 1.0
+        self._tree = cKDTree(self._project(lats, lons))
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _project(self, lats, lons) -> np.ndarray:
+        """Project lat/lon to planar km coordinates"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        x = np.radians(lons) * EARTH_RADIUS_KM * self._cos_ref
+        y = np.radians(lats) * EARTH_RADIUS_KM
+        return np.column_stack([x, y])
+
+    def nearest(self, lats, lons, candidates: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest indexed point for each query point: (distances_km, indices).
+        The `candidates` planar nearest are re-ranked by Haversine distance, so
+        near-ties resolve exactly as a brute-force Haversine search would.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        k = min(candidates, len(self))
+        _, indices = self._tree.query(self._project(lats, lons), k=k)
+        indices = indices.reshape(len(lats), k)
+        distances = haversine_km(lats[:, None], lons[:, None], self.lats[indices], self.lons[indices])
+        best = distances.argmin(axis=1)
+        rows = np.arange(len(lats))
+        return distances[rows, best], indices[rows, best]
+
+    def k_nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The k nearest indexed points to one location, closest first"""
+        k = min(k, len(self))
+        distances, indices = self._tree.query(self._project(lat, lon)[0], k=k)
+        return np.atleast_1d(distances), np.atleast_1d(indices)
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Indices of all points within radius_km of a location"""
+        indices = self._tree.query_ball_point(self._project(lat, lon)[0], r=radius_km)
+        return np.array(sorted(indices), dtype=np.intp)
+
+    def nearest_where(self, lat: float, lon: float, mask: np.ndarray, k_start: int = 8) -> Optional[int]:
+        """
+        Index of the nearest point whose mask entry is True, or None.
+        Expands the k-nearest search geometrically so only the neighbourhood
+        around the location is examined in the common case.
+        """
+        if not mask.any():
+            return None
+        k = k_start
+        while True:
+            _, indices = self.k_nearest(lat, lon, k)
+            matches = indices[mask[indices]]
+            if len(matches):
+                return int(matches[0])
+            if k >= len(self):
+                return None
+            k *= 2
@@ -0,0 +1,137 @@
+"""
+Load test: request concurrency under slow upstream weather API calls
+
+Usage:
+    python benchmark_concurrency.py [--latency-ms 200] [--requests 64]
+
+Starts a stub OpenWeatherMap server that answers after a fixed latency,
+then fires concurrent /api/v1/health_precautions requests (each for a
+different location, so nothing is cached or coalesced) at the app in
+process. The same load is sent to a handler that calls the synchronous
+service, as the routes used to, for comparison. While each run is in
+flight, a 50 ms timer plus a /health call is probed to show how long the
+event loop stalls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def start_stub_upstream(latency: float) -> str:
+    """OpenWeatherMap stand-in: /weather sleeps `latency` seconds, /box/city is unsupported"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith("/weather"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            time.sleep(latency)
+            lat = float(parse_qs(url.query)["lat"][0])
+            body = json.dumps({"main": {"temp": round(30 + (lat - 18) * 10, 1)}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(ThreadingHTTPServer):
+        # The default listen backlog (5) drops bursts of concurrent connects,
+        # which would serialize the load on the stub instead of the app
+        request_queue_size = 256
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def run_load(client, path: str, locations, concurrency: int):
+    """Send one request per location, `concurrency` at a time; probe /health meanwhile"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    probes = []
+    done = asyncio.Event()
+
+    async def one(lat, lon):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, params={"lat": lat, "lon": lon})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def probe():
+        # How late a 50 ms timer fires, plus the /health round trip
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.05)
+            await client.get("/health")
+            probes.append((time.perf_counter() - start - 0.05) * 1000)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(lat, lon) for lat, lon in locations))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    latencies.sort()
+    return {
+        "throughput": len(locations) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        "probe_max": max(probes) if probes else 0.0
+    }
+
+
+async def main_async(args):
+    import httpx
+    from app.main import app
+    from app.services.health_service import get_health_service
+
+    # The pre-async handler shape: a sync, network-bound call inside `async def`
+    @app.get("/bench/health_precautions_blocking")
+    async def blocking_health_precautions(lat: float, lon: float):
+        return get_health_service().get_health_precautions(lat, lon)
+
+    # Every request gets its own weather lookup cell
+    cells = iter((18.0 + i * 0.1, 73.0 + (i % 7) * 0.1) for i in range(100000))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        print(f"{'handler':10s} {'concurrency':>11s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'loop stall ms':>15s}")
+        for label, path in (("blocking", "/bench/health_precautions_blocking"),
+                            ("async", "/api/v1/health_precautions")):
+            for concurrency in args.concurrency:
+                locations = [next(cells) for _ in range(args.requests)]
+                result = await run_load(client, path, locations, concurrency)
+                print(f"{label:10s} {concurrency:11d} {result['throughput']:8.1f} {result['p50']:9.1f} "
+                      f"{result['p95']:9.1f} {result['probe_max']:15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test async handlers under upstream latency")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    os.environ["OPENWEATHER_BASE_URL"] = start_stub_upstream(args.latency_ms / 1000)
+    os.environ["OPENWEATHER_API_KEY"] = "benchmark"
+    os.environ["PRECOMPUTE_ENABLED"] = "false"
+
+    print("=" * 70)
+    print(f"Concurrency Benchmark (upstream latency {args.latency_ms:.0f} ms, {args.requests} requests per run)")
+    print("=" * 70)
+    asyncio.run(main_async(args))
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: intervention portfolio optimization
+
+Usage:
+    python benchmark_portfolio.py [--sites 1000,5000] [--budget 20000000]
+
+Compares the lazy greedy solver with the exact integer program on small
+random instances (how close greedy gets to optimal), then times greedy on
+thousands of candidate sites, cold (predictor called) and warm (site
+predictions memoized).
+"""
+import argparse
+import time
+import numpy as np
+from app.services.portfolio_service import PortfolioOptimizer
+
+
+def random_sites(n_sites: int, rng: np.random.Generator):
+    lats = 18.45 + rng.random(n_sites) * 0.15
+    lons = 73.78 + rng.random(n_sites) * 0.15
+    temps = np.round(32.0 + rng.random(n_sites) * 9.0, 1)
+    return lats, lons, temps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portfolio optimizer")
+    parser.add_argument("--sites", default="1000,5000")
+    parser.add_argument("--budget", type=float, default=2e7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(11)
+
+    print("=" * 50)
+    print("Greedy vs exact (small instances)")
+    print("=" * 50)
+    worst = 1.0
+    for n_sites, budget, max_area in [(5, 1e6, None), (10, 3e6, 4000), (15, 5e6, None), (20, 8e6, 8000)]:
+        optimizer = PortfolioOptimizer()
+        lats, lons, temps = random_sites(n_sites, rng)
+        greedy = optimizer.optimize(lats, lons, temps, budget, max_area, method="greedy")
+        exact = optimizer.optimize(lats, lons, temps, budget, max_area, method="exact")
+        ratio = greedy["cooling"] / exact["cooling"] if exact["cooling"] else 1.0
+        worst = min(worst, ratio)
+        print(f"{n_sites:>3} sites: greedy {greedy['cooling']:.2f}°C ({greedy['solve_ms']} ms), "
+              f"exact {exact['cooling']:.2f}°C ({exact['solve_ms']} ms, optimal={exact['optimal']})")
+    print(f"{'✓' if worst >= 0.9 else '✗'} Greedy reaches {worst:.1%} of optimal in the worst case")
+
+    print("\n" + "=" * 50)
+    print("Greedy on large instances")
+    print("=" * 50)
+    for n_sites in (int(size) for size in args.sites.split(",")):
+        optimizer = PortfolioOptimizer()
+        lats, lons, temps = random_sites(n_sites, rng)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            result = optimizer.optimize(lats, lons, temps, args.budget, method="greedy")
+            timings.append(time.perf_counter() - start)
+        marker = "✓" if timings[0] < 1.0 else "✗"
+        print(f"{marker} {n_sites} sites: cold {timings[0] * 1000:.0f} ms, warm {timings[1] * 1000:.0f} ms, "
+              f"{len(result['interventions'])} interventions, {result['cooling']:.1f}°C total cooling")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark intervention model cold start and per-request inference latency
+
+Usage:
+    python benchmark_predictor.py [--model models/intervention_model.ubj]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from app.models.prediction import get_predictor
+imported = time.perf_counter()
+get_predictor().predict_intervention_impact([
+    {"type": "trees", "count": 20, "location": [18.5204, 73.8567], "base_temperature": 35}
+])
+done = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(done - imported) * 1000:.1f}")
+"""
+
+
+def measure_cold_start(model_path: Path, runs: int):
+    """Import time and first-prediction time in fresh interpreters (ms)"""
+    env = dict(os.environ, INTERVENTION_MODEL_PATH=str(model_path))
+    imports, first_predictions = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout.split()
+        imports.append(float(output[0]))
+        first_predictions.append(float(output[1]))
+    return statistics.median(imports), statistics.median(first_predictions)
+
+
+def measure_inference(model_path: Path, sizes, repeats: int):
+    """Median and p95 predict_intervention_impact latency per request size (ms)"""
+    from app.models.prediction import InterventionPredictor, interventions_to_array
+    from app.models.training import generate_dataset
+
+    predictor = InterventionPredictor(model_path)
+    X, _ = generate_dataset(max(sizes), seed=7)
+    interventions = [
+        {
+            "type": ["trees", "cool_roof", "park", "green_roof"][int(row[0])],
+            "count": float(row[1]),
+            "area": float(row[2]),
+            "location": [float(row[3]), float(row[4])],
+            "base_temperature": float(row[5])
+        }
+        for row in X
+    ]
+    predictor.predict_intervention_impact(interventions[:1])  # load the model
+
+    results = []
+    for size in sizes:
+        batch = interventions_to_array(interventions[:size])
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predictor.predict_intervention_impact(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results.append((size, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]))
+    return predictor.is_fitted, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the intervention impact model")
+    parser.add_argument("--model", type=Path, default=None)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    from app.models.prediction import DEFAULT_MODEL_PATH
+    model_path = args.model or Path(os.getenv("INTERVENTION_MODEL_PATH", DEFAULT_MODEL_PATH))
+
+    print("=" * 50)
+    print("Intervention Model Benchmark")
+    print("=" * 50)
+    print(f"Model: {model_path}{'' if model_path.exists() else ' (missing, rule-based fallback)'}")
+
+    import_ms, first_ms = measure_cold_start(model_path, args.runs)
+    print(f"\nCold start (median of {args.runs} fresh processes)")
+    print(f"  Import:           {import_ms:8.1f} ms")
+    print(f"  First prediction: {first_ms:8.1f} ms")
+
+    is_fitted, results = measure_inference(model_path, [1, 10, 100, 1000, 10000], args.repeats)
+    print(f"\nPer-request inference ({'XGBoost' if is_fitted else 'rule-based'}, {args.repeats} repeats)")
+    for size, median_ms, p95_ms in results:
+        print(f"  {size:6d} interventions: median {median_ms:8.3f} ms   p95 {p95_ms:8.3f} ms")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: recommendation generation cost as the heatmap grid grows
+
+Usage:
+    python benchmark_recommendations.py [--max-points 1000000] [--repeat 5]
+
+Times the array engine (generate_recommendations_from_arrays, as used by
+the precompute scheduler) from a 12x12 grid up to --max-points cells, next
+to the GeoJSON entry point (generate_recommendations), which first has to
+walk every feature. The GeoJSON path is only timed up to 100k points.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.recommendation_service import RecommendationService
+
+GEOJSON_MAX_POINTS = 100_000
+
+
+def make_grid(n_points: int, seed: int = 7) -> HeatmapGrid:
+    """Synthetic Pune-sized grid with a few warm spots"""
+    side = int(np.ceil(np.sqrt(n_points)))
+    lat_axis = np.linspace(18.45, 18.60, side)
+    lon_axis = np.linspace(73.78, 73.93, side)
+    lats, lons = (axis.ravel()[:n_points] for axis in np.meshgrid(lat_axis, lon_axis, indexing="ij"))
+    rng = np.random.default_rng(seed)
+    temps = 34.0 + rng.normal(0, 1.0, n_points)
+    for lat, lon in rng.uniform((18.45, 73.78), (18.60, 73.93), size=(5, 2)):
+        temps += 5.0 * np.exp(-((lats - lat) ** 2 + (lons - lon) ** 2) / 0.0004)
+    return HeatmapGrid(lats, lons, np.round(temps, 1), city="pune", center=(18.52, 73.85), grid_size=side)
+
+
+def time_call(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recommendation generation")
+    parser.add_argument("--max-points", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    service = RecommendationService()
+    sizes = [size for size in (144, 10_000, 100_000, 1_000_000) if size <= args.max_points]
+
+    print("=" * 50)
+    print("Recommendation generation")
+    print("=" * 50)
+    print(f"{'points':>10} {'arrays ms':>10} {'ns/point':>9} {'geojson ms':>11}")
+    for size in sizes:
+        grid = make_grid(size)
+        array_ms = time_call(
+            lambda: service.generate_recommendations_from_arrays(grid.lats, grid.lons, grid.temperatures),
+            args.repeat
+        )
+        geojson_ms = "-"
+        if size <= GEOJSON_MAX_POINTS:
+            heatmap_data = grid.to_geojson()
+            geojson_ms = f"{time_call(lambda: service.generate_recommendations(heatmap_data), args.repeat):.2f}"
+            # Both entry points must agree
+            same = service.generate_recommendations(heatmap_data) == service.generate_recommendations_from_arrays(
+                grid.lats, grid.lons, grid.temperatures
+            )
+            if not same:
+                print(f"✗ GeoJSON and array results differ at {size} points")
+        print(f"{size:>10} {array_ms:>10.2f} {array_ms * 1e6 / size:>9.1f} {geojson_ms:>11}")
+
+    print("✓ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: raster cooling model throughput
+
+Usage:
+    python benchmark_spatial.py [--resolution 256,512] [--repeat 3]
+
+Applies 10 to 10,000 random interventions to a synthetic 15x15 Pune heatmap
+with evaluate_spatial_scenario and reports the time per scenario. Because
+footprints are applied per intervention type with separable convolutions,
+time should grow with raster size, not with the number of interventions.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.cooling_service import get_cooling_raster
+from app.services.simulation_service import evaluate_spatial_scenario
+from app.services.weather_service import get_weather_service
+
+TYPES = ("trees", "cool_roof", "park", "green_roof")
+
+
+def random_interventions(n: int, rng: np.random.Generator):
+    return [
+        {
+            "type": TYPES[i % len(TYPES)],
+            "count": int(rng.integers(10, 80)),
+            "area": float(rng.integers(200, 4000)),
+            "location": [18.38 + rng.random() * 0.28, 73.71 + rng.random() * 0.28],
+            "base_temperature": None
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the raster cooling model")
+    parser.add_argument("--resolution", default="256,512")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    grid = get_weather_service().get_heatmap_grid(grid_size=15)
+    rng = np.random.default_rng(5)
+
+    for resolution in (int(value) for value in args.resolution.split(",")):
+        print("=" * 50)
+        print(f"Raster {resolution}x{resolution}")
+        print("=" * 50)
+        start = time.perf_counter()
+        get_cooling_raster(grid, resolution)
+        print(f"Base raster built in {(time.perf_counter() - start) * 1000:.1f} ms (memoized per heatmap)")
+        for n in (10, 100, 1000, 10000):
+            interventions = random_interventions(n, rng)
+            evaluate_spatial_scenario(interventions, grid, resolution)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                metrics = evaluate_spatial_scenario(interventions, grid, resolution)["metrics"]
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            print(f"{n:>6} interventions: {elapsed:7.1f} ms  "
+                  f"hotspot cooling {metrics['hotspot_cooling']:.3f}°C, saturation loss {metrics['saturation_loss']:.1%}")
+    print("✓ Done")
+
+
+if __name__ == "__main__":
+    main()
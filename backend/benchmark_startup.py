@@ -0,0 +1,108 @@
+"""
+Benchmark API import cost and fail on regressions
+
+Usage:
+    python benchmark_startup.py [--budget-ms 1200] [--runs 5]
+
+Imports app.main in fresh interpreters with `python -X importtime`, reports
+the median cumulative import time and the slowest top-level modules, and
+exits non-zero if the time exceeds the budget or if a dependency that should
+be lazily loaded is imported at startup.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Must not be imported until first use (see app.services.warmup_service)
+DEFERRED_MODULES = ("xgboost", "sklearn", "scipy", "httpx", "requests", "pandas", "motor")
+
+IMPORT_SCRIPT = "import app.main"
+
+
+def run_importtime() -> Tuple[float, Dict[str, float]]:
+    """
+    Import app.main once with -X importtime.
+    Returns (app.main cumulative ms, self ms summed per top-level package).
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    ).stderr
+
+    total_ms = 0.0
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header row
+        name = name.strip()
+        if name == "app.main":
+            total_ms = int(cumulative_us) / 1000
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return total_ms, packages
+
+
+def find_deferred_imports() -> List[str]:
+    """Deferred modules that are present in sys.modules after importing app.main"""
+    check = (
+        f"import sys; {IMPORT_SCRIPT}; "
+        f"print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", check], cwd=BASE_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return output.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API import time")
+    parser.add_argument("--budget-ms", type=float, default=1200.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("API Startup Benchmark")
+    print("=" * 50)
+
+    totals = []
+    packages: Dict[str, List[float]] = {}
+    for _ in range(args.runs):
+        total_ms, run_packages = run_importtime()
+        totals.append(total_ms)
+        for package, ms in run_packages.items():
+            packages.setdefault(package, []).append(ms)
+
+    median_ms = statistics.median(totals)
+    print(f"import app.main: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("\nSlowest packages (median self ms)")
+    slowest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:10]
+    for package, timings in slowest:
+        print(f"  {package:24s} {statistics.median(timings):8.1f}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    deferred = find_deferred_imports()
+    if deferred:
+        failures.append(f"deferred modules imported at startup: {', '.join(deferred)}")
+
+    print("\n" + "=" * 50)
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        print("=" * 50)
+        sys.exit(1)
+    print("✓ Startup within budget, heavy dependencies deferred")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
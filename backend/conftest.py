@@ -0,0 +1,5 @@
+"""
+Pytest configuration. backend/ is the import root for `app`; test_api.py is a
+manual smoke script against a running server, so it is not collected.
+"""
+collect_ignore = ["test_api.py"]
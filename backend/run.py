@@ -1,22 +1,80 @@
 """
 Quick start script for the backend server
+
+    python run.py                  # development: single process with auto-reload
+    python run.py --production     # production: multiple workers, no reload
+
+Production mode can also be selected with API_MODE=production.
 """
+import argparse
+import importlib.util
+import tempfile
 import uvicorn
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-if __name__ == "__main__":
-    host = os.getenv("API_HOST", "0.0.0.0")
-    port = int(os.getenv("API_PORT", 8000))
-    
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_production(host: str, port: int):
+    """
+    Multi-process server. Every worker is an independent process with its own
+    singletons, so each one warms up (model, deferred imports) before it
+    accepts traffic, and the simulation process pool is split across workers
+    instead of each one sizing itself to every core. Heatmap snapshots are
+    built by one worker and shared with the rest through SNAPSHOT_STORE_DIR,
+    and simulation sessions live in a SQLite file every worker opens.
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = int(os.getenv("API_WORKERS") or cpu_count)
+
+    # Workers are spawned with this environment
+    if not os.getenv("WARMUP_ON_STARTUP"):
+        os.environ["WARMUP_ON_STARTUP"] = "true"
+    if not os.getenv("SIMULATION_WORKERS"):
+        os.environ["SIMULATION_WORKERS"] = str(max(1, cpu_count // workers))
+    if not os.getenv("SNAPSHOT_STORE_DIR"):
+        os.environ["SNAPSHOT_STORE_DIR"] = os.path.join(tempfile.gettempdir(), f"uhi-snapshots-{port}")
+    if not os.getenv("SIMULATION_SESSION_PATH"):
+        # Any worker may serve a session's next edit
+        os.environ["SIMULATION_SESSION_PATH"] = os.path.join(os.environ["SNAPSHOT_STORE_DIR"], "sessions.db")
+
     uvicorn.run(
         "app.main:app",
         host=host,
         port=port,
-        reload=True,
+        workers=workers,
+        # uvloop/httptools aren't available on Windows
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        # On SIGTERM stop accepting connections and let in-flight requests finish
+        timeout_graceful_shutdown=float(os.getenv("API_GRACEFUL_TIMEOUT", 30)),
+        timeout_keep_alive=5,
+        proxy_headers=True,
+        access_log=False,
         log_level="info"
     )
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the UHI Mitigation API")
+    parser.add_argument("--production", action="store_true", help="multi-worker server without reload")
+    args = parser.parse_args()
+
+    host = os.getenv("API_HOST", "0.0.0.0")
+    port = int(os.getenv("API_PORT", 8000))
+    
+    if args.production or os.getenv("API_MODE", "development").lower() == "production":
+        run_production(host, port)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            reload=True,
+            log_level="info"
+        )
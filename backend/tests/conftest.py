@@ -0,0 +1,19 @@
+"""
+Shared fixtures for the backend tests
+"""
+import os
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client():
+    """API test client with the app lifespan running and precomputed snapshots published"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.precompute_service import get_precompute_scheduler
+
+    os.environ.setdefault("PRECOMPUTE_ENABLED", "true")
+    os.environ.setdefault("WARMUP_ON_STARTUP", "true")
+    with TestClient(app) as test_client:
+        assert get_precompute_scheduler().get_finest_snapshot() is not None
+        yield test_client
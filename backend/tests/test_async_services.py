@@ -0,0 +1,93 @@
+"""
+Tests for the async service layer used by the route handlers
+"""
+import asyncio
+import time
+import numpy as np
+from benchmark_concurrency import start_stub_upstream
+from app.services.health_service import HealthService
+from app.services.precompute_service import get_precompute_scheduler
+from app.services.recommendation_service import RecommendationService
+from app.services.weather_service import WeatherService
+
+
+def test_async_methods_match_sync_methods(monkeypatch):
+    monkeypatch.delenv("OPENWEATHER_API_KEY", raising=False)
+    weather = WeatherService()
+    health = HealthService()
+    health.weather_service = weather
+    recommendations = RecommendationService()
+    recommendations.weather_service = weather
+
+    async def run():
+        return (
+            await weather.get_current_weather_async(18.53, 73.84),
+            await health.get_health_precautions_async(18.53, 73.84),
+            await health.get_health_precautions_async(18.53, 73.84, temperature=41.2),
+            await recommendations.generate_recommendations_async()
+        )
+
+    current, precautions, known, generated = asyncio.run(run())
+    assert current == weather.get_current_weather(18.53, 73.84)
+    assert precautions == health.get_health_precautions(18.53, 73.84)
+    assert known == health.get_health_precautions(18.53, 73.84, temperature=41.2)
+    assert generated == recommendations.generate_recommendations(weather.get_heatmap_data(grid_size=12))
+
+
+def test_slow_upstream_does_not_block_the_event_loop(monkeypatch):
+    latency = 0.2
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setenv("OPENWEATHER_BASE_URL", start_stub_upstream(latency))
+    weather = WeatherService()
+    # One location per 0.05° cell, so nothing is coalesced
+    locations = [(18.40 + 0.06 * i, 73.80) for i in range(8)]
+
+    async def run():
+        lateness = []
+        done = asyncio.Event()
+
+        async def ticker():
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lateness.append(time.perf_counter() - start - 0.01)
+
+        probe = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        readings = await asyncio.gather(*(weather.get_current_weather_async(lat, lon) for lat, lon in locations))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe
+        return readings, elapsed, max(lateness)
+
+    try:
+        readings, elapsed, worst_lateness = asyncio.run(run())
+    finally:
+        weather.close()
+
+    # The stub's temperatures for each location's cell centre, not synthetic fallbacks
+    np.testing.assert_allclose(
+        [reading["temperature"] for reading in readings], [30 + (lat - 18) * 10 for lat, _ in locations], atol=0.3
+    )
+    # Concurrent lookups overlap instead of queuing behind each other
+    assert elapsed < len(locations) * latency / 2
+    assert worst_lateness < latency / 2
+
+
+def test_health_route_uses_the_snapshot_temperature(client, monkeypatch):
+    from app.services.health_service import get_health_service
+
+    snapshot = get_precompute_scheduler().get_finest_snapshot()
+    cell = 10
+    lat, lon = float(snapshot.lats[cell]), float(snapshot.lons[cell])
+
+    async def unavailable(*args, **kwargs):
+        raise AssertionError("point inside the snapshot should not need a temperature lookup")
+
+    monkeypatch.setattr(get_health_service().weather_service, "get_temperatures_async", unavailable)
+    response = client.get("/api/v1/health_precautions", params={"lat": lat, "lon": lon})
+    assert response.status_code == 200
+    assert response.json() == get_health_service().get_health_precautions(
+        lat, lon, temperature=float(snapshot.temperatures[cell])
+    )
+    np.testing.assert_equal(snapshot.lookup_temperature(lat, lon), snapshot.temperatures[cell])
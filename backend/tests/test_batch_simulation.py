@@ -0,0 +1,49 @@
+"""
+Tests for process-pool batch simulation
+"""
+import asyncio
+import json
+from app.services.simulation_service import BatchSimulationService, evaluate_scenario
+
+
+def _scenario(i: int):
+    interventions = [
+        {"type": "trees", "count": 5 + i, "area": 0, "location": [18.50 + i * 0.001, 73.85], "base_temperature": 36.0},
+        {"type": "park", "count": 0, "area": 500.0 * (i % 3 + 1), "location": [18.52, 73.86 + i * 0.001],
+         "base_temperature": 38.5}
+    ][:1 + i % 2]
+    return interventions, ["moderate"] * len(interventions)
+
+
+def _collect(service: BatchSimulationService, scenarios) -> list:
+    async def run():
+        return [chunk async for chunk in service.stream(scenarios)]
+    lines = b"".join(asyncio.run(run())).decode().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_stream_preserves_input_order_across_chunks():
+    scenarios = [_scenario(i) for i in range(11)]
+    service = BatchSimulationService(max_workers=2, max_chunk_size=2)
+    try:
+        results = _collect(service, scenarios)
+    finally:
+        service.shutdown()
+
+    assert [result["index"] for result in results] == list(range(len(scenarios)))
+    for result, (interventions, air_qualities) in zip(results, scenarios):
+        expected = evaluate_scenario(interventions, air_qualities)
+        assert {key: result[key] for key in expected} == expected
+
+
+def test_failed_scenario_yields_error_line_in_place():
+    scenarios = [_scenario(0), ([{"type": "trees", "count": 1, "location": [18.5]}], ["moderate"]), _scenario(2)]
+    service = BatchSimulationService(max_workers=1, max_chunk_size=1)
+    try:
+        results = _collect(service, scenarios)
+    finally:
+        service.shutdown()
+
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert "error" in results[1]
+    assert "error" not in results[0] and "error" not in results[2]
@@ -0,0 +1,40 @@
+"""
+Tests for incremental hotspot clustering
+"""
+import numpy as np
+from app.models.clustering import UHIClusterer
+
+
+def _snapshot(seed: int, n: int = 2000):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[18.45, 73.80, 34.0], [18.55, 73.90, 39.0], [18.50, 73.95, 36.5]])
+    labels = rng.integers(0, len(centers), n)
+    points = centers[labels] + rng.normal(scale=[0.01, 0.01, 0.3], size=(n, 3))
+    return points[:, 0], points[:, 1], points[:, 2]
+
+
+def test_zone_statistics_match_naive_groupby():
+    lats, lons, temperatures = _snapshot(0)
+    clusterer = UHIClusterer(n_clusters=3, incremental=True)
+    zones = clusterer.update(lats, lons, temperatures)
+    labels = clusterer.model.labels_
+
+    assert sum(zone["point_count"] for zone in zones.values()) == len(lats)
+    for cluster_id, zone in zones.items():
+        members = labels == cluster_id
+        assert zone["point_count"] == members.sum()
+        assert np.isclose(zone["avg_temperature"], temperatures[members].mean())
+        assert zone["max_temperature"] == temperatures[members].max()
+        assert zone["min_temperature"] == temperatures[members].min()
+        assert np.allclose(zone["center"], [lats[members].mean(), lons[members].mean()])
+
+
+def test_warm_start_keeps_cluster_ids_stable():
+    clusterer = UHIClusterer(n_clusters=3, incremental=True)
+    first = clusterer.update(*_snapshot(0))
+    second = clusterer.update(*_snapshot(1))
+
+    assert set(first) == set(second)
+    for cluster_id in first:
+        assert abs(first[cluster_id]["avg_temperature"] - second[cluster_id]["avg_temperature"]) < 0.5
+        assert np.allclose(first[cluster_id]["center"], second[cluster_id]["center"], atol=0.01)
@@ -0,0 +1,57 @@
+"""
+Tests for the raster cooling model
+"""
+import numpy as np
+import pytest
+from app.models.prediction import TYPE_CODES
+from app.services.cooling_service import CoolingRaster
+from app.services.heatmap_grid import HeatmapGrid
+
+TREES = TYPE_CODES["trees"]
+
+
+def _grid(grid_size: int = 20, low: float = 30.0, high: float = 40.0) -> HeatmapGrid:
+    lats, lons = np.meshgrid(np.linspace(18.45, 18.60, grid_size), np.linspace(73.75, 73.95, grid_size), indexing="ij")
+    temperatures = np.linspace(low, high, grid_size * grid_size)
+    return HeatmapGrid(lats.ravel(), lons.ravel(), temperatures, city="pune", center=(18.52, 73.85), grid_size=grid_size)
+
+
+def _cooling(raster: CoolingRaster, points, reductions):
+    points = np.asarray(points, dtype=np.float64)
+    saturated, linear = raster.cooling(np.full(len(points), TREES), points[:, 0], points[:, 1], np.asarray(reductions))
+    return saturated, linear
+
+
+def test_cooling_decays_with_distance():
+    raster = CoolingRaster(_grid(), resolution=128)
+    site = (18.55, 73.90)
+    saturated, _ = _cooling(raster, [site], [1.0])
+    at_site, nearby, far = raster.sample(saturated, [site[0], site[0] + 0.001, site[0] + 0.02], [site[1]] * 3)
+    assert at_site > nearby > far
+    assert far == pytest.approx(0.0, abs=1e-6)
+
+
+def test_overlap_saturates_below_headroom():
+    raster = CoolingRaster(_grid(), resolution=128)
+    site = (18.55, 73.90)
+    saturated, linear = _cooling(raster, [site] * 50, [2.0] * 50)
+    assert np.all(saturated <= raster.headroom + 1e-9)
+    assert saturated.max() < linear.max()
+
+
+def test_distant_interventions_do_not_interact():
+    raster = CoolingRaster(_grid(), resolution=128)
+    a, b = (18.47, 73.78), (18.58, 73.93)
+    together, _ = _cooling(raster, [a, b], [0.5, 0.5])
+    alone_a, _ = _cooling(raster, [a], [0.5])
+    alone_b, _ = _cooling(raster, [b], [0.5])
+    assert np.allclose(together, alone_a + alone_b, atol=1e-9)
+
+
+def test_apply_reports_consistent_metrics():
+    grid = _grid()
+    raster = CoolingRaster(grid, resolution=64)
+    result = raster.apply(np.array([TREES]), [18.55], [73.90], np.array([1.0]))
+    assert result["average_temperature"] == pytest.approx(result["base_average_temperature"] - result["temperature_reduction"])
+    assert 0.0 <= result["saturation_loss"] < 1.0
+    assert np.all(result["grid"].temperatures <= grid.temperatures + 0.005)
@@ -0,0 +1,91 @@
+"""
+Tests for the heatmap grid serializations
+"""
+import numpy as np
+import orjson
+from app.services.heatmap_grid import (
+    BINARY_MAGIC, BINARY_MEDIA_TYPE, BINARY_VERSION, HeatmapGrid, _BINARY_HEADER
+)
+
+
+def _grid(grid_size: int = 5) -> HeatmapGrid:
+    n = grid_size * grid_size
+    rng = np.random.default_rng(7)
+    return HeatmapGrid(
+        np.linspace(18.4, 18.6, n), np.linspace(73.7, 73.9, n), np.round(rng.uniform(28.0, 42.0, n), 1),
+        city="pune", center=(18.52, 73.85), grid_size=grid_size
+    )
+
+
+def _decode_binary(buffer: bytes):
+    magic, version, n_columns, n_points, grid_size, metadata_len = _BINARY_HEADER.unpack_from(buffer)
+    offset = _BINARY_HEADER.size + metadata_len
+    assert offset % 4 == 0
+    metadata = orjson.loads(buffer[_BINARY_HEADER.size:offset])
+    columns = np.frombuffer(buffer, dtype="<f4", offset=offset).reshape(n_columns, n_points)
+    return (magic, version, n_columns, n_points, grid_size), metadata, columns
+
+
+def test_binary_header_layout():
+    grid = _grid()
+    buffer = grid.to_binary()
+    assert _BINARY_HEADER.format == "<4sHHIII"
+    assert _BINARY_HEADER.size == 20
+    header, metadata, columns = _decode_binary(buffer)
+    assert header == (BINARY_MAGIC, BINARY_VERSION, 3, len(grid), grid.grid_size)
+    assert metadata == grid.metadata
+    assert len(buffer) == _BINARY_HEADER.size + _BINARY_HEADER.unpack_from(buffer)[5] + 3 * 4 * len(grid)
+
+
+def test_binary_round_trip():
+    grid = _grid()
+    _, _, (lats, lons, temperatures) = _decode_binary(grid.to_binary())
+    np.testing.assert_array_equal(lats, grid.lats.astype(np.float32))
+    np.testing.assert_array_equal(lons, grid.lons.astype(np.float32))
+    np.testing.assert_array_equal(temperatures, grid.temperatures.astype(np.float32))
+    assert grid.to_binary() is grid.to_binary()
+
+
+def test_binary_heatmap_route(client):
+    by_query = client.get("/api/v1/heatmap_data", params={"grid_size": 15, "format": "binary"})
+    by_accept = client.get("/api/v1/heatmap_data", params={"grid_size": 15}, headers={"Accept": BINARY_MEDIA_TYPE})
+    assert by_query.headers["content-type"] == BINARY_MEDIA_TYPE
+    assert by_query.content == by_accept.content
+
+    header, metadata, columns = _decode_binary(by_query.content)
+    geojson = client.get("/api/v1/heatmap_data", params={"grid_size": 15}).json()
+    assert header[3] == len(geojson["features"]) == 225
+    assert metadata == geojson["metadata"]
+    np.testing.assert_allclose(
+        columns[2], [feature["properties"]["temperature"] for feature in geojson["features"]], atol=1e-4
+    )
+
+
+def test_streamed_geojson_matches_single_buffer():
+    grid = _grid(grid_size=12)
+    expected = grid.to_geojson()
+    assert orjson.loads(grid.to_geojson_bytes()) == expected
+    for chunk_size in (1, 7, 144, 4096):
+        assert orjson.loads(b"".join(grid.iter_geojson(chunk_size=chunk_size))) == expected
+
+
+def test_only_small_grids_keep_encoded_geojson(monkeypatch):
+    import app.services.heatmap_grid as heatmap_grid
+
+    small = _grid(grid_size=4)
+    assert small.to_geojson_bytes() is small.to_geojson_bytes()
+
+    monkeypatch.setattr(heatmap_grid, "STREAM_MIN_POINTS", 16)
+    large = _grid(grid_size=4)
+    assert large.to_geojson_bytes() == large.to_geojson_bytes()
+    assert large._geojson_bytes is None
+
+
+def test_streamed_heatmap_route_matches_buffered(client):
+    params = {"grid_size": 15}
+    streamed = client.get("/api/v1/heatmap_data", params={**params, "stream": True})
+    buffered = client.get("/api/v1/heatmap_data", params={**params, "stream": False})
+    assert streamed.status_code == buffered.status_code == 200
+    assert streamed.headers["content-type"] == buffered.headers["content-type"] == "application/json"
+    assert streamed.json() == buffered.json()
+    assert len(buffered.json()["features"]) == 225
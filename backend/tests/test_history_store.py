@@ -0,0 +1,145 @@
+"""
+Tests for the heatmap history store and its time-bucket aggregation
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.history_store import InMemoryHistoryStore, aggregate_batches
+
+
+def _readings(seed: int = 0, n: int = 2000):
+    """Time-ordered readings at 12 fixed locations over about 5 hours"""
+    rng = np.random.default_rng(seed)
+    sites = rng.uniform([18.4, 73.7], [18.6, 73.9], size=(12, 2))
+    site = rng.integers(0, len(sites), n)
+    offsets_s = np.sort(rng.integers(0, 5 * 3600, n))
+    return pd.DataFrame({
+        "timestamp": np.datetime64("2026-06-01T00:00:00", "ms") + offsets_s.astype("timedelta64[s]"),
+        "lat": sites[site, 0],
+        "lon": sites[site, 1],
+        "temperature": rng.normal(36.0, 2.0, n)
+    })
+
+
+def _aggregate(frame: pd.DataFrame, unit: str, batch_size: int) -> list:
+    async def batches():
+        for start in range(0, len(frame), batch_size):
+            part = frame.iloc[start:start + batch_size]
+            yield {column: part[column].to_numpy() for column in ("timestamp", "lat", "lon", "temperature")}
+
+    async def run():
+        return [bucket async for bucket in aggregate_batches(batches(), unit)]
+    return asyncio.run(run())
+
+
+def test_aggregate_batches_matches_naive_groupby():
+    frame = _readings()
+    buckets = _aggregate(frame, "h", batch_size=37)
+
+    expected = frame.assign(bucket=frame["timestamp"].dt.floor("h")).groupby(["bucket", "lat", "lon"])["temperature"]
+    expected = expected.agg(["mean", "min", "max", "count"]).reset_index()
+    assert [np.datetime64(bucket.start, "ms") for bucket in buckets] == \
+        [np.datetime64(value, "ms") for value in expected["bucket"].unique()]
+
+    for bucket in buckets:
+        rows = expected[expected["bucket"] == pd.Timestamp(bucket.start)].set_index(["lat", "lon"])
+        assert len(bucket.mean) == len(rows)
+        got = pd.DataFrame({
+            "lat": bucket.lats, "lon": bucket.lons, "mean": bucket.mean,
+            "min": bucket.minimum, "max": bucket.maximum, "count": bucket.counts
+        })
+        # Locations are averaged back from their readings; match them to the exact coordinates
+        got["lat"] = [rows.index.get_level_values("lat")[np.argmin(np.abs(rows.index.get_level_values("lat") - lat))]
+                      for lat in got["lat"]]
+        got["lon"] = [rows.index.get_level_values("lon")[np.argmin(np.abs(rows.index.get_level_values("lon") - lon))]
+                      for lon in got["lon"]]
+        got = got.set_index(["lat", "lon"]).loc[rows.index]
+        assert np.allclose(got["mean"], rows["mean"])
+        assert np.array_equal(got["min"], rows["min"])
+        assert np.array_equal(got["max"], rows["max"])
+        assert np.array_equal(got["count"], rows["count"])
+
+
+def test_aggregate_batches_is_independent_of_batch_size():
+    frame = _readings(seed=1)
+    small = _aggregate(frame, "h", batch_size=13)
+    large = _aggregate(frame, "h", batch_size=len(frame))
+    assert len(small) == len(large)
+    for a, b in zip(small, large):
+        assert a.start == b.start
+        assert np.allclose(a.mean, b.mean) and np.array_equal(a.counts, b.counts)
+
+
+def test_in_memory_store_round_trip():
+    grid_size = 3
+    lats = np.linspace(18.4, 18.6, grid_size ** 2)
+    lons = np.linspace(73.7, 73.9, grid_size ** 2)
+    start = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    store = InMemoryHistoryStore()
+
+    async def run():
+        for minutes, offset in ((0, 0.0), (30, 2.0), (90, 4.0)):
+            grid = HeatmapGrid(lats, lons, np.full(len(lats), 34.0 + offset), city="pune",
+                               center=(18.52, 73.85), grid_size=grid_size)
+            await store.insert_snapshot(grid, start + timedelta(minutes=minutes))
+        readings = [batch async for batch in store.iter_readings("pune", start, start + timedelta(hours=3), batch_size=4)]
+        buckets = [bucket async for bucket in store.iter_aggregates("pune", start, start + timedelta(hours=3))]
+        return readings, buckets
+
+    readings, buckets = asyncio.run(run())
+    assert sum(len(batch["temperature"]) for batch in readings) == 3 * len(lats)
+    assert [bucket.to_dict()["avg_temperature"] for bucket in buckets] == [35.0, 38.0]
+    assert [int(bucket.counts.sum()) for bucket in buckets] == [2 * len(lats), len(lats)]
+
+
+def test_history_route_pages_with_next_from(client, monkeypatch):
+    import app.routes.heatmap as heatmap_routes
+
+    grid_size = 3
+    lats = np.linspace(18.4, 18.6, grid_size ** 2)
+    lons = np.linspace(73.7, 73.9, grid_size ** 2)
+    start = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    store = InMemoryHistoryStore()
+
+    async def fill():
+        # Two snapshots per hour for 10 hours
+        for minutes in range(0, 600, 30):
+            grid = HeatmapGrid(lats, lons, np.full(len(lats), 30.0 + minutes / 60), city="pune",
+                               center=(18.52, 73.85), grid_size=grid_size)
+            await store.insert_snapshot(grid, start + timedelta(minutes=minutes))
+
+    asyncio.run(fill())
+    monkeypatch.setattr(heatmap_routes, "get_history_store", lambda: store)
+
+    end = (start + timedelta(hours=10)).isoformat()
+    pages, cursor = [], start.isoformat()
+    while cursor is not None:
+        response = client.get("/api/v1/heatmap_history", params={"from": cursor, "to": end, "limit": 4})
+        assert response.status_code == 200
+        page = response.json()
+        assert page["from"] == cursor
+        assert len(page["buckets"]) <= 4
+        pages.append(page)
+        cursor = page["next_from"]
+
+    assert [page["to"] for page in pages] == [
+        (start + timedelta(hours=4)).isoformat(), (start + timedelta(hours=8)).isoformat(), end
+    ]
+    assert [page["next_from"] for page in pages] == [pages[1]["from"], pages[2]["from"], None]
+
+    paged = [bucket for page in pages for bucket in page["buckets"]]
+    whole = client.get("/api/v1/heatmap_history", params={"from": start.isoformat(), "to": end, "limit": 1000}).json()
+    assert whole["next_from"] is None
+    assert paged == whole["buckets"]
+    assert [bucket["start"] for bucket in paged] == [(start + timedelta(hours=h)).isoformat() for h in range(10)]
+    assert all(bucket["samples"] == 2 * len(lats) for bucket in paged)
+
+
+def test_history_route_rejects_empty_range(client, monkeypatch):
+    import app.routes.heatmap as heatmap_routes
+
+    monkeypatch.setattr(heatmap_routes, "get_history_store", lambda: InMemoryHistoryStore())
+    response = client.get("/api/v1/heatmap_history", params={"from": "2026-06-01T02:00:00", "to": "2026-06-01T01:00:00"})
+    assert response.status_code == 400
@@ -0,0 +1,65 @@
+"""
+Tests for hotspot clustering memoized per heatmap version
+"""
+import numpy as np
+from app.models.clustering import UHIClusterer
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.hotspot_service import HotspotService
+from app.services.precompute_service import get_precompute_scheduler
+
+
+def _grid(seed: int, grid_size: int = 10) -> HeatmapGrid:
+    rng = np.random.default_rng(seed)
+    n = grid_size * grid_size
+    return HeatmapGrid(rng.uniform(18.4, 18.6, n), rng.uniform(73.7, 73.9, n), rng.uniform(30.0, 40.0, n),
+                       city="pune", center=(18.52, 73.85), grid_size=grid_size)
+
+
+def test_clustering_is_computed_once_per_grid_version(monkeypatch):
+    updates = []
+    update = UHIClusterer.update
+
+    def counting(self, *args, **kwargs):
+        updates.append(self)
+        return update(self, *args, **kwargs)
+
+    monkeypatch.setattr(UHIClusterer, "update", counting)
+    service = HotspotService(n_clusters=3)
+    grid = _grid(0)
+    first = service.get_clustering(grid)
+    assert service.get_clustering(grid) is first
+    assert len(updates) == 1
+    assert first.version == grid.version
+    assert len(first.labels) == len(grid)
+    assert sum(zone["point_count"] for zone in first.zone_list()) == len(grid)
+
+    # A refreshed grid is clustered again, warm-started by the same series clusterer
+    refreshed = service.get_clustering(_grid(1))
+    assert refreshed is not first
+    assert len(updates) == 2 and updates[0] is updates[1]
+
+
+def test_memo_is_bounded():
+    service = HotspotService(n_clusters=3, max_versions=2)
+    grids = [_grid(seed) for seed in range(3)]
+    for grid in grids:
+        service.get_clustering(grid)
+    assert list(service._memo) == [grid.version for grid in grids[1:]]
+
+
+def test_hotspots_route_serves_the_snapshot_clustering(client):
+    snapshot = get_precompute_scheduler().get_snapshot(grid_size=15)
+    body = client.get("/api/v1/hotspots", params={"grid_size": 15}).json()
+    assert body["grid_size"] == 15
+    assert body["version"] == snapshot.grid.version == snapshot.clustering.version
+    assert len(body["zones"]) == len(snapshot.clustering.zones)
+    assert sum(zone["point_count"] for zone in body["zones"]) == 225
+    # Same memoized result on every request until the snapshot changes
+    assert client.get("/api/v1/hotspots", params={"grid_size": 15}).json() == body
+
+
+def test_hotspots_route_without_a_snapshot(client):
+    body = client.get("/api/v1/hotspots", params={"grid_size": 9}).json()
+    assert body["grid_size"] == 9
+    assert sum(zone["point_count"] for zone in body["zones"]) == 81
+    assert client.get("/api/v1/hotspots", params={"grid_size": 9}).json()["version"] == body["version"]
@@ -0,0 +1,160 @@
+"""
+Tests for the pooled OpenWeatherMap client against a local stub server
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pytest
+from app.services.openweather_client import BOX_BACKOFF_INITIAL, OpenWeatherClient
+from app.services.weather_service import WeatherService
+
+
+class StubUpstream:
+    """
+    OpenWeatherMap stand-in. /weather answers with a temperature derived from
+    the latitude after `latency` seconds (or with `weather_status`); /box/city
+    answers with `box_status`/`box_body`. Requests are counted per path.
+    """
+
+    def __init__(self):
+        self.latency = 0.0
+        self.weather_status = 200
+        self.box_status = 404
+        self.box_body = b""
+        self.requests = Counter()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.rsplit("/", 2)
+                path = "box/city" if path[-2:] == ["box", "city"] else path[-1]
+                stub.requests[path] += 1
+                if path == "weather":
+                    time.sleep(stub.latency)
+                    lat = float(parse_qs(url.query)["lat"][0])
+                    status, body = stub.weather_status, json.dumps({"main": {"temp": stub.temperature(lat)}}).encode()
+                else:
+                    status, body = stub.box_status, stub.box_body
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @staticmethod
+    def temperature(lat: float) -> float:
+        return round(30 + (lat - 18) * 10, 2)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def client(upstream):
+    client = OpenWeatherClient(api_key="test", base_url=upstream.url, timeout=2.0)
+    yield client
+    client.close()
+
+
+def test_concurrent_lookups_for_one_cell_share_a_request(client, upstream):
+    upstream.latency = 0.2
+
+    async def lookups():
+        # All points snap to the same 0.05° cell
+        points = [(18.521 + i * 0.001, 73.851) for i in range(5)]
+        return await asyncio.gather(*(client.fetch_temperatures_async([lat], [lon]) for lat, lon in points))
+
+    results = asyncio.run(lookups())
+    assert upstream.requests["weather"] == 1
+    assert client.requests_made == 1
+    assert client.coalesced_lookups == 4
+    assert len({float(result[0]) for result in results}) == 1
+
+
+def test_box_not_found_disables_the_box_endpoint(client, upstream):
+    upstream.box_status = 404
+    client.fetch_temperatures([18.50, 18.60], [73.80, 73.90])
+    assert client.get_stats()["box_endpoint_enabled"] is False
+
+    client.fetch_temperatures([18.40, 18.70], [73.80, 73.90])
+    assert upstream.requests["box/city"] == 1
+
+
+@pytest.mark.parametrize("status, body", [(503, b""), (200, b'{"list": [trunc')])
+def test_transient_box_failure_backs_off(client, upstream, status, body):
+    upstream.box_status, upstream.box_body = status, body
+    temperatures = client.fetch_temperatures([18.50, 18.60], [73.80, 73.90])
+    stats = client.get_stats()
+    assert stats["box_endpoint_enabled"] is True
+    assert stats["box_endpoint_backing_off"] is True
+    assert client._box_backoff == 2 * BOX_BACKOFF_INITIAL
+    # Every cell still resolves through per-cell requests
+    assert np.allclose(temperatures, [upstream.temperature(18.50), upstream.temperature(18.60)])
+
+    client.fetch_temperatures([18.40, 18.70], [73.80, 73.90])
+    assert upstream.requests["box/city"] == 1
+
+
+def test_cells_without_a_nearby_station_fall_back_to_per_cell_requests(client, upstream):
+    upstream.box_status = 200
+    upstream.box_body = json.dumps({"list": [{"coord": {"Lat": 18.50, "Lon": 73.80}, "main": {"temp": 41.5}}]}).encode()
+    temperatures = client.fetch_temperatures([18.50, 18.60, 18.70], [73.80, 73.90, 74.00])
+
+    assert temperatures[0] == 41.5
+    assert np.allclose(temperatures[1:], [upstream.temperature(18.60), upstream.temperature(18.70)])
+    assert upstream.requests["box/city"] == 1
+    assert upstream.requests["weather"] == 2
+
+
+def test_cancelled_leader_does_not_hang_coalesced_waiters(client, upstream):
+    upstream.latency = 0.5
+
+    async def run():
+        key = client._cell_key(18.52, 73.85)
+        leader = asyncio.create_task(client._fetch_cell(key))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(client._fetch_cell(key))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        result = await asyncio.wait_for(waiter, timeout=2)
+        await client._client.aclose()
+        client._client = None
+        return result
+
+    assert asyncio.run(run()) is None
+
+
+def test_failed_lookups_are_filled_with_synthetic_temperatures(upstream, monkeypatch):
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setenv("OPENWEATHER_BASE_URL", upstream.url)
+    upstream.weather_status = 500
+    service = WeatherService()
+    lats, lons = np.array([18.50, 18.60]), np.array([73.80, 73.90])
+    try:
+        temperatures = service.get_temperatures(lats, lons)
+    finally:
+        service.close()
+
+    assert not np.isnan(temperatures).any()
+    assert np.allclose(temperatures, np.round(service.generate_synthetic_temperatures(lats, lons), 1))
+    assert upstream.requests["weather"] == 2
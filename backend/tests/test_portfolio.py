@@ -0,0 +1,47 @@
+"""
+Tests for the budget-constrained intervention portfolio optimizer
+"""
+import numpy as np
+import pytest
+from app.services.portfolio_service import PortfolioOptimizer
+
+
+def _sites(seed: int, n: int = 6):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(18.45, 18.6, n), rng.uniform(73.75, 73.95, n), rng.uniform(31.0, 40.0, n)
+
+
+@pytest.mark.parametrize("budget", [5e4, 6e5, 1.5e6, 4e6])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_greedy_agrees_with_exact_on_small_instances(budget, seed):
+    optimizer = PortfolioOptimizer()
+    lats, lons, temperatures = _sites(seed)
+    greedy = optimizer.optimize(lats, lons, temperatures, budget, method="greedy")
+    exact = optimizer.optimize(lats, lons, temperatures, budget, method="exact")
+
+    assert exact["optimal"]
+    assert greedy["cost"] <= budget and exact["cost"] <= budget
+    assert greedy["cooling"] <= exact["cooling"] + 0.01
+    assert greedy["cooling"] >= 0.95 * exact["cooling"]
+
+
+def test_area_limit_is_respected():
+    optimizer = PortfolioOptimizer()
+    lats, lons, temperatures = _sites(2)
+    for method in ("greedy", "exact"):
+        result = optimizer.optimize(lats, lons, temperatures, 4e6, max_area=1500, method=method)
+        assert result["area_used"] <= 1500
+
+
+def test_impact_is_built_from_capped_site_reductions():
+    optimizer = PortfolioOptimizer()
+    lats, lons, temperatures = _sites(3, n=10)
+    result = optimizer.optimize(lats, lons, temperatures, 4e6, target_temperature=33.0, method="greedy")
+    impact = result["impact"]
+
+    assert impact["intervention_count"] == len(result["interventions"])
+    assert impact["temperature_reduction"] * impact["site_count"] == pytest.approx(result["cooling"], abs=0.05)
+    headroom = np.maximum(temperatures - 33.0, 0.5)
+    assert impact["max_site_reduction"] <= headroom.max() + 0.01
+    built = sorted({tuple(intervention["location"]) for intervention in result["interventions"]})
+    assert impact["site_count"] == len(built)
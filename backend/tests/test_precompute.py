@@ -0,0 +1,72 @@
+"""
+Tests for the background heatmap precompute scheduler
+"""
+import asyncio
+import numpy as np
+from app.services.history_store import InMemoryHistoryStore
+from app.services.precompute_service import PrecomputeScheduler, get_precompute_scheduler
+
+
+def test_refresh_publishes_a_complete_snapshot_set():
+    history = InMemoryHistoryStore()
+    scheduler = PrecomputeScheduler(cities=["pune"], grid_sizes=[12, 15], history=history)
+    assert scheduler.get_snapshot(grid_size=12) is None
+
+    assert asyncio.run(scheduler.refresh_once()) == 1
+    for grid_size in (12, 15):
+        snapshot = scheduler.get_snapshot(grid_size=grid_size)
+        assert snapshot.version == 1
+        assert len(snapshot.grid) == grid_size ** 2
+        assert snapshot.recommendations
+        assert len(snapshot.clustering.labels) == grid_size ** 2
+    assert scheduler.get_finest_snapshot().grid_size == 15
+    assert history.get_stats()["snapshots"] == 2
+
+    finest = scheduler.get_finest_snapshot()
+    cell = 7
+    assert finest.lookup_temperature(finest.lats[cell], finest.lons[cell]) == finest.temperatures[cell]
+    assert finest.lookup_temperature(19.5, 74.8) is None
+
+
+def test_failed_refresh_keeps_previous_snapshots(monkeypatch):
+    scheduler = PrecomputeScheduler(cities=["pune"], grid_sizes=[12, 15])
+    asyncio.run(scheduler.refresh_once())
+    published = dict(scheduler._snapshots)
+
+    build = scheduler._build_snapshot
+
+    async def failing_build(city, grid_size, version):
+        if grid_size == 15:
+            raise RuntimeError("upstream down")
+        return await build(city, grid_size, version)
+
+    monkeypatch.setattr(scheduler, "_build_snapshot", failing_build)
+    assert asyncio.run(scheduler.refresh_now()) is False
+    # Neither snapshot of the failed set is published
+    assert scheduler._snapshots == published
+    assert scheduler.version == 1
+    assert scheduler.get_stats()["refresh_failures"] == 1
+
+
+def test_history_failure_does_not_fail_the_refresh():
+    class BrokenHistory:
+        async def insert_snapshot(self, grid, timestamp):
+            raise ConnectionError("history unavailable")
+
+    scheduler = PrecomputeScheduler(cities=["pune"], grid_sizes=[12], history=BrokenHistory())
+    assert asyncio.run(scheduler.refresh_now()) is True
+    assert scheduler.version == 1
+    assert scheduler.get_stats()["history_failures"] == 1
+
+
+def test_routes_serve_the_published_snapshots(client):
+    scheduler = get_precompute_scheduler()
+    heatmap_snapshot = scheduler.get_snapshot(grid_size=15)
+    heatmap = client.get("/api/v1/heatmap_data", params={"grid_size": 15}).json()
+    np.testing.assert_array_equal(
+        [feature["properties"]["temperature"] for feature in heatmap["features"]], heatmap_snapshot.temperatures
+    )
+
+    recommendations = client.get("/api/v1/recommendations").json()
+    assert recommendations == scheduler.get_snapshot(grid_size=12).recommendations
+    assert client.get("/api/v1/heatmap_cache_stats").json()["precompute"]["version"] >= 1
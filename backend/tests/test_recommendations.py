@@ -0,0 +1,144 @@
+"""
+Tests for array-based recommendation generation against the per-point path it replaced
+"""
+import numpy as np
+import pytest
+from app.services.hotspot_service import HotspotClustering
+from app.services.recommendation_service import RecommendationService, _top_k
+from app.utils.spatial import SpatialIndex
+
+
+def _legacy_intervention(priority: str, i: int, temp: float, avg_temp: float) -> dict:
+    """The literal per-point recommendation bodies, tier by tier"""
+    def body(action, description, address, impact, cost, timeframe, kind, size_field, size):
+        return {
+            "action": action, "description": description, "address": f"{address} {i + 1} ({temp}°C)",
+            "temp_reduction": round((temp - avg_temp) * impact, 1), "cost": cost, "timeframe": timeframe,
+            "type": kind, size_field: size
+        }
+
+    if priority == "High" and temp > 40:
+        reduction = round((temp - avg_temp) * 0.35, 1)
+        return body("Create urban park",
+                    f"Convert area into green space. Current temp: {temp}°C. Expected reduction: {reduction}°C",
+                    "Critical Hotspot", 0.35, "Medium", "6-12 months", "park", "area", 1500 + i * 200)
+    if priority == "High" and temp > 39:
+        return body("Plant urban forest", f"Plant {25 + i * 5} trees to create canopy cover. Current temp: {temp}°C",
+                    "Hotspot Zone", 0.32, "Low", "3-6 months", "trees", "count", 25 + i * 5)
+    if priority == "High":
+        return body("Install cool roof system", f"Apply reflective coating to buildings. Current temp: {temp}°C",
+                    "Building Zone", 0.28, "Medium", "1-2 months", "cool_roof", "area", 600 + i * 100)
+    if i % 2 == 0:
+        return body("Install green roof", f"Convert rooftop to vegetation. Current temp: {temp}°C",
+                    "Rooftop Zone", 0.22, "High", "2-4 months", "green_roof", "area", 500 + i * 50)
+    return body("Plant shade trees", f"Plant {20 + i * 3} trees along streets. Current temp: {temp}°C",
+                "Street Zone", 0.25, "Low", "3-6 months", "trees", "count", 20 + i * 3)
+
+
+def _legacy_recommendations(features, spatial_index, clustering=None):
+    """Per-feature implementation: full sort of the hot features, one dict per recommendation"""
+    temperatures = [f["properties"]["temperature"] for f in features]
+    avg_temp = np.mean(temperatures)
+    max_temp, min_temp = max(temperatures), min(temperatures)
+    temp_range = max_temp - min_temp
+    temp_threshold = avg_temp + temp_range * 0.3
+    hot = [i for i, t in enumerate(temperatures) if t >= temp_threshold]
+    hot.sort(key=lambda i: temperatures[i], reverse=True)
+    if clustering is not None:
+        leaders = {}
+        for i in hot:
+            leaders.setdefault(int(clustering.labels[i]), i)
+        ordered = sorted(leaders.values(), key=lambda i: clustering.zones[int(clustering.labels[i])]["avg_temperature"],
+                         reverse=True)
+        hot = ordered + [i for i in hot if i not in ordered]
+
+    recommendations = []
+
+    def add(priority, i, cell):
+        props = features[cell]["properties"]
+        fields = _legacy_intervention(priority, i, props["temperature"], avg_temp)
+        recommendations.append({
+            "id": len(recommendations) + 1,
+            "action": fields.pop("action"),
+            "description": fields.pop("description"),
+            "location": {"lat": props["lat"], "lon": props["lon"], "address": fields.pop("address")},
+            "priority": priority,
+            "estimated_impact": {key: fields.pop(key) for key in ("temp_reduction", "cost", "timeframe")},
+            **fields
+        })
+
+    if max_temp > 38:
+        for i, cell in enumerate(hot[:4]):
+            add("High", i, cell)
+    if avg_temp > 35 and len(hot) > 4:
+        for i, cell in enumerate(hot[4:7]):
+            add("Medium", i, cell)
+    if temp_range > 5:
+        array = np.asarray(temperatures)
+        in_band = (array >= avg_temp - 1) & (array <= avg_temp + 1)
+        hottest = features[int(np.argmax(array))]["properties"]
+        corridor = spatial_index.nearest_where(hottest["lat"], hottest["lon"], in_band)
+        if corridor is not None:
+            props = features[corridor]["properties"]
+            recommendations.append({
+                "id": len(recommendations) + 1,
+                "action": "Create cooling corridor",
+                "description": "Connect green spaces to create cooling pathways",
+                "location": {"lat": props["lat"], "lon": props["lon"], "address": "Strategic Location"},
+                "priority": "Medium",
+                "estimated_impact": {"temp_reduction": round(temp_range * 0.15, 1), "cost": "Medium",
+                                     "timeframe": "6-12 months"},
+                "type": "park",
+                "area": 1000
+            })
+    order = {"High": 0, "Medium": 1, "Low": 2}
+    recommendations.sort(key=lambda r: (order[r["priority"]], -r["estimated_impact"]["temp_reduction"]))
+    return recommendations[:8]
+
+
+def _heatmap(seed: int, grid_size: int = 20, mean: float = 36.0):
+    rng = np.random.default_rng(seed)
+    lat_grid, lon_grid = np.meshgrid(np.linspace(18.4, 18.6, grid_size), np.linspace(73.7, 73.9, grid_size))
+    lats, lons = lat_grid.ravel(), lon_grid.ravel()
+    # Rounded to 0.1°C like the heatmap, so there are plenty of ties
+    temperatures = np.round(rng.normal(mean, 2.0, len(lats)), 1)
+    features = [
+        {"properties": {"lat": lat, "lon": lon, "temperature": temp}}
+        for lat, lon, temp in zip(lats.tolist(), lons.tolist(), temperatures.tolist())
+    ]
+    return lats, lons, temperatures, {"features": features}
+
+
+@pytest.mark.parametrize("seed, mean", [(0, 36.0), (1, 36.0), (2, 33.0), (3, 38.5), (5, 34.0)])
+def test_recommendations_match_per_point_path(seed, mean):
+    lats, lons, temperatures, heatmap = _heatmap(seed, mean=mean)
+    index = SpatialIndex(lats, lons)
+    service = RecommendationService()
+
+    expected = _legacy_recommendations(heatmap["features"], index)
+    assert expected
+    assert service.generate_recommendations(heatmap, spatial_index=index) == expected
+    assert service.generate_recommendations_from_arrays(lats, lons, temperatures, spatial_index=index) == expected
+
+
+@pytest.mark.parametrize("seed", [0, 4])
+def test_zone_spread_recommendations_match_per_point_path(seed):
+    lats, lons, temperatures, heatmap = _heatmap(seed)
+    labels = (lats > 18.5).astype(int) + 2 * (lons > 73.8).astype(int)
+    zones = {zone: {"avg_temperature": float(temperatures[labels == zone].mean())} for zone in range(4)}
+    clustering = HotspotClustering(version=1, zones=zones, labels=labels)
+    index = SpatialIndex(lats, lons)
+
+    expected = _legacy_recommendations(heatmap["features"], index, clustering)
+    assert RecommendationService().generate_recommendations_from_arrays(
+        lats, lons, temperatures, spatial_index=index, clustering=clustering
+    ) == expected
+
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(5)
+    temperatures = np.round(rng.normal(36.0, 1.0, 500), 0)
+    candidates = np.flatnonzero(temperatures >= 36.0)
+    expected = sorted(candidates.tolist(), key=lambda i: temperatures[i], reverse=True)
+    for k in (0, 1, 7, len(candidates), len(candidates) + 3):
+        assert _top_k(candidates, temperatures, k).tolist() == expected[:k]
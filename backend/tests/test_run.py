@@ -0,0 +1,78 @@
+"""
+Tests for the production launcher and the state its workers share
+"""
+import asyncio
+import os
+import numpy as np
+import pytest
+import run
+from app.services.precompute_service import PrecomputeScheduler
+from app.services.snapshot_store import SnapshotStore
+
+LAUNCHER_ENV = ("API_WORKERS", "WARMUP_ON_STARTUP", "SIMULATION_WORKERS", "SNAPSHOT_STORE_DIR",
+                "SIMULATION_SESSION_PATH", "API_GRACEFUL_TIMEOUT")
+
+
+@pytest.fixture
+def uvicorn_calls(monkeypatch):
+    # run_production configures its workers through os.environ; keep that out of other tests
+    environ = {name: value for name, value in os.environ.items() if name not in LAUNCHER_ENV}
+    monkeypatch.setattr(os, "environ", environ)
+    calls = []
+    monkeypatch.setattr(run.uvicorn, "run", lambda app, **kwargs: calls.append((app, kwargs)))
+    return calls
+
+
+def test_production_mode_runs_workers_without_reload(uvicorn_calls, monkeypatch):
+    monkeypatch.setattr(run.os, "cpu_count", lambda: 8)
+    monkeypatch.setenv("API_WORKERS", "4")
+    run.run_production("127.0.0.1", 9100)
+
+    [(app, kwargs)] = uvicorn_calls
+    assert app == "app.main:app"
+    assert kwargs["workers"] == 4
+    assert "reload" not in kwargs
+    assert kwargs["timeout_graceful_shutdown"] == 30.0
+    assert kwargs["loop"] in ("uvloop", "asyncio") and kwargs["http"] in ("httptools", "h11")
+
+    # Workers inherit the shared-state configuration
+    assert os.environ["WARMUP_ON_STARTUP"] == "true"
+    assert os.environ["SIMULATION_WORKERS"] == "2"
+    assert os.environ["SNAPSHOT_STORE_DIR"].endswith("uhi-snapshots-9100")
+    assert os.environ["SIMULATION_SESSION_PATH"] == os.path.join(os.environ["SNAPSHOT_STORE_DIR"], "sessions.db")
+
+
+def test_production_mode_keeps_explicit_settings(uvicorn_calls, monkeypatch, tmp_path):
+    monkeypatch.setattr(run.os, "cpu_count", lambda: 8)
+    monkeypatch.setenv("SNAPSHOT_STORE_DIR", str(tmp_path))
+    monkeypatch.setenv("SIMULATION_WORKERS", "3")
+    monkeypatch.setenv("API_GRACEFUL_TIMEOUT", "5")
+    run.run_production("127.0.0.1", 9100)
+
+    [(_, kwargs)] = uvicorn_calls
+    assert kwargs["workers"] == 8
+    assert kwargs["timeout_graceful_shutdown"] == 5.0
+    assert os.environ["SNAPSHOT_STORE_DIR"] == str(tmp_path)
+    assert os.environ["SIMULATION_WORKERS"] == "3"
+
+
+def test_reader_workers_serve_the_producers_snapshots(tmp_path):
+    producer = PrecomputeScheduler(cities=["pune"], grid_sizes=[12], store=SnapshotStore(str(tmp_path)))
+    reader = PrecomputeScheduler(cities=["pune"], grid_sizes=[12], store=SnapshotStore(str(tmp_path)))
+    try:
+        assert asyncio.run(producer.refresh_now())
+        assert producer.is_producer() and not reader.is_producer()
+        assert asyncio.run(reader.refresh_now())
+
+        built, shared = producer.get_snapshot(grid_size=12), reader.get_snapshot(grid_size=12)
+        assert reader.version == producer.version == 1
+        np.testing.assert_array_equal(shared.temperatures, built.temperatures)
+        assert shared.recommendations == built.recommendations
+        assert reader.get_stats()["role"] == "reader"
+
+        # The reader takes over once the producer exits
+        producer.store.close()
+        assert reader.is_producer()
+    finally:
+        producer.store.close()
+        reader.store.close()
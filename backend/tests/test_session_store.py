@@ -0,0 +1,86 @@
+"""
+Tests for incremental simulation sessions
+"""
+import pytest
+from app.services.session_service import InMemorySessionStore, SimulationSessionStore
+
+INTERVENTIONS = [
+    ({"type": "trees", "count": 30, "area": 0, "location": [18.52, 73.85], "base_temperature": 37.5}, "moderate"),
+    ({"type": "park", "count": 0, "area": 2000, "location": [18.53, 73.87], "base_temperature": 39.0}, "poor"),
+    ({"type": "cool_roof", "count": 0, "area": 800, "location": [18.50, 73.83], "base_temperature": 35.2}, "good"),
+    ({"type": "green_roof", "count": 0, "area": 400, "location": [18.51, 73.90], "base_temperature": 36.1}, "poor"),
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemorySessionStore()
+    else:
+        store = SimulationSessionStore(path=str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def test_http_session_matches_full_simulation_at_every_step(client):
+    """Each add/update/remove leaves the session equal to POSTing its whole list"""
+    edits = [
+        ("add", None, {"type": "trees", "count": 20, "location": [18.52, 73.85]}),
+        ("add", None, {"type": "park", "area": 2000, "location": [18.53, 73.84]}),
+        ("add", None, {"type": "cool_roof", "area": 800, "location": [18.50, 73.83], "base_temperature": 35.2}),
+        ("update", 0, {"type": "green_roof", "area": 400, "location": [18.51, 73.90]}),
+        ("remove", 1, None),
+        ("add", None, {"type": "trees", "count": 60, "location": [18.49, 73.88]}),
+        ("remove", 0, None),
+    ]
+    session_id = client.post("/api/v1/simulation_sessions").json()["session_id"]
+    base = f"/api/v1/simulation_sessions/{session_id}/interventions"
+    ids, current = [], {}
+    for action, position, body in edits:
+        if action == "add":
+            response = client.post(base, json=body)
+            ids.append(response.json()["intervention_id"])
+            current[ids[-1]] = body
+        elif action == "update":
+            response = client.put(f"{base}/{ids[position]}", json=body)
+            current[ids[position]] = body
+        else:
+            response = client.delete(f"{base}/{ids[position]}")
+            del current[ids[position]]
+        assert response.status_code == 200
+
+        session = client.get(f"/api/v1/simulation_sessions/{session_id}").json()
+        full = client.post("/api/v1/simulate_intervention",
+                           json={"interventions": [current[key] for key in sorted(current)]}).json()
+        assert session["metrics"] == full
+        assert [entry["id"] for entry in session["interventions"]] == sorted(current)
+
+
+def test_changed_reports_only_changed_metrics(store):
+    session_id, before = store.create()
+    result = store.add(session_id, store.contribution(*INTERVENTIONS[0]))
+    after = store.get(session_id)["metrics"]
+    assert result["changed"] == {key: value for key, value in after.items() if before[key] != value}
+
+
+def test_unknown_session_and_intervention_raise_key_error(store):
+    with pytest.raises(KeyError):
+        store.add("missing", store.contribution(*INTERVENTIONS[0]))
+    session_id, _ = store.create()
+    with pytest.raises(KeyError):
+        store.remove(session_id, 99)
+    assert store.delete(session_id)
+    with pytest.raises(KeyError):
+        store.get(session_id)
+
+
+def test_sqlite_store_matches_in_memory_store(tmp_path):
+    memory = InMemorySessionStore()
+    sqlite = SimulationSessionStore(path=str(tmp_path / "sessions.db"))
+    sessions = [(store, store.create()[0]) for store in (memory, sqlite)]
+    for store, session_id in sessions:
+        ids = [store.add(session_id, store.contribution(*entry))["intervention_id"] for entry in INTERVENTIONS]
+        store.update(session_id, ids[2], store.contribution(*INTERVENTIONS[1]))
+        store.remove(session_id, ids[0])
+    assert memory.get(sessions[0][1]) == sqlite.get(sessions[1][1])
+    sqlite.close()
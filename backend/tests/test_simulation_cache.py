@@ -0,0 +1,87 @@
+"""
+Tests for the canonical scenario hash and the simulation result cache
+"""
+import asyncio
+import pytest
+from app.services.simulation_cache import SimulationResultCache, scenario_key
+
+TREES = {"type": "trees", "count": 20, "area": 0, "location": [18.5204, 73.8567], "base_temperature": 36.0}
+PARK = {"type": "park", "count": 0, "area": 1500.0, "location": [18.5300, 73.8700], "base_temperature": None}
+
+
+def test_key_ignores_order_and_float_noise():
+    noisy = dict(TREES, location=[18.52041, 73.85669], base_temperature=36.001, area=None)
+    assert scenario_key([TREES, PARK]) == scenario_key([PARK, noisy])
+
+
+@pytest.mark.parametrize("change", [
+    {"type": "cool_roof"},
+    {"count": 21},
+    {"area": 100.0},
+    {"location": [18.5214, 73.8567]},
+    {"base_temperature": 36.5},
+    {"base_temperature": None},
+])
+def test_key_changes_with_any_meaningful_field(change):
+    assert scenario_key([TREES]) != scenario_key([dict(TREES, **change)])
+
+
+def test_key_distinguishes_missing_from_zero_base_temperature():
+    assert scenario_key([dict(TREES, base_temperature=None)]) != scenario_key([dict(TREES, base_temperature=0.0)])
+
+
+def test_weather_version_invalidates_key():
+    assert scenario_key([PARK], "a1") != scenario_key([PARK], "b2")
+    assert scenario_key([PARK], "a1") == scenario_key([PARK], "a1")
+
+
+def _run(cache: SimulationResultCache, key: str, value: dict, calls: list) -> dict:
+    async def compute():
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return value
+    return cache.get_or_compute_async(key, compute)
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = SimulationResultCache()
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(_run(cache, "k", {"v": 1}, calls) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"v": 1}] * 5
+    assert calls == ["k"]
+    assert cache.get_stats()["shared"] == 4
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = SimulationResultCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.simulation_cache.time.time", lambda: now[0])
+    calls = []
+    asyncio.run(_run(cache, "k", {"v": 1}, calls))
+    asyncio.run(_run(cache, "k", {"v": 1}, calls))
+    now[0] += 10
+    asyncio.run(_run(cache, "k", {"v": 2}, calls))
+    assert calls == ["k", "k"]
+    assert cache.get("k") == {"v": 2}
+
+
+def test_persisted_results_survive_a_new_cache(tmp_path):
+    path = str(tmp_path / "results.db")
+    first = SimulationResultCache(path=path)
+    asyncio.run(_run(first, "k", {"v": 1}, []))
+    first.close()
+
+    second = SimulationResultCache(path=path)
+    calls = []
+    assert asyncio.run(_run(second, "k", {"v": 2}, calls)) == {"v": 1}
+    assert calls == [] and second.get_stats()["disk_hits"] == 1
+    second.close()
+
+
+
+def test_resolved_air_quality_is_part_of_the_key():
+    resolved = dict(TREES, base_temperature=38.2)
+    assert scenario_key([resolved], air_qualities=["poor"]) != scenario_key([resolved], air_qualities=["moderate"])
@@ -0,0 +1,21 @@
+"""
+Route-level tests: every simulation path resolves the same scenario identically
+"""
+import json
+
+SCENARIO = [
+    {"type": "trees", "count": 20, "location": [18.52, 73.85]},
+    {"type": "park", "area": 2000, "location": [18.53, 73.84]},
+]
+
+
+def test_cached_single_and_batch_simulation_agree(client):
+    first = client.post("/api/v1/simulate_intervention", json={"interventions": SCENARIO})
+    cached = client.post("/api/v1/simulate_intervention", json={"interventions": SCENARIO})
+    batch = client.post("/api/v1/simulate_batch", json={"scenarios": [{"interventions": SCENARIO}]})
+    assert first.status_code == cached.status_code == batch.status_code == 200
+
+    [line] = [json.loads(line) for line in batch.text.splitlines()]
+    assert cached.json() == first.json()
+    assert {key: line[key] for key in first.json()} == first.json()
+
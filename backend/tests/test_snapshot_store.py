@@ -0,0 +1,74 @@
+"""
+Tests for the memory-mapped cross-process snapshot store
+"""
+import numpy as np
+from app.services.heatmap_grid import HeatmapGrid
+from app.services.hotspot_service import HotspotClustering
+from app.services.snapshot_store import SnapshotStore
+
+
+class _Snapshot:
+    def __init__(self, grid, recommendations, clustering):
+        self.grid = grid
+        self.recommendations = recommendations
+        self.clustering = clustering
+
+
+def _grid(grid_size: int = 4) -> HeatmapGrid:
+    n = grid_size * grid_size
+    return HeatmapGrid(
+        np.linspace(18.4, 18.6, n), np.linspace(73.7, 73.9, n), np.linspace(30.0, 40.0, n),
+        city="pune", center=(18.52, 73.85), grid_size=grid_size
+    )
+
+
+def test_publish_load_round_trip(tmp_path):
+    grid = _grid()
+    labels = np.arange(len(grid), dtype=np.int32) % 2
+    zones = {
+        0: {"cluster_id": 0, "avg_temperature": 33.0, "point_count": 8},
+        1: {"cluster_id": 1, "avg_temperature": 37.0, "point_count": 8}
+    }
+    recommendations = [{"id": 1, "priority": "high", "temperature": np.float64(39.5)}]
+    store = SnapshotStore(str(tmp_path))
+    store.publish(7, {("pune", 4): _Snapshot(grid, recommendations, HotspotClustering(grid.version, zones, labels))})
+
+    manifest = store.manifest()
+    assert manifest["version"] == 7
+    loaded = store.load(manifest["files"]["pune:4"])
+
+    assert loaded.version == 7
+    assert loaded.grid.city == "pune" and loaded.grid.grid_size == 4
+    assert tuple(loaded.grid.center) == grid.center
+    for column in ("lats", "lons", "temperatures"):
+        assert np.array_equal(getattr(loaded.grid, column), getattr(grid, column))
+        assert not getattr(loaded.grid, column).flags.writeable
+    assert loaded.recommendations == [{"id": 1, "priority": "high", "temperature": 39.5}]
+    assert np.array_equal(loaded.clustering.labels, labels)
+    assert loaded.clustering.zones == zones
+
+
+def test_republish_switches_manifest_and_removes_old_files(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.publish(1, {("pune", 4): _Snapshot(_grid(), [], None)})
+    first_file = store.manifest()["files"]["pune:4"]
+    store.publish(2, {("pune", 4): _Snapshot(_grid(), [], None)})
+
+    manifest = store.manifest()
+    assert manifest["version"] == 2
+    assert manifest["files"]["pune:4"] != first_file
+    assert not (tmp_path / first_file).exists()
+    assert store.load(manifest["files"]["pune:4"]).clustering is None
+
+
+def test_single_producer_election(tmp_path):
+    producer = SnapshotStore(str(tmp_path))
+    follower = SnapshotStore(str(tmp_path))
+    try:
+        assert producer.try_acquire_producer()
+        assert not follower.try_acquire_producer()
+        producer.close()
+        assert follower.try_acquire_producer()
+    finally:
+        producer.close()
+        follower.close()
@@ -0,0 +1,76 @@
+"""
+Tests for the KD-tree spatial index against brute-force haversine distances
+"""
+import numpy as np
+import pytest
+from app.utils.geo import haversine_km
+from app.utils.spatial import SpatialIndex
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(11)
+    return rng.uniform(18.40, 18.65, 3000), rng.uniform(73.70, 74.00, 3000)
+
+
+@pytest.fixture(scope="module")
+def queries():
+    rng = np.random.default_rng(12)
+    return rng.uniform(18.38, 18.67, 200), rng.uniform(73.68, 74.02, 200)
+
+
+def _distances(points, lat, lon) -> np.ndarray:
+    return haversine_km(lat, lon, points[0], points[1])
+
+
+def test_nearest_matches_brute_force(points, queries):
+    index = SpatialIndex(*points)
+    distances, indices = index.nearest(*queries)
+    for lat, lon, distance, found in zip(*queries, distances, indices):
+        exact = _distances(points, lat, lon)
+        assert found == exact.argmin()
+        assert distance == pytest.approx(exact[found])
+
+
+def test_k_nearest_matches_brute_force(points, queries):
+    index = SpatialIndex(*points)
+    for lat, lon in zip(*(q[:50] for q in queries)):
+        exact = _distances(points, lat, lon)
+        _, indices = index.k_nearest(lat, lon, 10)
+        assert np.all(np.diff(exact[indices]) >= -1e-3)
+        assert exact[indices].max() <= np.sort(exact)[9] * 1.005
+
+
+def test_within_radius_matches_brute_force(points, queries):
+    index = SpatialIndex(*points)
+    radius = 1.5
+    for lat, lon in zip(*(q[:50] for q in queries)):
+        exact = _distances(points, lat, lon)
+        found = set(index.within_radius(lat, lon, radius).tolist())
+        assert set(np.flatnonzero(exact < radius * 0.995).tolist()) <= found
+        assert found <= set(np.flatnonzero(exact < radius * 1.005).tolist())
+
+
+def test_nearest_where_matches_brute_force(points, queries):
+    index = SpatialIndex(*points)
+    mask = np.zeros(len(points[0]), dtype=bool)
+    mask[::97] = True
+    for lat, lon in zip(*(q[:50] for q in queries)):
+        exact = _distances(points, lat, lon)
+        found = index.nearest_where(lat, lon, mask)
+        assert mask[found]
+        assert exact[found] <= exact[mask].min() * 1.005 + 1e-9
+    assert index.nearest_where(18.5, 73.8, np.zeros_like(mask)) is None
+
+
+def test_synthetic_temperatures_match_distance_matrix(points):
+    from app.services.weather_service import HOTSPOT_ZONES, WeatherService, _coordinate_variation
+
+    lats, lons = points
+    distances = haversine_km(lats[:, None], lons[:, None], HOTSPOT_ZONES[:, 0], HOTSPOT_ZONES[:, 1])
+    closest = distances.argmin(axis=1)
+    expected = HOTSPOT_ZONES[closest, 2] - distances[np.arange(len(lats)), closest] * 0.1
+    expected = np.round(np.clip(expected + _coordinate_variation(lats, lons), 25, 42), 1)
+
+    temperatures = WeatherService().generate_synthetic_temperatures(lats, lons)
+    np.testing.assert_array_equal(temperatures, expected)
@@ -0,0 +1,114 @@
+"""
+Tests for the stale-while-revalidate LRU cache and the heatmap cache built on it
+"""
+import asyncio
+import time
+import pytest
+from app.services.weather_service import WeatherService
+from app.utils.cache import SWRCache
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_fresh_stale_and_expired_entries():
+    cache = SWRCache(max_entries=4, ttl=0.05, stale_ttl=0.2)
+    loads = []
+
+    def loader():
+        loads.append(time.monotonic())
+        return len(loads)
+
+    assert cache.get_or_load("key", loader) == 1
+    assert cache.get_or_load("key", loader) == 1
+    time.sleep(0.08)
+    # Stale: served immediately while one background refresh runs
+    assert cache.get_or_load("key", loader) == 1
+    _wait_for(lambda: cache.get_stats()["refreshes"] == 1)
+    assert cache.get_or_load("key", loader) == 2
+    time.sleep(0.3)
+    # Past ttl + stale_ttl: loaded inline
+    assert cache.get_or_load("key", loader) == 3
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"], stats["refreshes"]) == (2, 1, 2, 1)
+
+
+def test_lru_eviction():
+    cache = SWRCache(max_entries=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get_or_load("a", lambda: None) == 1
+    cache.put("c", 3)
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+    assert cache.get_stats()["evictions"] == 2
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_failed_refresh_keeps_serving_stale_value():
+    cache = SWRCache(ttl=0.01, stale_ttl=60)
+    cache.put("key", "old")
+    time.sleep(0.02)
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_load("key", failing) == "old"
+    _wait_for(lambda: cache.get_stats()["refresh_failures"] == 1)
+    assert cache.get_or_load("key", failing) == "old"
+
+
+def test_concurrent_async_misses_share_one_load():
+    cache = SWRCache(ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load_async("key", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert calls == 1
+
+
+def test_cancelled_leading_load_hands_over_to_waiters():
+    cache = SWRCache(ttl=60)
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_load_async("key", loader))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(cache.get_or_load_async("key", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    assert asyncio.run(run()) == ["value"] * 3
+
+
+def test_heatmap_cache_is_keyed_per_grid_size(monkeypatch):
+    monkeypatch.delenv("OPENWEATHER_API_KEY", raising=False)
+    service = WeatherService()
+    small = service.get_heatmap_grid(grid_size=12)
+    large = service.get_heatmap_grid(grid_size=15)
+    assert (len(small), len(large)) == (144, 225)
+    assert service.get_heatmap_grid(grid_size=12) is small
+    assert service.get_heatmap_grid(grid_size=15) is large
+
+    key = service._heatmap_cache_key(12)
+    assert key[0] == 12 and key[2] == "synthetic" and len(key[1]) == 4
+    stats = service.get_cache_stats()["heatmap_cache"]
+    assert (stats["entries"], stats["misses"], stats["hits"]) == (2, 2, 2)
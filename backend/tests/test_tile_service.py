@@ -0,0 +1,104 @@
+"""
+Tests for the heatmap tile pyramid
+"""
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from app.services.tile_service import HeatmapTileService, tile_bounds
+
+PUNE_BOUNDS = (18.35, 73.65, 18.70, 74.05)
+
+
+def _tile_at(z: int, lat: float, lon: float):
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+@pytest.fixture
+def tiles(monkeypatch):
+    """Small tile service that records which zooms it samples at"""
+    service = HeatmapTileService(PUNE_BOUNDS, max_zoom=12, tile_size=8, pool_levels=2)
+    service.sampled = Counter()
+    render_sampled = service._render_sampled
+
+    def counting(z, x, y):
+        service.sampled[z] += 1
+        return render_sampled(z, x, y)
+
+    monkeypatch.setattr(service, "_render_sampled", counting)
+    return service
+
+
+def test_tile_bounds():
+    lat_min, lon_min, lat_max, lon_max = tile_bounds(0, 0, 0)
+    assert (lon_min, lon_max) == (-180.0, 180.0)
+    assert lat_max == pytest.approx(85.0511, abs=1e-4)
+    assert lat_min == pytest.approx(-85.0511, abs=1e-4)
+
+    # The four children exactly partition their parent
+    z, x, y = 10, *_tile_at(10, 18.52, 73.85)
+    parent = tile_bounds(z, x, y)
+    children = [tile_bounds(z + 1, 2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1)]
+    assert min(c[0] for c in children) == pytest.approx(parent[0])
+    assert min(c[1] for c in children) == pytest.approx(parent[1])
+    assert max(c[2] for c in children) == pytest.approx(parent[2])
+    assert max(c[3] for c in children) == pytest.approx(parent[3])
+    assert parent[0] <= 18.52 <= parent[2] and parent[1] <= 73.85 <= parent[3]
+
+
+def test_base_tile_samples_once(tiles):
+    tile = tiles.get_tile(12, *_tile_at(12, 18.52, 73.85))
+    assert tile.shape == (8, 8)
+    assert not np.isnan(tile).all()
+    assert tiles.sampled == {12: 1}
+
+
+def test_pooled_levels_render_at_most_four_to_the_pool_levels_base_tiles(tiles):
+    tiles.get_tile(10, *_tile_at(10, 18.52, 73.85))
+    assert set(tiles.sampled) == {12}
+    assert tiles.sampled[12] <= 4 ** tiles.pool_levels
+
+
+def test_coarse_tiles_never_touch_the_base_level(tiles):
+    tile = tiles.get_tile(9, *_tile_at(9, 18.52, 73.85))
+    assert tiles.sampled == {9: 1}
+    assert not np.isnan(tile).all()
+
+
+def test_pooled_tile_is_the_mean_of_its_children(tiles):
+    z, x, y = 11, *_tile_at(11, 18.52, 73.85)
+    parent = tiles.get_tile(z, x, y)
+    mosaic = np.block([
+        [tiles.get_tile(z + 1, 2 * x, 2 * y), tiles.get_tile(z + 1, 2 * x + 1, 2 * y)],
+        [tiles.get_tile(z + 1, 2 * x, 2 * y + 1), tiles.get_tile(z + 1, 2 * x + 1, 2 * y + 1)]
+    ])
+    assert not np.isnan(mosaic).any()
+    expected = mosaic.reshape(8, 2, 8, 2).mean(axis=(1, 3))
+    np.testing.assert_allclose(parent, expected, rtol=1e-6)
+
+
+def test_overzoom_crops_the_base_ancestor(tiles):
+    tile = tiles.get_tile(14, *_tile_at(14, 18.52, 73.85))
+    assert tiles.sampled == {12: 1}
+    assert not np.isnan(tile).all()
+
+
+def test_tiles_outside_the_city_are_empty(tiles):
+    tile = tiles.get_tile(12, *_tile_at(12, 40.0, -74.0))
+    assert np.isnan(tile).all()
+    assert not tiles.sampled
+
+
+def test_tile_route(client):
+    x, y = _tile_at(12, 18.52, 73.85)
+    response = client.get(f"/api/v1/heatmap_tiles/12/{x}/{y}")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["z"], body["x"], body["y"]) == (12, x, y)
+    assert len(body["temperatures"]) == body["tile_size"]
+
+    raw = client.get(f"/api/v1/heatmap_tiles/12/{x}/{y}", params={"format": "binary"})
+    assert len(raw.content) == 4 * body["tile_size"] ** 2
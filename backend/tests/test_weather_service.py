@@ -0,0 +1,52 @@
+"""
+Tests for the vectorized synthetic temperature engine
+"""
+import math
+import numpy as np
+import pytest
+from app.services.weather_service import CITY_CENTERS, HOTSPOT_ZONES, WeatherService, _coordinate_variation
+
+
+def _per_point_temperature(lat: float, lon: float) -> float:
+    """Scalar reference: a Python loop over the hotspot zones with math-module Haversine"""
+    min_distance, closest_temp = float("inf"), None
+    for zone_lat, zone_lon, zone_temp in HOTSPOT_ZONES.tolist():
+        dlat = math.radians(lat - zone_lat)
+        dlon = math.radians(lon - zone_lon)
+        a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(zone_lat)) * math.cos(math.radians(lat)) * math.sin(dlon / 2) ** 2
+        distance = 2 * 6371.0 * math.asin(math.sqrt(a))
+        if distance < min_distance:
+            min_distance, closest_temp = distance, zone_temp
+    temperature = closest_temp - min_distance * 0.1
+    temperature += float(_coordinate_variation(np.array([lat]), np.array([lon]))[0])
+    return round(max(25, min(42, temperature)), 1)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.delenv("OPENWEATHER_API_KEY", raising=False)
+    return WeatherService()
+
+
+def test_batch_matches_per_point_loop(service):
+    lats, lons = service._generate_grid_coordinates(*CITY_CENTERS["pune"], grid_size=100)
+    expected = [_per_point_temperature(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+    np.testing.assert_allclose(service.generate_synthetic_temperatures(lats, lons), expected, atol=1e-9)
+
+
+def test_batch_is_independent_of_batch_composition(service):
+    lats, lons = service._generate_grid_coordinates(*CITY_CENTERS["pune"], grid_size=20)
+    batch = service.generate_synthetic_temperatures(lats, lons)
+    assert batch.shape == lats.shape
+    np.testing.assert_array_equal(service.generate_synthetic_temperatures(lats[::7], lons[::7]), batch[::7])
+    assert service._generate_synthetic_temperature(lats[5], lons[5]) == batch[5]
+    assert service.generate_synthetic_temperatures(lats[5], lons[5]).shape == (1,)
+
+
+def test_heatmap_and_current_weather_use_the_batch_engine(service):
+    grid = service.get_heatmap_grid(grid_size=12)
+    np.testing.assert_array_equal(grid.temperatures, service.generate_synthetic_temperatures(grid.lats, grid.lons))
+    assert grid.temperatures.min() >= 25 and grid.temperatures.max() <= 42
+
+    weather = service.get_current_weather(18.53, 73.84)
+    assert weather["temperature"] == service._generate_synthetic_temperature(18.53, 73.84)
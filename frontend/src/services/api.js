@@ -10,9 +10,48 @@ const api = axios.create({
   timeout: 8000, // 8 second timeout for all requests
 });
 
+const HEATMAP_BINARY_TYPE = 'application/vnd.uhi.heatmap+octet-stream';
+const HEATMAP_HEADER_SIZE = 20;
+
+// Decode the compact columnar heatmap buffer into a GeoJSON FeatureCollection.
+// Layout (little-endian): "UHIH" | u16 version | u16 columns | u32 points |
+// u32 grid size | u32 metadata length | metadata JSON | f32 lat[] | f32 lon[] | f32 temp[]
+export const decodeHeatmapBinary = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'UHIH') {
+    throw new Error('Unexpected heatmap format');
+  }
+  const count = view.getUint32(8, true);
+  const metadataLength = view.getUint32(16, true);
+  const metadata = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, HEATMAP_HEADER_SIZE, metadataLength))
+  );
+  // Columns are 4-byte aligned, so they can be viewed in place
+  const offset = HEATMAP_HEADER_SIZE + metadataLength;
+  const lats = new Float32Array(buffer, offset, count);
+  const lons = new Float32Array(buffer, offset + count * 4, count);
+  const temps = new Float32Array(buffer, offset + count * 8, count);
+
+  const features = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const temperature = Math.round(temps[i] * 10) / 10;
+    features[i] = {
+      type: 'Feature',
+      geometry: { type: 'Point', coordinates: [lons[i], lats[i]] },
+      properties: { temperature, lat: lats[i], lon: lons[i] },
+    };
+  }
+  return { type: 'FeatureCollection', features, metadata };
+};
+
 export const getHeatmapData = async () => {
-  const response = await api.get('/api/v1/heatmap_data');
-  return response.data;
+  // Binary transfer is ~15x smaller than GeoJSON; features are rebuilt client-side
+  const response = await api.get('/api/v1/heatmap_data', {
+    headers: { Accept: HEATMAP_BINARY_TYPE },
+    responseType: 'arraybuffer',
+  });
+  return decodeHeatmapBinary(response.data);
 };
 
 export const simulateIntervention = async (interventions) => {
@@ -22,6 +61,36 @@ export const simulateIntervention = async (interventions) => {
   return response.data;
 };
 
+// Incremental simulation: each edit sends one intervention and returns only
+// the metrics it changed ({ session_id, version, intervention_id, changed })
+export const createSimulationSession = async () => {
+  const response = await api.post('/api/v1/simulation_sessions');
+  return response.data;
+};
+
+export const addSessionIntervention = async (sessionId, intervention) => {
+  const response = await api.post(`/api/v1/simulation_sessions/${sessionId}/interventions`, intervention);
+  return response.data;
+};
+
+export const updateSessionIntervention = async (sessionId, interventionId, intervention) => {
+  const response = await api.put(
+    `/api/v1/simulation_sessions/${sessionId}/interventions/${interventionId}`,
+    intervention
+  );
+  return response.data;
+};
+
+export const removeSessionIntervention = async (sessionId, interventionId) => {
+  const response = await api.delete(`/api/v1/simulation_sessions/${sessionId}/interventions/${interventionId}`);
+  return response.data;
+};
+
+export const getSimulationSession = async (sessionId) => {
+  const response = await api.get(`/api/v1/simulation_sessions/${sessionId}`);
+  return response.data;
+};
+
 export const getRecommendations = async () => {
   const response = await api.get('/api/v1/recommendations');
   return response.data;